@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of RestAuthClient (https://python.restauth.net).
+#
+# RestAuthClient is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# RestAuthClient is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with RestAuthClient. If
+# not, see <http://www.gnu.org/licenses/>.
+
+"""Fail fast while a RestAuth service is unavailable.
+
+.. moduleauthor:: Mathias Ertl <mati@restauth.net>
+"""
+
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitBreaker(object):
+    """A circuit breaker for the requests to one RestAuth service.
+
+    The breaker is *closed* initially and all requests are sent. It records the outcome of the
+    last ``window`` requests, a request failed if it raised :py:exc:`.HttpException`, if the
+    service returned HTTP status code 500 or if it took longer than ``slow`` seconds. If at least
+    ``threshold`` of the last ``window`` requests failed, the breaker *opens* and requests raise
+    :py:exc:`.CircuitOpen` immediately. After ``cooldown`` seconds, the breaker is *half-open* and
+    lets ``probes`` requests through: If they succeed, the breaker closes again, otherwise it opens
+    for another ``cooldown`` seconds.
+
+    Every state change is passed to the callables in :py:attr:`.listeners` and counted in the
+    :py:class:`~.metrics.Metrics` of the connection (``"breaker_open"``,
+    ``"breaker_half_open"`` and ``"breaker_closed"``). Rejected requests are counted as
+    ``"breaker_rejected"``.
+
+    .. versionadded:: 0.6.2
+
+    :param      host: The host of the RestAuth service, only used for display purposes. The default
+        is the host of the connection the breaker is passed to.
+    :type       host: str
+    :param threshold: Fraction of failed requests that opens the breaker.
+    :type  threshold: float
+    :param    window: Number of recent requests considered, the breaker does not open before that
+        many requests were sent.
+    :type     window: int
+    :param      slow: Requests taking longer than that many seconds count as failed.
+    :type       slow: float
+    :param  cooldown: Seconds until an open breaker lets requests through again.
+    :type   cooldown: float
+    :param    probes: Number of concurrent requests let through by a half-open breaker.
+    :type     probes: int
+    """
+
+    def __init__(self, host=None, threshold=0.5, window=20, slow=None, cooldown=5.0, probes=1):
+        self.host = host
+        self.threshold = threshold
+        self.window = window
+        self.slow = slow
+        self.cooldown = cooldown
+        self.probes = probes
+
+        self.listeners = []
+        """Callables called with the breaker, the old and the new state on every state change."""
+
+        self.state = CLOSED
+        """The current state, one of ``"closed"``, ``"open"`` or ``"half-open"``."""
+
+        self.opened = None
+        """When the breaker opened the last time."""
+
+        self._lock = threading.Lock()
+        self._generation = 1  # incremented on every state change
+        self._outcomes = []
+        self._index = 0
+        self._failures = 0
+        self._probing = 0
+
+    def _set(self, state):
+        """Change the state, must be called with the lock held. Returns a notification."""
+        old, self.state = self.state, state
+        self._generation += 1
+        if state == OPEN:
+            self.opened = time.time()
+        if state != HALF_OPEN:
+            self._probing = 0
+        self._outcomes, self._index, self._failures = [], 0, 0
+        return old, state
+
+    def _notify(self, change):
+        if change is not None:
+            for listener in self.listeners:
+                listener(self, *change)
+
+    def allow(self):
+        """Check if a request may be sent.
+
+        If the request may be sent, the current *generation* of the breaker is returned, which is
+        incremented on every state change. Pass it to :py:meth:`.record` or :py:meth:`.release`
+        when the request is finished, so that requests sent before a state change (e.g. before the
+        breaker opened) are not mistaken for probes of a half-open breaker.
+
+        :return: The generation (a true value) or False if the request must not be sent.
+        :rtype: int or bool
+        """
+        change = None
+        with self._lock:
+            if self.state == OPEN:
+                if time.time() - self.opened < self.cooldown:
+                    return False
+                change = self._set(HALF_OPEN)
+
+            if self.state == HALF_OPEN:
+                if self._probing >= self.probes:
+                    allowed = False
+                else:
+                    self._probing += 1
+                    allowed = self._generation
+            else:
+                allowed = self._generation
+        self._notify(change)
+        return allowed
+
+    def record(self, success, duration=None, generation=None):
+        """Record the outcome of a request.
+
+        :param    success: If the request succeeded.
+        :type     success: bool
+        :param   duration: The duration of the request in seconds.
+        :type    duration: float
+        :param generation: The value returned by :py:meth:`.allow` for this request. If it is
+            outdated, the outcome is ignored.
+        :type  generation: int
+        """
+        if success and self.slow is not None and duration is not None and duration > self.slow:
+            success = False
+
+        change = None
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                pass  # sent before the last state change
+            elif self.state == HALF_OPEN:
+                change = self._set(CLOSED if success else OPEN)
+            elif self.state == CLOSED:
+                if len(self._outcomes) < self.window:
+                    self._outcomes.append(success)
+                else:
+                    self._failures -= not self._outcomes[self._index]
+                    self._outcomes[self._index] = success
+                    self._index = (self._index + 1) % self.window
+                self._failures += not success
+
+                if len(self._outcomes) >= self.window and \
+                        self._failures >= self.threshold * self.window:
+                    change = self._set(OPEN)
+        self._notify(change)
+
+    def release(self, generation=None):
+        """Finish a request without recording an outcome (e.g. because the deadline passed).
+
+        :param generation: The value returned by :py:meth:`.allow` for this request.
+        :type  generation: int
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if self.state == HALF_OPEN and self._probing > 0:
+                self._probing -= 1
+
+    def __repr__(self):
+        return '<CircuitBreaker: %s (%s)>' % (self.host, self.state)
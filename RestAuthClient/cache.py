@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of RestAuthClient (https://python.restauth.net).
+#
+# RestAuthClient is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# RestAuthClient is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with RestAuth. If not,
+# see <http://www.gnu.org/licenses/>.
+
+"""Client-side caching of RestAuth responses.
+
+.. moduleauthor:: Mathias Ertl <mati@restauth.net>
+"""
+
+import atexit
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import weakref
+
+if sys.version_info >= (3, ):  # pragma: py3
+    PY3 = True
+    from urllib.parse import quote
+else:  # pragma: py2
+    PY3 = False
+    from urllib import quote
+
+MEMBERSHIPS = 'memberships'
+PROPERTIES = 'properties'
+USERS = 'users'
+
+# On-disk format: A header followed by one section directory entry per persisted data type, the
+# (sorted) index entries of all sections and finally the raw key and value data. Lookups do a
+# binary search on the index of a section, so a file never has to be parsed as a whole.
+_MAGIC = b'RACC'
+_VERSION = 1
+_HEADER = struct.Struct('<4sBB')  # magic, version, number of sections
+_SECTION = struct.Struct('<BII')  # type id, offset of the first index entry, number of entries
+_ENTRY = struct.Struct('<dIIII')  # expires, key offset, key length, value offset, value length
+_TYPE_IDS = {MEMBERSHIPS: 1, PROPERTIES: 2, USERS: 3}
+_TYPE_NAMES = dict((v, k) for k, v in _TYPE_IDS.items())
+
+# Caches saved when the interpreter exits, a WeakSet so that caches can still be collected.
+_persisted = weakref.WeakSet()
+
+
+@atexit.register
+def _save_all():
+    for cache in list(_persisted):
+        cache._save_quietly()
+
+
+def _encode(name):
+    if PY3 or isinstance(name, unicode):
+        return name.encode('utf-8')
+    return name  # pragma: py2
+
+
+class RestAuthCache(object):
+    """A cache for group memberships, user properties and the existence of users.
+
+    Every data type is cached independently and only if a time-to-live (in seconds) is given for
+    it. The cache is used by passing it to a :py:class:`.RestAuthConnection`:
+
+    .. code-block:: python
+
+       cache = RestAuthCache(memberships=300, properties=60, users=600)
+       conn = RestAuthConnection('https://auth.example.com', 'service', 'password', cache=cache)
+
+    The cache can be persisted to a file, so that processes do not start with a cold cache after a
+    restart. The file is memory-mapped when the cache is created and entries are only read from it
+    once they are looked up. Persisting is opt-in per data type, entries are written with their
+    expiry time and are ignored once expired:
+
+    .. code-block:: python
+
+       cache = RestAuthCache(memberships=300, users=600, path='/var/cache/myapp/restauth',
+                             persist=['memberships', 'users'], save_interval=60)
+
+    .. versionadded:: 0.6.2
+
+    :param memberships: Time in seconds to cache group memberships.
+    :type  memberships: float
+    :param  properties: Time in seconds to cache the properties of a user.
+    :type   properties: float
+    :param       users: Time in seconds to cache the fact that a user exists.
+    :type        users: float
+    :param        path: File to load the cache from and to save it to.
+    :type         path: str
+    :param     persist: Data types (``"memberships"``, ``"properties"`` or ``"users"``) to save to
+        ``path``. The cache is saved when the interpreter exits and every ``save_interval``
+        seconds.
+    :type      persist: list
+    :param save_interval: Also save the cache every ``save_interval`` seconds.
+    :type  save_interval: float
+    """
+
+    def __init__(self, memberships=None, properties=None, users=None, path=None, persist=None,
+                 save_interval=None):
+        self.ttl = {MEMBERSHIPS: memberships, PROPERTIES: properties, USERS: users}
+        self.path = path
+        self.save_interval = save_interval
+        self.persist = tuple(persist or ())
+        for typ in self.persist:
+            if typ not in _TYPE_IDS:
+                raise ValueError("Unknown data type: %s" % typ)
+
+        self._lock = threading.RLock()
+        self._data = {MEMBERSHIPS: {}, PROPERTIES: {}, USERS: {}}
+        self._services = {}  # caches of service views, see _for_service()
+
+        # data memory-mapped from a file
+        self._mmap = None
+        self._sections = {}
+        self._shadowed = {MEMBERSHIPS: set(), PROPERTIES: set(), USERS: set()}
+
+        if path is not None:
+            self.load(path)
+            if self.persist:
+                _persisted.add(self)
+                if save_interval:
+                    self._schedule_save(save_interval)
+
+    def _for_service(self, name):
+        """Get the cache with the same settings for the service ``name``.
+
+        The cache is created on first use and shared by all views of the service. A persisted cache
+        gets a file of its own, so that services never share cached data. It does not start a
+        timer of its own but is saved together with this cache.
+        """
+        with self._lock:
+            cache = self._services.get(name)
+            if cache is None:
+                path = self.path
+                if path is not None:
+                    path = '%s.%s' % (path, quote(_encode(name), safe=''))
+                cache = type(self)(path=path, persist=self.persist, **self.ttl)
+                self._services[name] = cache
+            return cache
+
+    def _expires(self, typ):
+        return time.time() + self.ttl[typ]
+
+    ###############
+    # memberships #
+    ###############
+    def get_membership(self, group, user, stale=False):
+        """Get a cached group membership.
+
+        :param stale: Also return expired entries, used while the RestAuth service is unavailable.
+        :type  stale: bool
+        :return: True or False if the membership is cached, None otherwise.
+        """
+        if self.ttl[MEMBERSHIPS] is None:
+            return None
+
+        with self._lock:
+            try:
+                expires, value = self._data[MEMBERSHIPS][user][group]
+                if stale or expires > time.time():
+                    return value
+                return None
+            except KeyError:
+                pass
+
+            raw = self._lookup(MEMBERSHIPS, user, _encode(user) + b'\0' + _encode(group), stale)
+            if raw is None:
+                return None
+            expires, value = raw[0], raw[1] == b'\1'
+            self._data[MEMBERSHIPS].setdefault(user, {})[group] = (expires, value)
+            return value
+
+    def set_membership(self, group, user, value):
+        """Cache if a user is a member of a group."""
+        if self.ttl[MEMBERSHIPS] is None:
+            return
+
+        with self._lock:
+            groups = self._data[MEMBERSHIPS].setdefault(user, {})
+            groups[group] = (self._expires(MEMBERSHIPS), value)
+
+    def invalidate_memberships(self, user=None):
+        """Invalidate cached group memberships.
+
+        :param user: Only invalidate memberships of the given user. If None, invalidate all
+            memberships.
+        """
+        with self._lock:
+            if user is None:
+                self._data[MEMBERSHIPS] = {}
+                self._sections.pop(MEMBERSHIPS, None)
+            else:
+                self._data[MEMBERSHIPS].pop(user, None)
+                self._shadowed[MEMBERSHIPS].add(user)
+
+    ##############
+    # properties #
+    ##############
+    def get_properties(self, user, stale=False):
+        """Get the cached properties of a user.
+
+        :param stale: Also return expired entries, used while the RestAuth service is unavailable.
+        :type  stale: bool
+        :return: A copy of the properties or None if they are not cached.
+        :rtype: dict
+        """
+        if self.ttl[PROPERTIES] is None:
+            return None
+
+        with self._lock:
+            if user in self._data[PROPERTIES]:
+                expires, value = self._data[PROPERTIES][user]
+                if stale or expires > time.time():
+                    return dict(value)
+                return None
+
+            raw = self._lookup(PROPERTIES, user, _encode(user), stale)
+            if raw is None:
+                return None
+            expires, value = raw[0], json.loads(raw[1].decode('utf-8'))
+            self._data[PROPERTIES][user] = (expires, value)
+            return dict(value)
+
+    def set_properties(self, user, props):
+        """Cache the properties of a user."""
+        if self.ttl[PROPERTIES] is None:
+            return
+
+        with self._lock:
+            self._data[PROPERTIES][user] = (self._expires(PROPERTIES), dict(props))
+
+    def invalidate_properties(self, user):
+        """Invalidate the cached properties of a user."""
+        with self._lock:
+            self._data[PROPERTIES].pop(user, None)
+            self._shadowed[PROPERTIES].add(user)
+
+    #########
+    # users #
+    #########
+    def get_user(self, user):
+        """Get if a user is known to exist.
+
+        :return: True if the user is known to exist, False otherwise.
+        :rtype: bool
+        """
+        if self.ttl[USERS] is None:
+            return False
+
+        with self._lock:
+            if user in self._data[USERS]:
+                return self._data[USERS][user] > time.time()
+
+            raw = self._lookup(USERS, user, _encode(user))
+            if raw is None:
+                return False
+            self._data[USERS][user] = raw[0]
+            return True
+
+    def set_user(self, user):
+        """Cache that a user exists."""
+        if self.ttl[USERS] is None:
+            return
+
+        with self._lock:
+            self._data[USERS][user] = self._expires(USERS)
+
+    def invalidate_user(self, user):
+        """Invalidate all cached data of a user."""
+        with self._lock:
+            for typ in self._shadowed:
+                self._data[typ].pop(user, None)
+                self._shadowed[typ].add(user)
+
+    def clear(self):
+        """Invalidate all cached data, including any data loaded from a file."""
+        with self._lock:
+            self._data = {MEMBERSHIPS: {}, PROPERTIES: {}, USERS: {}}
+            self._sections = {}
+
+    ###############
+    # persistence #
+    ###############
+    def load(self, path):
+        """Memory-map a file previously written by :py:meth:`.save`.
+
+        Only the header of the file is read, entries are read once they are looked up. Missing,
+        empty or invalid files are ignored.
+        """
+        try:
+            with open(path, 'rb') as stream:
+                mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError, ValueError):
+            return  # file does not exist or is empty
+
+        if len(mapped) < _HEADER.size:
+            mapped.close()
+            return
+        magic, version, count = _HEADER.unpack_from(mapped, 0)
+        if magic != _MAGIC or version != _VERSION:
+            mapped.close()
+            return
+
+        sections = {}
+        for i in range(count):
+            typ, offset, length = _SECTION.unpack_from(mapped, _HEADER.size + i * _SECTION.size)
+            if _TYPE_NAMES.get(typ) in self.persist:
+                sections[_TYPE_NAMES[typ]] = (offset, length)
+
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._mmap = mapped
+            self._sections = sections
+            self._shadowed = {MEMBERSHIPS: set(), PROPERTIES: set(), USERS: set()}
+
+    def _lookup(self, typ, user, key, stale=False):
+        """Binary search for ``key`` in the memory-mapped section of ``typ``."""
+        if typ not in self._sections or user in self._shadowed[typ]:
+            return None
+
+        mapped = self._mmap
+        offset, length = self._sections[typ]
+        low, high = 0, length
+        while low < high:
+            middle = (low + high) // 2
+            entry = _ENTRY.unpack_from(mapped, offset + middle * _ENTRY.size)
+            current = mapped[entry[1]:entry[1] + entry[2]]
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            elif stale or entry[0] > time.time():
+                return entry[0], mapped[entry[3]:entry[3] + entry[4]]
+            else:
+                return None
+        return None
+
+    def _iter_mapped(self, typ):
+        """Iterate over all (unexpired) entries of the memory-mapped section of ``typ``."""
+        if typ not in self._sections:
+            return
+
+        mapped = self._mmap
+        offset, length = self._sections[typ]
+        shadowed = set(_encode(user) for user in self._shadowed[typ])
+        now = time.time()
+        for i in range(length):
+            expires, koff, klen, voff, vlen = _ENTRY.unpack_from(mapped, offset + i * _ENTRY.size)
+            key = mapped[koff:koff + klen]
+            if expires <= now or key.split(b'\0', 1)[0] in shadowed:
+                continue
+            yield key, expires, mapped[voff:voff + vlen]
+
+    def _collect(self, typ):
+        """Get a dictionary of all entries of ``typ`` in their on-disk representation."""
+        entries = dict((k, (e, v)) for k, e, v in self._iter_mapped(typ))
+        now = time.time()
+
+        if typ == MEMBERSHIPS:
+            for user, groups in self._data[typ].items():
+                for group, (expires, value) in groups.items():
+                    if expires > now:
+                        key = _encode(user) + b'\0' + _encode(group)
+                        entries[key] = (expires, b'\1' if value else b'\0')
+        elif typ == PROPERTIES:
+            for user, (expires, value) in self._data[typ].items():
+                if expires > now:
+                    entries[_encode(user)] = (expires, json.dumps(value).encode('utf-8'))
+        else:
+            for user, expires in self._data[typ].items():
+                if expires > now:
+                    entries[_encode(user)] = (expires, b'')
+        return entries
+
+    def save(self, path=None):
+        """Save all data types configured with the ``persist`` parameter to a file.
+
+        The file is written to a temporary file first and then moved to its final location, so
+        readers never see a partially written file.
+
+        :param path: The file to write to. If omitted, the ``path`` passed to the constructor is
+            used.
+        :type  path: str
+        """
+        if path is None:
+            path = self.path
+
+        with self._lock:
+            sections = [(typ, sorted(self._collect(typ).items())) for typ in self.persist]
+
+        index_offset = _HEADER.size + len(sections) * _SECTION.size
+        data_offset = index_offset + sum(len(e) for t, e in sections) * _ENTRY.size
+
+        header = [_HEADER.pack(_MAGIC, _VERSION, len(sections))]
+        index = []
+        data = []
+        for typ, entries in sections:
+            header.append(_SECTION.pack(_TYPE_IDS[typ], index_offset, len(entries)))
+            index_offset += len(entries) * _ENTRY.size
+
+            for key, (expires, value) in entries:
+                index.append(_ENTRY.pack(expires, data_offset, len(key),
+                                         data_offset + len(key), len(value)))
+                data.append(key)
+                data.append(value)
+                data_offset += len(key) + len(value)
+
+        tmp = '%s.%s.tmp' % (path, os.getpid())
+        with open(tmp, 'wb') as stream:
+            stream.write(b''.join(header + index + data))
+        if PY3:  # pragma: py3
+            os.replace(tmp, path)
+        else:  # pragma: py2
+            os.rename(tmp, path)
+
+    def _save_quietly(self):
+        # Failing to save the cache is not fatal, the next process just starts with a cold cache.
+        try:
+            self.save()
+        except (IOError, OSError):
+            pass
+
+    def _schedule_save(self, interval):
+        # The timer only holds a weak reference, periodic saves stop once the cache is collected.
+        timer = threading.Timer(interval, _periodic_save, args=(weakref.ref(self), interval))
+        timer.daemon = True
+        timer.start()
+
+
+def _periodic_save(ref, interval):
+    cache = ref()
+    if cache is not None:
+        cache._save_quietly()
+        with cache._lock:
+            services = list(cache._services.values())
+        for service in services:
+            service._save_quietly()
+        cache._schedule_save(interval)
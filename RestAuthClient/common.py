@@ -19,7 +19,12 @@
 """
 
 import base64
+import socket
 import sys
+import threading
+import time
+
+from contextlib import contextmanager
 
 if sys.version_info >= (3, ):  # pragma: py3
     PY3 = True
@@ -46,9 +51,23 @@ from RestAuthCommon import error
 from RestAuthCommon.handlers import CONTENT_HANDLERS
 from RestAuthCommon.handlers import ContentHandler
 from RestAuthCommon.handlers import JSONContentHandler
+from RestAuthClient.breaker import CircuitBreaker
+from RestAuthClient.error import CircuitOpen
+from RestAuthClient.error import DeadlineExceeded
 from RestAuthClient.error import HttpException
+from RestAuthClient.executor import Executor
+from RestAuthClient.expression import Members
+from RestAuthClient.metrics import Metrics
+from RestAuthClient.planner import MembershipPlan
+from RestAuthClient.reconcile import Reconciler
+from RestAuthClient.retry import RetryPolicy
+from RestAuthClient.pool import ConnectionPool
+from RestAuthClient.pool import HTTPConnection
+from RestAuthClient.pool import HTTPSConnection
+from RestAuthClient.user import RestAuthLogin
 from RestAuthClient.user import RestAuthUser
 from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.session import RestAuthSession
 
 
 class RestAuthConnection(object):
@@ -59,7 +78,8 @@ class RestAuthConnection(object):
        seconds from now.
 
     .. versionadded:: 0.6.2
-       The ssl_context, timeout and source_address parameters.
+       The ssl_context, timeout, source_address, cache, pool_size, bulk_size, retry and breaker
+       parameters.
 
     :param host: The hostname of the RestAuth service
     :type  host: str
@@ -86,13 +106,34 @@ class RestAuthConnection(object):
     :type          timeout: float
     :param  source_address: A tuple of ``(host, port)`` to make connections from.
     :type   source_address: tuple
+    :param           cache: Cache memberships, properties and/or the existence of users.
+    :type            cache: :py:class:`~.cache.RestAuthCache`
+    :param       pool_size: Number of connections kept open for reuse by later requests. This is
+        also the default number of concurrent requests used by :py:meth:`.map`.
+    :type        pool_size: int
+    :param       bulk_size: Maximum number of concurrent requests with the ``"bulk"`` priority (see
+        :py:meth:`.prioritize`), the default is half of ``pool_size``.
+    :type        bulk_size: int
+    :param           retry: Retry idempotent requests that failed because of a transport error.
+        Pass True to use the default :py:class:`~.retry.RetryPolicy`. Retries are counted in
+        :py:attr:`.metrics`.
+    :type            retry: bool or :py:class:`~.retry.RetryPolicy`
+    :param         breaker: Fail fast while the RestAuth service is unavailable. Pass True to use a
+        :py:class:`~.breaker.CircuitBreaker` with the default settings. If ``cache`` is given,
+        reads fall back to expired cache entries while the breaker is open.
+    :type          breaker: bool or :py:class:`~.breaker.CircuitBreaker`
     """
     context = None
+    cache = None
+    priorities = ('interactive', 'bulk')
     _user = RestAuthUser
     _group = RestAuthGroup
+    _login = RestAuthLogin
+    _session = RestAuthSession
 
     def __init__(self, host, user, passwd, content_handler=None, ssl_context=None, timeout=None,
-                 source_address=None):
+                 source_address=None, cache=None, pool_size=10, bulk_size=None, retry=None,
+                 breaker=None):
         """Initialize a new connection to a RestAuth service."""
 
         parseresult = urlparse(host)
@@ -102,7 +143,7 @@ class RestAuthConnection(object):
         }
 
         if parseresult.scheme == 'https':  # pragma: no cover
-            self._conn = client.HTTPSConnection
+            self._conn = HTTPSConnection
 
             # Add SSLContext in Python3
             if ssl_context is not None:
@@ -115,13 +156,32 @@ class RestAuthConnection(object):
                 context.set_default_verify_paths()
                 self._conn_kwargs['context'] = context
         else:
-            self._conn = client.HTTPConnection
+            self._conn = HTTPConnection
 
         # Add optional parameters
         if timeout is not None:
             self._conn_kwargs['timeout'] = timeout
         if source_address is not None:
             self._conn_kwargs['source_address'] = source_address
+        self.cache = cache
+        self.pool_size = pool_size
+        self._pool = ConnectionPool(self._conn, self._conn_kwargs, pool_size)
+        self.bulk_size = bulk_size or max(pool_size // 2, 1)
+        self._bulk = threading.Semaphore(self.bulk_size)
+        self._local = threading.local()
+
+        if retry is True:
+            retry = RetryPolicy()
+        self.retry = retry or None
+        self.metrics = Metrics()
+
+        if breaker is True:
+            breaker = CircuitBreaker()
+        self.breaker = breaker or None
+        if self.breaker is not None:
+            if self.breaker.host is None:
+                self.breaker.host = self._conn_kwargs['host']
+            self.breaker.listeners.append(self._breaker_changed)
 
         # Set credentials, authentication header
         self.set_content_handler(content_handler)
@@ -138,6 +198,7 @@ class RestAuthConnection(object):
         raw_credentials = '%s:%s' % (user, passwd)
         enc_credentials = base64.b64encode(raw_credentials.encode())
         self.auth_header = "Basic %s" % enc_credentials.decode()
+        self._header_blocks = None
 
     def set_content_handler(self, content_handler=None):
         """Set the content type used by the connection.
@@ -170,8 +231,179 @@ class RestAuthConnection(object):
         else:
             raise error.RestAuthRuntimeException("Unknown content handler defined.")
         self.mime = self.content_handler.mime
+        self._header_blocks = None
+
+    def _render_headers(self, headers):
+        fields = {
+            'Accept-Encoding': 'identity',
+            'Authorization': self.auth_header,
+            'Accept': self.mime,
+        }
+        if headers:
+            fields.update(headers)
+        return '\r\n'.join('%s: %s' % item for item in fields.items()).encode('latin-1')
+
+    def _headers(self, headers=None):
+        """Get the headers of a request rendered to bytes.
+
+        The headers of requests without additional headers or with only the Content-Type set by
+        :py:meth:`.post` and :py:meth:`.put` are rendered only once per MIME type. The MIME type is
+        checked on every call, since a :py:class:`.ServiceView` uses the MIME type of its
+        transport.
+        """
+        mime = self.mime
+        blocks = self._header_blocks
+        if blocks is None or blocks[0] != mime:
+            blocks = mime, self._render_headers(None), self._render_headers({'Content-Type': mime})
+            self._header_blocks = blocks
+
+        if not headers:
+            return blocks[1]
+        elif len(headers) == 1 and headers.get('Content-Type') == mime:
+            return blocks[2]
+        return self._render_headers(headers)
+
+    def service(self, user, passwd, cache=None):
+        """Get a view of this connection that authenticates as a different service.
+
+        The view uses the connection pool, retry policy, circuit breaker and metrics of this
+        connection and sends its own (precomputed) ``Authorization`` header. Creating a view is
+        cheap, so platforms acting as many services can create one per request:
+
+        .. code-block:: python
+
+           transport = RestAuthConnection('https://auth.example.com', 'platform', 'password')
+           conn = transport.service('tenant-a.example.com', 'password-a')
+           RestAuthUser(conn, 'mati').verify_password('password')
+
+        Cached data is never shared between services, because different services may see
+        different data. If ``cache`` is not given and this connection has a cache, all views of a
+        service share a cache with the same settings. A persisted cache is saved to a separate
+        file for every service, named after the ``path`` of the cache and the name of the service.
+
+        .. versionadded:: 0.6.2
+
+        :param   user: The name of the service.
+        :type    user: str
+        :param passwd: The password of the service.
+        :type  passwd: str
+        :param  cache: The cache used by the view.
+        :type   cache: :py:class:`.RestAuthCache`
+        :rtype: :py:class:`.ServiceView`
+        """
+        if cache is None and self.cache is not None:
+            cache = self.cache._for_service(user)
+        return ServiceView(self, user, passwd, cache=cache)
+
+    def session(self):
+        """Start a new unit of work that memoizes reads and batches writes.
+
+        .. versionadded:: 0.6.2
+
+        :return: A new session using this connection.
+        :rtype: :py:class:`~.session.RestAuthSession`
+        """
+        return self._session(self)
+
+    @property
+    def priority(self):
+        """The priority of requests sent by the current thread, ``"interactive"`` by default."""
+        return getattr(self._local, 'priority', 'interactive')
+
+    @contextmanager
+    def prioritize(self, priority):
+        """Send requests of the current thread with the given priority.
+
+        Requests with the ``"interactive"`` priority (the default) are sent immediately. At most
+        ``bulk_size`` requests with the ``"bulk"`` priority are sent concurrently, further bulk
+        requests wait until a previous one finished. This way, bulk operations cannot use all
+        connections of the pool and interactive requests never wait for them:
+
+        .. code-block:: python
+
+           with conn.prioritize('bulk'):
+               for name, result in conn.map(func, names):  # map() inherits the priority
+                   ...
+
+        .. versionadded:: 0.6.2
+
+        :param priority: Either ``"interactive"`` or ``"bulk"``.
+        :type  priority: str
+        :raise RestAuthRuntimeException: If ``priority`` is unknown.
+        """
+        if priority not in self.priorities:
+            raise error.RestAuthRuntimeException("Unknown priority: %s" % priority)
+
+        previous = self.priority
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    @property
+    def remaining(self):
+        """Seconds until the deadline of the current thread or None if there is no deadline."""
+        deadline = getattr(self._local, 'deadline', None)
+        if deadline is None:
+            return None
+        return deadline - time.time()
+
+    @contextmanager
+    def deadline(self, timeout):
+        """Complete all requests of the current thread within ``timeout`` seconds.
+
+        The socket timeout of every request is reduced to the time remaining until the deadline.
+        Once the deadline passed, requests raise :py:exc:`.DeadlineExceeded` without contacting the
+        RestAuth service. The deadline also applies to concurrent requests of composite operations
+        like :py:meth:`.map` or :py:meth:`.RestAuthUser.login`, pending requests are cancelled
+        once it passed. Nested deadlines never extend an outer deadline:
+
+        .. code-block:: python
+
+           try:
+               with conn.deadline(0.3):
+                   login = user.login(password)
+                   is_admin = conn.check_memberships([user], ['admins'])[0][0]
+           except DeadlineExceeded:
+               ...
+
+        .. versionadded:: 0.6.2
+
+        :param timeout: The time available in seconds.
+        :type  timeout: float
+        """
+        previous = getattr(self._local, 'deadline', None)
+        deadline = time.time() + timeout
+        if previous is not None:
+            deadline = min(previous, deadline)
 
-    def send(self, method, url, body=None, headers=None):
+        self._local.deadline = deadline
+        try:
+            yield
+        finally:
+            self._local.deadline = previous
+
+    def _propagate(self, func):
+        """Wrap ``func`` to run with the priority and deadline of the current thread."""
+        priority = self.priority
+        deadline = getattr(self._local, 'deadline', None)
+        if priority == 'interactive' and deadline is None:
+            return func
+
+        def wrapper(*args, **kwargs):
+            local = self._local
+            previous = self.priority, getattr(local, 'deadline', None)
+            local.priority, local.deadline = priority, deadline
+            try:
+                if deadline is not None and deadline <= time.time():
+                    raise DeadlineExceeded(socket.timeout('Deadline exceeded.'))
+                return func(*args, **kwargs)
+            finally:
+                local.priority, local.deadline = previous
+        return wrapper
+
+    def send(self, method, url, body=None, headers=None, idempotent=None):
         """
         Send an HTTP request to the RestAuth service. This method is called by the :py:meth:`.get`,
         :py:meth:`.post`, :py:meth:`.put` and :py:meth:`.delete` methods. This method takes care of
@@ -187,7 +419,10 @@ class RestAuthConnection(object):
             body is assumed to be URL escaped.
         :type    body: str
         :param headers: A dictionary of key/value pairs of headers to set.
-        :param headers: dict
+        :type  headers: dict
+        :param idempotent: If the request may be retried. The default is to ask
+            :py:meth:`.RetryPolicy.is_idempotent`.
+        :type  idempotent: bool
 
         :return: The response to the request
         :rtype: :py:class:`~http.client.HTTPResponse`
@@ -198,19 +433,14 @@ class RestAuthConnection(object):
             by this connection (see also: :py:meth:`.set_content_handler`).
         :raise InternalServerError: When the server has some internal error.
         """
-        if headers is None:
-            headers = {}
-
-        headers['Authorization'] = self.auth_header
-        headers['Accept'] = self.mime
-
-        conn = self._conn(**self._conn_kwargs)
+        return self._dispatch(method, url, body, self._headers(headers), idempotent)
 
-        try:
-            conn.request(method, url, body, headers)
-            response = conn.getresponse()
-        except Exception as e:
-            raise HttpException(e)
+    def _dispatch(self, method, url, body, headers, idempotent):
+        """Send a request with headers rendered by :py:meth:`._headers`."""
+        if self.retry is None:
+            response = self._attempt(method, url, body, headers)
+        else:
+            response = self._retry(method, url, body, headers, idempotent)
 
         if response.status == client.UNAUTHORIZED:
             raise error.Unauthorized(response)
@@ -223,6 +453,355 @@ class RestAuthConnection(object):
         else:
             return response
 
+    def _breaker_changed(self, breaker, old, new):
+        self.metrics.increment('breaker_%s' % new.replace('-', '_'))
+
+    def _attempt(self, method, url, body, headers):
+        return self._guard(self.breaker, method, url, body, headers)
+
+    def _guard(self, breaker, method, url, body, headers):
+        """Send a request if ``breaker`` allows it and record the outcome."""
+        if breaker is None:
+            return self._deadline(method, url, body, headers)
+
+        generation = breaker.allow()
+        if not generation:
+            self.metrics.increment('breaker_rejected')
+            raise CircuitOpen(socket.error('Circuit breaker for %s is open.' % breaker.host))
+
+        start = time.time()
+        try:
+            response = self._deadline(method, url, body, headers)
+        except DeadlineExceeded:
+            breaker.release(generation)
+            raise
+        except HttpException:
+            breaker.record(False, generation=generation)
+            raise
+        except Exception:
+            breaker.release(generation)
+            raise
+
+        breaker.record(response.status != client.INTERNAL_SERVER_ERROR, time.time() - start,
+                       generation)
+        return response
+
+    def _deadline(self, method, url, body, headers):
+        timeout = self.remaining
+        if timeout is None:
+            return self._gate(method, url, body, headers, None)
+        elif timeout <= 0:
+            raise DeadlineExceeded(socket.timeout('Deadline exceeded.'))
+
+        try:
+            return self._gate(method, url, body, headers, timeout)
+        except HttpException as e:
+            if self.remaining <= 0:
+                raise DeadlineExceeded(e.cause)
+            raise
+
+    def _retry(self, method, url, body, headers, idempotent):
+        if idempotent is None:
+            idempotent = self.retry.is_idempotent(method, url)
+        if not idempotent:
+            return self._attempt(method, url, body, headers)
+
+        self.retry.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                return self._attempt(method, url, body, headers)
+            except (DeadlineExceeded, CircuitOpen):
+                raise
+            except HttpException:
+                delay = self.retry.delay(attempt)
+                if delay is None:
+                    if attempt < self.retry.retries:
+                        self.metrics.increment('retry_budget_exhausted')
+                    raise
+
+                remaining = self.remaining
+                if remaining is not None and delay >= remaining:
+                    raise
+                self.metrics.increment('retries')
+                time.sleep(delay)
+                attempt += 1
+
+    def _gate(self, method, url, body, headers, timeout):
+        """Wait until the priority of the current thread allows sending the request."""
+        if self.priority != 'bulk':
+            return self._send(method, url, body, headers, timeout)
+
+        if timeout is None:
+            self._bulk.acquire()
+        elif not PY3:  # pragma: py2
+            self._bulk.acquire()  # Python 2 does not support a timeout here
+        elif not self._bulk.acquire(timeout=timeout):  # pragma: py3
+            raise DeadlineExceeded(socket.timeout('Deadline exceeded.'))
+
+        try:
+            return self._send(method, url, body, headers, self.remaining)
+        finally:
+            self._bulk.release()
+
+    def _select(self, method, url):
+        """Get the connection pool used for a request."""
+        return self._pool
+
+    def _send(self, method, url, body, headers, timeout=None):
+        pool = self._select(method, url)
+        conn, reused = pool.acquire()
+        try:
+            response = self._request(pool, conn, method, url, body, headers, timeout)
+        except Exception as e:
+            if not reused or not pool.is_stale(e):
+                raise HttpException(e)
+
+            # The server closed the idle connection, other idle connections are likely closed too
+            pool.clear()
+            conn, reused = pool.acquire()
+            if timeout is not None:
+                timeout = self.remaining
+            try:
+                response = self._request(pool, conn, method, url, body, headers, timeout)
+            except Exception as e:
+                raise HttpException(e)
+        return response
+
+    def _request(self, pool, conn, method, url, body, headers, timeout=None):
+        if body is None:
+            if method in ('POST', 'PUT'):
+                headers = (pool.host_header, headers, b'Content-Length: 0')
+            else:
+                headers = (pool.host_header, headers)
+        else:
+            if not isinstance(body, bytes):
+                body = body.encode('iso-8859-1')  # like http.client
+            headers = (pool.host_header, headers,
+                       b'Content-Length: ' + str(len(body)).encode('ascii'))
+
+        default = self._conn_kwargs.get('timeout', socket._GLOBAL_DEFAULT_TIMEOUT)
+        if timeout is not None and default is not socket._GLOBAL_DEFAULT_TIMEOUT:
+            timeout = min(timeout, default)
+        elif timeout is None:
+            timeout = default
+
+        try:
+            if conn.timeout is not timeout:
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    if timeout is socket._GLOBAL_DEFAULT_TIMEOUT:
+                        conn.sock.settimeout(socket.getdefaulttimeout())
+                    else:
+                        conn.sock.settimeout(timeout)
+
+            conn.send_rendered(method, url, headers, body)
+            response = conn.getresponse()
+        except Exception:
+            conn.close()
+            raise
+
+        pool.attach(conn, response)
+        return response
+
+    def map(self, func, items, ordered=True, workers=None, max_errors=None, progress=None,
+            adaptive=None, priority=None):
+        """Call ``func`` for every element of ``items`` concurrently.
+
+        This returns an iterable of ``(item, result)`` tuples. If ``func`` raised an exception,
+        ``result`` is the exception instead. ``items`` may be any iterable (e.g. a generator), it
+        is consumed only as fast as results are processed:
+
+        .. code-block:: python
+
+           users = RestAuthUser.get_all(conn)
+           for user, result in conn.map(lambda u: u.get_properties(), users):
+               if isinstance(result, Exception):
+                   print('%s: %s' % (user.name, result))
+
+        .. versionadded:: 0.6.2
+
+        :param       func: The callable to call with every element of ``items``.
+        :type        func: callable
+        :param      items: The elements to pass to ``func``.
+        :type       items: iterable
+        :param    ordered: If True, results are returned in the order of ``items``. Otherwise
+            they are returned as soon as they are available.
+        :type     ordered: bool
+        :param    workers: Number of concurrent calls, the default is ``pool_size``.
+        :type     workers: int
+        :param max_errors: Stop calling ``func`` after that many exceptions. Calls that already
+            started still return their results. Use ``1`` to stop after the first exception.
+        :type  max_errors: int
+        :param   progress: Called with the number of processed items and the number of errors after
+            every call of ``func``.
+        :type    progress: callable
+        :param   adaptive: Adjust the number of concurrent calls to the latency and errors of the
+            RestAuth service, ``workers`` becomes the maximum. Pass True or an
+            :py:class:`~.executor.AdaptiveLimit` instance.
+        :type    adaptive: bool or :py:class:`~.executor.AdaptiveLimit`
+        :param   priority: The priority of requests sent by ``func`` (see :py:meth:`.prioritize`),
+            the default is the priority of the current thread. The deadline of the current thread
+            (see :py:meth:`.deadline`) also applies to ``func``.
+        :type    priority: str
+        :return: The results, the object also has the ``done``, ``errors`` and ``cancelled``
+            attributes.
+        :rtype: :py:class:`~.executor.Executor`
+        :raise RestAuthRuntimeException: If ``priority`` is unknown.
+        """
+        if priority is None:
+            func = self._propagate(func)
+        else:
+            with self.prioritize(priority):
+                func = self._propagate(func)
+
+        return Executor(func, items, workers=workers or self.pool_size, ordered=ordered,
+                        max_errors=max_errors, progress=progress, adaptive=adaptive)
+
+    def members_of(self, group):
+        """Start an expression over the members of groups.
+
+        .. versionadded:: 0.6.2
+
+        :param group: The group or the name of the group.
+        :type  group: str or :py:class:`.RestAuthGroup`
+        :return: An expression that can be combined with other groups.
+        :rtype: :py:class:`~.expression.Members`
+        """
+        return Members(self, group)
+
+    def plan_memberships(self, users, groups, **kwargs):
+        """Plan how to check if users are members of groups with as few requests as possible.
+
+        .. versionadded:: 0.6.2
+
+        :param  users: The users to check.
+        :type   users: list of str or :py:class:`.RestAuthUser`
+        :param groups: The groups to check.
+        :type  groups: list of str or :py:class:`.RestAuthGroup`
+        :param kwargs: Passed to :py:class:`~.planner.MembershipPlan`.
+        :return: The plan, call :py:meth:`~.planner.MembershipPlan.execute` to execute it.
+        :rtype: :py:class:`~.planner.MembershipPlan`
+        """
+        return MembershipPlan(self, users, groups, **kwargs)
+
+    def check_memberships(self, users, groups, **kwargs):
+        """Check if each user is a member of each group.
+
+        This is a shortcut for ``conn.plan_memberships(users, groups).execute()``.
+
+        .. versionadded:: 0.6.2
+
+        :param  users: The users to check.
+        :type   users: list of str or :py:class:`.RestAuthUser`
+        :param groups: The groups to check.
+        :type  groups: list of str or :py:class:`.RestAuthGroup`
+        :param kwargs: Passed to :py:class:`~.planner.MembershipPlan`.
+        :return: A list with a row for every user, each row is a list of booleans with a column
+            for every group.
+        :rtype: list of lists
+        """
+        return self.plan_memberships(users, groups, **kwargs).execute()
+
+    def reconcile(self, state, prune=False, dry_run=False, workers=None, stream=None):
+        """Bring the RestAuth service into the desired state with as few changes as possible.
+
+        The format of ``state`` is described in :py:class:`~.reconcile.Reconciler`. The current
+        state is fetched concurrently, the operations needed are executed in the order described
+        in :py:class:`~.reconcile.ReconcilePlan`:
+
+        .. code-block:: python
+
+           plan = conn.reconcile(state, dry_run=True)  # prints the plan
+           plan = conn.reconcile(state)
+           for operation, exception in plan.failed:
+               ...
+
+        .. versionadded:: 0.6.2
+
+        :param   state: The desired state.
+        :type    state: dict
+        :param   prune: Remove users and groups that are not in the desired state.
+        :type    prune: bool
+        :param dry_run: Only print the operations that would be executed.
+        :type  dry_run: bool
+        :param workers: Number of concurrent requests, the default is ``pool_size``.
+        :type  workers: int
+        :param  stream: Where to print the plan in a dry run, the default is standard output.
+        :type   stream: file
+        :return: The plan, which has the ``done``, ``failed`` and ``skipped`` attributes once it
+            was executed.
+        :rtype: :py:class:`~.reconcile.ReconcilePlan`
+        """
+        plan = Reconciler(self, state, prune=prune, workers=workers).plan()
+        if dry_run:
+            for operation in plan:
+                (stream or sys.stdout).write('%s\n' % operation)
+        else:
+            plan.execute(workers=workers)
+        return plan
+
+    def get_properties_many(self, users, keys=None, ordered=True, workers=None):
+        """Get the properties of many users concurrently.
+
+        This returns an iterable of ``(name, properties)`` tuples, where ``properties`` is the
+        exception if fetching the properties failed (e.g. :py:exc:`.ResourceNotFound` if the user
+        does not exist). ``users`` is consumed as a stream, so results can be processed while
+        further properties are still being fetched:
+
+        .. code-block:: python
+
+           for name, props in conn.get_properties_many(names, keys=['email']):
+               if not isinstance(props, Exception):
+                   print(name, props.get('email'))
+
+        .. versionadded:: 0.6.2
+
+        :param   users: The users or names of the users.
+        :type    users: iterable of :py:class:`.RestAuthUser` or str
+        :param    keys: Only return these properties. Properties that are not set for a user are
+            not included in the dictionary of that user.
+        :type     keys: list of str
+        :param ordered: If True, results are returned in the order of ``users``.
+        :type  ordered: bool
+        :param workers: Number of concurrent requests, the default is ``pool_size``.
+        :type  workers: int
+        :rtype: :py:class:`~.executor.Executor`
+        """
+        def fetch(name):
+            props = self._user(self, name).get_properties()
+            if keys is None:
+                return props
+            return dict((k, props[k]) for k in keys if k in props)
+
+        names = (getattr(u, 'name', u) for u in users)
+        return self.map(fetch, names, ordered=ordered, workers=workers)
+
+    def set_property_many(self, users, key, value, ordered=True, workers=None):
+        """Set a property of many users concurrently.
+
+        This works like :py:meth:`.get_properties_many`, the result of every user is the previous
+        value of the property (or ``None`` if it was not set before) or the exception raised by
+        :py:meth:`.RestAuthUser.set_property`.
+
+        .. versionadded:: 0.6.2
+
+        :param   users: The users or names of the users.
+        :type    users: iterable of :py:class:`.RestAuthUser` or str
+        :param     key: The property to set.
+        :type      key: str
+        :param   value: The new value of the property.
+        :type    value: str
+        :param ordered: If True, results are returned in the order of ``users``.
+        :type  ordered: bool
+        :param workers: Number of concurrent requests, the default is ``pool_size``.
+        :type  workers: int
+        :rtype: :py:class:`~.executor.Executor`
+        """
+        names = (getattr(u, 'name', u) for u in users)
+        return self.map(lambda name: self._user(self, name).set_property(key, value), names,
+                        ordered=ordered, workers=workers)
+
     def get(self, url, params=None, headers=None):
         """
         Perform a GET request on the connection. This method takes care
@@ -381,3 +960,39 @@ class RestAuthConnection(object):
                 params[key] = value
 
             return urlencode(params).replace('+', '%20')
+
+
+class ServiceView(RestAuthConnection):
+    """A view of a :py:class:`.RestAuthConnection` that authenticates as a different service.
+
+    All attributes not set by the view (e.g. the connection pool, the content handler and the
+    metrics) are those of ``transport``. Views are usually created with
+    :py:meth:`.RestAuthConnection.service`.
+
+    .. versionadded:: 0.6.2
+
+    :param transport: The connection used to send requests.
+    :type  transport: :py:class:`.RestAuthConnection`
+    :param      user: The name of the service.
+    :type       user: str
+    :param    passwd: The password of the service.
+    :type     passwd: str
+    :param     cache: The cache used by the view.
+    :type      cache: :py:class:`.RestAuthCache`
+    """
+
+    def __init__(self, transport, user, passwd, cache=None):
+        self.transport = transport
+        self.cache = cache
+        self.set_credentials(user, passwd)
+
+    def __getattr__(self, name):
+        if name == 'transport':  # e.g. while unpickling
+            raise AttributeError(name)
+        return getattr(self.transport, name)
+
+    def service(self, user, passwd, cache=None):
+        return self.transport.service(user, passwd, cache=cache)
+
+    def _dispatch(self, method, url, body, headers, idempotent):
+        return self.transport._dispatch(method, url, body, headers, idempotent)
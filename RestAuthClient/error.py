@@ -53,6 +53,26 @@ class HttpException(RestAuthRuntimeException):
         return self.cause
 
 
+class DeadlineExceeded(HttpException):
+    """Thrown when a request cannot be completed before the deadline of the current thread.
+
+    See :py:meth:`.RestAuthConnection.deadline` for details.
+
+    .. versionadded:: 0.6.2
+    """
+    pass
+
+
+class CircuitOpen(HttpException):
+    """Thrown instead of sending a request while the circuit breaker of a connection is open.
+
+    See :py:class:`~.breaker.CircuitBreaker` for details.
+
+    .. versionadded:: 0.6.2
+    """
+    pass
+
+
 class UserExists(ResourceConflict):
     """Thrown when attempting to create a :py:class:`.RestAuthUser` that already exists."""
     pass
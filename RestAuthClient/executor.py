@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of RestAuthClient (https://python.restauth.net).
+#
+# RestAuthClient is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# RestAuthClient is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with RestAuthClient. If
+# not, see <http://www.gnu.org/licenses/>.
+
+"""Apply an operation to many users or groups with bounded concurrency.
+
+.. moduleauthor:: Mathias Ertl <mati@restauth.net>
+"""
+
+import socket
+import sys
+import threading
+import time
+
+from RestAuthCommon import error
+from RestAuthClient.error import HttpException
+
+if sys.version_info >= (3, ):  # pragma: py3
+    from queue import Queue
+else:  # pragma: py2
+    from Queue import Queue
+
+
+class AdaptiveLimit(object):
+    """Adjust the number of concurrent calls to the latency and errors of the RestAuth service.
+
+    The limit is adjusted once per round, a round being as many calls as the limit allows. The
+    limit starts at ``initial`` and doubles every round until it is reduced for the first time
+    ("slow start"), after that it is increased by one every round (additive increase). If a call
+    raised one of the exceptions in :py:attr:`.overload` or the average latency of a round is more
+    than ``tolerance`` times the baseline latency, the limit is multiplied with ``backoff``
+    (multiplicative decrease). The baseline is the lowest average latency of a round without
+    errors.
+
+    An instance can be passed to :py:meth:`.RestAuthConnection.map` to inspect the limit and its
+    history or to share the limit between several bulk operations:
+
+    .. code-block:: python
+
+       limit = AdaptiveLimit(maximum=50)
+       for name, result in conn.map(func, names, adaptive=limit):
+           ...
+       print(limit.limit, limit.history)
+
+    .. versionadded:: 0.6.2
+
+    :param   initial: The initial limit.
+    :type    initial: int
+    :param   minimum: The lowest possible limit.
+    :type    minimum: int
+    :param   maximum: The highest possible limit.
+    :type    maximum: int
+    :param tolerance: Back off if the latency is that many times higher than the baseline.
+    :type  tolerance: float
+    :param   backoff: Factor to reduce the limit with.
+    :type    backoff: float
+    """
+
+    overload = (HttpException, error.InternalServerError, socket.timeout)
+    """Exceptions that indicate that the RestAuth service is overloaded."""
+
+    def __init__(self, initial=1, minimum=1, maximum=50, tolerance=2.0, backoff=0.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.tolerance = tolerance
+        self.backoff = backoff
+
+        self.baseline = None
+        """The lowest average latency of a round without errors, in seconds."""
+
+        self.history = []
+        """A list of ``(timestamp, limit)`` tuples for every change of the limit."""
+
+        self._lock = threading.Lock()
+        self._limit = None
+        self._slow_start = True
+        self._set(initial)
+        self._reset()
+
+    @property
+    def limit(self):
+        """The current limit."""
+        return int(self._limit)
+
+    def _set(self, limit):
+        limit = min(max(limit, self.minimum), self.maximum)
+        if limit != self._limit:
+            self._limit = limit
+            self.history.append((time.time(), self.limit))
+
+    def _reset(self):
+        self._calls = 0
+        self._latency = 0.0
+        self._overloaded = False
+
+    def update(self, latency, result):
+        """Record the latency and result of a call.
+
+        :param latency: The duration of the call in seconds.
+        :type  latency: float
+        :param  result: The return value of the call or the exception raised.
+        """
+        with self._lock:
+            self._calls += 1
+            self._latency += latency
+
+            if isinstance(result, self.overload) and not self._overloaded:
+                self._overloaded = True  # back off at most once per round
+                self._slow_start = False
+                self._set(self._limit * self.backoff)
+
+            if self._calls < self.limit:
+                return
+
+            latency = self._latency / self._calls
+            if self._overloaded:
+                pass
+            elif self.baseline is not None and latency > self.baseline * self.tolerance:
+                self._slow_start = False
+                self._set(self._limit * self.backoff)
+            else:
+                if self.baseline is None or latency < self.baseline:
+                    self.baseline = latency
+                if self._slow_start:
+                    self._set(self._limit * 2)
+                else:
+                    self._set(self._limit + 1)
+            self._reset()
+
+
+class Executor(object):
+    """Call a function for every element of an iterable in a fixed number of threads.
+
+    Iterating over an instance yields ``(item, result)`` tuples, where ``result`` is the exception
+    if calling the function raised one. Threads are started when iteration starts and stop when it
+    ends. Instances are usually created with :py:meth:`.RestAuthConnection.map`.
+
+    If ``adaptive`` is given, the number of concurrent calls is adjusted by an
+    :py:class:`.AdaptiveLimit`, but never exceeds ``workers``.
+
+    .. versionadded:: 0.6.2
+
+    :param       func: The callable to call with every element of ``items``.
+    :type        func: callable
+    :param      items: The elements to pass to ``func``.
+    :type       items: iterable
+    :param    workers: Number of concurrent calls.
+    :type     workers: int
+    :param    ordered: If True, results are returned in the order of ``items``.
+    :type     ordered: bool
+    :param max_errors: Stop calling ``func`` after that many exceptions.
+    :type  max_errors: int
+    :param   progress: Called with the number of processed items and the number of errors after
+        every call of ``func``.
+    :type    progress: callable
+    :param   adaptive: Adjust the number of concurrent calls. Pass True to use a new
+        :py:class:`.AdaptiveLimit` with ``workers`` as maximum.
+    :type    adaptive: bool or :py:class:`.AdaptiveLimit`
+    """
+
+    def __init__(self, func, items, workers=10, ordered=True, max_errors=None, progress=None,
+                 adaptive=None):
+        if adaptive is True:
+            adaptive = AdaptiveLimit(maximum=workers)
+        elif adaptive is False:
+            adaptive = None
+
+        self.func = func
+        self.items = items
+        self.workers = workers
+        self.ordered = ordered
+        self.max_errors = max_errors
+        self.progress = progress
+        self.adaptive = adaptive
+
+        self.done = 0
+        """Number of items processed so far."""
+
+        self.errors = 0
+        """Number of items where ``func`` raised an exception."""
+
+        self.cancelled = False
+        """If processing stopped because ``max_errors`` was reached."""
+
+    @property
+    def limit(self):
+        """Maximum number of items that are submitted but not yet returned."""
+        if self.adaptive is not None:
+            return min(self.adaptive.limit, self.workers)
+        return self.workers * 2
+
+    def _work(self, tasks, results):
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+
+            index, item = task
+            start = time.time()
+            try:
+                result = self.func(item)
+            except Exception as e:
+                result = e
+            results.put((index, item, result, time.time() - start))
+
+    def _start(self, tasks, results):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(tasks, results))
+            thread.daemon = True
+            thread.start()
+
+    def _completed(self, result, latency):
+        if self.adaptive is not None:
+            self.adaptive.update(latency, result)
+
+        self.done += 1
+        if isinstance(result, Exception):
+            self.errors += 1
+            if self.max_errors is not None and self.errors >= self.max_errors:
+                self.cancelled = True
+
+        if self.progress is not None:
+            self.progress(self.done, self.errors)
+
+    def __iter__(self):
+        tasks = Queue()
+        results = Queue()
+        items = iter(self.items)
+        exhausted = False
+
+        submitted = 0  # index of the next item
+        returned = 0  # number of results yielded so far
+        finished = {}  # results that are not yet returned in ordered mode
+
+        self._start(tasks, results)
+        try:
+            while True:
+                # submit new items while below the limit
+                while not exhausted and not self.cancelled and submitted - returned < self.limit:
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    tasks.put((submitted, item))
+                    submitted += 1
+
+                if returned == submitted:
+                    return
+
+                index, item, result, latency = results.get()
+                self._completed(result, latency)
+
+                if self.ordered:
+                    finished[index] = (item, result)
+                    while returned in finished:
+                        returned += 1
+                        yield finished.pop(returned - 1)
+                else:
+                    returned += 1
+                    yield item, result
+        finally:
+            for i in range(self.workers):
+                tasks.put(None)
+
+
+class BulkResult(object):
+    """The changes made by an operation on many users or groups.
+
+    Instances evaluate as True if no change failed. Users or groups that do not exist are not
+    considered a failure.
+
+    .. versionadded:: 0.6.2
+
+    :param kind: The type of the names, either ``"user"`` or ``"group"``.
+    :type  kind: str
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+
+        self.added = []
+        """Names of users or groups that were added."""
+
+        self.removed = []
+        """Names of users or groups that were removed."""
+
+        self.not_found = []
+        """Names of users or groups that do not exist or (when removing) are not a member."""
+
+        self.failed = {}
+        """Names of users or groups that could not be added or removed, mapped to the exception."""
+
+    def _record(self, name, result, changes):
+        """Record the result of adding or removing ``name``, append to ``changes`` on success."""
+        if isinstance(result, error.ResourceNotFound) and result.get_type() == self.kind:
+            self.not_found.append(name)
+        elif isinstance(result, Exception):
+            self.failed[name] = result
+        else:
+            changes.append(name)
+
+    def __bool__(self):
+        return not self.failed
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return '<BulkResult: %s added, %s removed, %s not found, %s failed>' % (
+            len(self.added), len(self.removed), len(self.not_found), len(self.failed))
+
+
+def _bulk(conn, func, names, kind, attr, workers=None):
+    """Call ``func`` for every name concurrently, consuming ``names`` as a stream.
+
+    Used by the bulk methods of :py:class:`.RestAuthUser` and :py:class:`.RestAuthGroup`, ``attr``
+    is the list of the :py:class:`.BulkResult` that successful calls are recorded in.
+    """
+    result = BulkResult(kind)
+    names = (getattr(n, 'name', n) for n in names)
+    for name, res in conn.map(func, names, ordered=False, workers=workers):
+        result._record(name, res, getattr(result, attr))
+    return result
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of RestAuthClient (https://python.restauth.net).
+#
+# RestAuthClient is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# RestAuthClient is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with RestAuthClient. If
+# not, see <http://www.gnu.org/licenses/>.
+
+"""Export group memberships as a sparse matrix.
+
+.. moduleauthor:: Mathias Ertl <mati@restauth.net>
+"""
+
+from array import array
+
+from RestAuthCommon import error
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.user import RestAuthUser
+
+
+class MembershipGraph(object):
+    """The memberships of all users in all groups in compressed sparse row (CSR) format.
+
+    Every group is a row and every user is a column of the matrix. The users that are members of
+    the group at row ``i`` are the columns ``indices[indptr[i]:indptr[i + 1]]``, sorted in
+    ascending order. ``users`` and ``groups`` map columns and rows to names. The index arrays are
+    instances of :py:class:`array.array` and can be used by NumPy and SciPy without copying:
+
+    .. code-block:: python
+
+       graph = MembershipGraph.fetch(conn)
+       matrix = graph.to_scipy()  # a scipy.sparse.csr_matrix
+       sizes = matrix.sum(axis=1)  # number of members of every group
+
+    .. versionadded:: 0.6.2
+
+    :param   users: The names of the users, in column order.
+    :type    users: list of str
+    :param  groups: The names of the groups, in row order.
+    :type   groups: list of str
+    :param  indptr: Offsets into ``indices`` for every row, with one additional element at the end.
+    :type   indptr: :py:class:`array.array`
+    :param indices: The columns of all memberships.
+    :type  indices: :py:class:`array.array`
+    """
+
+    typecode = 'i'
+    """Typecode of the index arrays. This is a signed integer, as expected by SciPy."""
+
+    def __init__(self, users, groups, indptr, indices):
+        self.users = users
+        self.groups = groups
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def fetch(cls, conn, workers=None):
+        """Fetch all users, groups and memberships.
+
+        The members of all groups are fetched concurrently with :py:meth:`.RestAuthConnection.map`.
+        Memberships include members inherited from meta-groups, just like
+        :py:meth:`.RestAuthGroup.get_members`.
+
+        :param    conn: A connection to a RestAuth service.
+        :type     conn: :py:class:`.RestAuthConnection`
+        :param workers: Number of concurrent requests, the default is the ``pool_size`` of
+            ``conn``.
+        :type  workers: int
+        :rtype: :py:class:`.MembershipGraph`
+        """
+        users = sorted(RestAuthUser.get_all(conn, flat=True))
+        groups = []
+        columns = dict((name, i) for i, name in enumerate(users))
+        indptr = array(cls.typecode, [0])
+        indices = array(cls.typecode)
+
+        def fetch(name):
+            return RestAuthGroup(conn, name).get_members(flat=True)
+
+        names = sorted(RestAuthGroup.get_all(conn, flat=True))
+        for name, members in conn.map(fetch, names, workers=workers):
+            if isinstance(members, error.ResourceNotFound):
+                continue  # removed in the meantime
+            elif isinstance(members, Exception):
+                raise members
+
+            row = []
+            for member in members:
+                if member not in columns:  # created in the meantime
+                    columns[member] = len(users)
+                    users.append(member)
+                row.append(columns[member])
+
+            groups.append(name)
+            indices.extend(sorted(row))
+            indptr.append(len(indices))
+        return cls(users, groups, indptr, indices)
+
+    @property
+    def shape(self):
+        """A tuple of the number of groups and the number of users."""
+        return len(self.groups), len(self.users)
+
+    def __len__(self):
+        """The number of memberships."""
+        return len(self.indices)
+
+    def get_members(self, group):
+        """Get the members of a group.
+
+        :param group: The index of the group (the row).
+        :type  group: int
+        :return: The names of the members.
+        :rtype: list of str
+        """
+        start, end = self.indptr[group], self.indptr[group + 1]
+        return [self.users[i] for i in self.indices[start:end]]
+
+    def to_numpy(self):
+        """Get the index arrays as NumPy arrays.
+
+        The NumPy arrays share memory with :py:attr:`.indptr` and :py:attr:`.indices`.
+
+        :return: A tuple of ``indptr`` and ``indices``.
+        :rtype: tuple of :py:class:`numpy.ndarray`
+        :raise ImportError: If NumPy is not installed.
+        """
+        import numpy
+
+        dtype = numpy.dtype('i%s' % self.indices.itemsize)
+        return numpy.frombuffer(self.indptr, dtype=dtype), \
+            numpy.frombuffer(self.indices, dtype=dtype)
+
+    def to_scipy(self):
+        """Get the memberships as SciPy sparse matrix.
+
+        The index arrays of the matrix share memory with :py:attr:`.indptr` and
+        :py:attr:`.indices`, all values are ``True``.
+
+        :rtype: :py:class:`scipy.sparse.csr_matrix`
+        :raise ImportError: If NumPy or SciPy are not installed.
+        """
+        import numpy
+        from scipy.sparse import csr_matrix
+
+        indptr, indices = self.to_numpy()
+        data = numpy.ones(len(indices), dtype=bool)
+        return csr_matrix((data, indices, indptr), shape=self.shape, copy=False)
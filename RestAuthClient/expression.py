@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of RestAuthClient (https://python.restauth.net).
+#
+# RestAuthClient is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# RestAuthClient is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with RestAuthClient. If
+# not, see <http://www.gnu.org/licenses/>.
+
+"""Union, intersection and difference of the members of groups.
+
+.. moduleauthor:: Mathias Ertl <mati@restauth.net>
+"""
+
+from RestAuthClient.group import RestAuthGroup
+
+
+class GroupExpression(object):
+    """Base class for expressions over the members of groups.
+
+    Expressions are combined with the ``|`` (union), ``&`` (intersection) and ``-`` (difference)
+    operators. The right operand may also be a :py:class:`.RestAuthGroup` or the name of a group.
+    Expressions usually start with :py:meth:`.RestAuthConnection.members_of`:
+
+    .. code-block:: python
+
+       vpn = conn.members_of('vpn')
+       (vpn - 'employees').evaluate()  # users in "vpn" but not in "employees"
+       for name in vpn & 'A' & 'B':  # stream members of "vpn", "A" and "B"
+           ...
+
+    The members of all groups in an expression are fetched concurrently. Fetching stops early if
+    the result is known to be empty, e.g. because one operand of an intersection has no members.
+
+    .. versionadded:: 0.6.2
+    """
+
+    conn = None
+
+    def _operand(self, other):
+        if isinstance(other, GroupExpression):
+            return other
+        return Members(self.conn, getattr(other, 'name', other))
+
+    def __or__(self, other):
+        return Union(self, self._operand(other))
+
+    def __and__(self, other):
+        return Intersection(self, self._operand(other))
+
+    def __sub__(self, other):
+        return Difference(self, self._operand(other))
+
+    @property
+    def groups(self):
+        """The names of all groups used in this expression, in order of appearance."""
+        names = []
+        for name in self._groups():
+            if name not in names:
+                names.append(name)
+        return names
+
+    def _fetch(self, workers=None):
+        """Fetch the members of all groups, stop if the result is known to be empty."""
+        def fetch(name):
+            return RestAuthGroup(self.conn, name).get_members(flat=True)
+
+        members = {}
+        results = iter(self.conn.map(fetch, self.groups, ordered=False, workers=workers))
+        try:
+            for name, result in results:
+                if isinstance(result, Exception):
+                    raise result
+                members[name] = frozenset(result)
+                if self._empty(members):
+                    break
+        finally:
+            results.close()
+        return members
+
+    def evaluate(self, workers=None):
+        """Fetch the members of all groups and evaluate the expression.
+
+        :param workers: Number of concurrent requests, the default is the ``pool_size`` of the
+            connection.
+        :type  workers: int
+        :return: The names of all users matched by the expression.
+        :rtype: set of str
+        :raise ResourceNotFound: If a group does not exist.
+        """
+        members = self._fetch(workers=workers)
+        if self._empty(members):
+            return set()
+        return set(self._set(members))
+
+    def iterate(self, workers=None):
+        """Like :py:meth:`.evaluate`, but yield names instead of building a set of the result.
+
+        Iterating over an expression is the same as calling this method without parameters.
+
+        :param workers: Number of concurrent requests, the default is the ``pool_size`` of the
+            connection.
+        :type  workers: int
+        """
+        members = self._fetch(workers=workers)
+        if self._empty(members):
+            return iter(())
+        return self._iter(members)
+
+    def __iter__(self):
+        return self.iterate()
+
+
+class Members(GroupExpression):
+    """The members of a single group.
+
+    :param conn: A connection to a RestAuth service.
+    :type  conn: :py:class:`.RestAuthConnection`
+    :param group: The group or the name of the group.
+    :type  group: str or :py:class:`.RestAuthGroup`
+    """
+
+    def __init__(self, conn, group):
+        self.conn = conn
+        self.name = getattr(group, 'name', group)
+
+    def _groups(self):
+        return [self.name]
+
+    def _empty(self, members):
+        return self.name in members and not members[self.name]
+
+    def _set(self, members):
+        return members[self.name]
+
+    def _iter(self, members):
+        return iter(members[self.name])
+
+    def __repr__(self):
+        return 'Members(%r)' % self.name
+
+
+class Operation(GroupExpression):
+    """Base class for expressions combining other expressions."""
+
+    symbol = None
+    associative = True
+
+    def __init__(self, *operands):
+        # flatten (a | b) | c into a single union, (a - b) - c into a - b - c
+        self.operands = []
+        for i, operand in enumerate(operands):
+            if type(operand) is type(self) and (self.associative or i == 0):
+                self.operands += operand.operands
+            else:
+                self.operands.append(operand)
+        self.conn = self.operands[0].conn
+
+    def _groups(self):
+        return [name for operand in self.operands for name in operand._groups()]
+
+    def __repr__(self):
+        return '(%s)' % (' %s ' % self.symbol).join(repr(o) for o in self.operands)
+
+
+class Union(Operation):
+    """Users that are a member of at least one operand."""
+
+    symbol = '|'
+
+    def _empty(self, members):
+        return all(operand._empty(members) for operand in self.operands)
+
+    def _set(self, members):
+        return frozenset().union(*[operand._set(members) for operand in self.operands])
+
+    def _iter(self, members):
+        seen = set()
+        for operand in self.operands:
+            for name in operand._iter(members):
+                if name not in seen:
+                    seen.add(name)
+                    yield name
+
+
+class Intersection(Operation):
+    """Users that are a member of all operands."""
+
+    symbol = '&'
+
+    def _empty(self, members):
+        return any(operand._empty(members) for operand in self.operands)
+
+    def _sets(self, members):
+        return sorted((operand._set(members) for operand in self.operands), key=len)
+
+    def _set(self, members):
+        sets = self._sets(members)
+        result = sets[0]
+        for other in sets[1:]:
+            if not result:
+                break
+            result = result & other
+        return result
+
+    def _iter(self, members):
+        sets = self._sets(members)
+        return (name for name in sets[0] if all(name in other for other in sets[1:]))
+
+
+class Difference(Operation):
+    """Users that are a member of the first operand but of none of the other operands."""
+
+    symbol = '-'
+    associative = False
+
+    def _empty(self, members):
+        return self.operands[0]._empty(members)
+
+    def _exclude(self, members):
+        return frozenset().union(*[operand._set(members) for operand in self.operands[1:]])
+
+    def _set(self, members):
+        return self.operands[0]._set(members) - self._exclude(members)
+
+    def _iter(self, members):
+        exclude = self._exclude(members)
+        return (name for name in self.operands[0]._iter(members) if name not in exclude)
@@ -20,8 +20,11 @@
 
 import sys
 
+from RestAuthClient.error import CircuitOpen
 from RestAuthClient.error import GroupExists
 from RestAuthClient.error import UnknownStatus
+from RestAuthClient.executor import BulkResult
+from RestAuthClient.executor import _bulk
 
 from RestAuthCommon import error
 
@@ -110,6 +113,9 @@ class RestAuthGroup(object):
             user = user.name
 
         resp = self.post('/groups/%s/users/' % self.quote(self.name), {'user': user})
+        if self.conn.cache is not None:
+            self.conn.cache.invalidate_memberships(user)
+
         if resp.status == http.NO_CONTENT:
             return
         elif resp.status == http.NOT_FOUND:
@@ -136,6 +142,9 @@ class RestAuthGroup(object):
             group = group.name
 
         resp = self.post('/groups/%s/groups/' % self.quote(self.name), {'group': group})
+        if self.conn.cache is not None:  # members are inherited by sub-groups
+            self.conn.cache.invalidate_memberships()
+
         if resp.status == http.NO_CONTENT:
             return
         elif resp.status == http.NOT_FOUND:
@@ -191,6 +200,9 @@ class RestAuthGroup(object):
             group = group.name
 
         resp = self.delete('/groups/%s/groups/%s/' % (self.quote(self.name), self.quote(group)))
+        if self.conn.cache is not None:
+            self.conn.cache.invalidate_memberships()
+
         if resp.status == http.NO_CONTENT:
             return
         elif resp.status == http.NOT_FOUND:
@@ -208,6 +220,9 @@ class RestAuthGroup(object):
         :raise UnknownStatus: If the response status is unknown.
         """
         resp = self.delete('/groups/%s/' % self.quote(self.name))
+        if self.conn.cache is not None:
+            self.conn.cache.invalidate_memberships()
+
         if resp.status == http.NO_CONTENT:
             return
         elif resp.status == http.NOT_FOUND:
@@ -232,11 +247,28 @@ class RestAuthGroup(object):
         if hasattr(user, 'name'):
             user = user.name
 
-        resp = self.get('/groups/%s/users/%s/' % (self.quote(self.name), self.quote(user)))
+        cache = self.conn.cache
+        if cache is not None:
+            member = cache.get_membership(self.name, user)
+            if member is not None:
+                return member
+
+        try:
+            resp = self.get('/groups/%s/users/%s/' % (self.quote(self.name), self.quote(user)))
+        except CircuitOpen:
+            member = None if cache is None else cache.get_membership(self.name, user, stale=True)
+            if member is None:
+                raise
+            return member
+
         if resp.status == http.NO_CONTENT:
+            if cache is not None:
+                cache.set_membership(self.name, user, True)
             return True
         elif resp.status == http.NOT_FOUND:
             if resp.getheader('Resource-Type') == 'user':
+                if cache is not None:
+                    cache.set_membership(self.name, user, False)
                 return False
             else:
                 raise error.ResourceNotFound(resp)
@@ -256,6 +288,9 @@ class RestAuthGroup(object):
             user = user.name
 
         resp = self.delete('/groups/%s/users/%s/' % (self.quote(self.name), self.quote(user)))
+        if self.conn.cache is not None:
+            self.conn.cache.invalidate_memberships(user)
+
         if resp.status == http.NO_CONTENT:
             return
         elif resp.status == http.NOT_FOUND:
@@ -263,6 +298,124 @@ class RestAuthGroup(object):
         else:  # pragma: no cover
             raise UnknownStatus(resp)
 
+    def _apply(self, add, remove, current, names, kind, workers):
+        """Add and remove names concurrently so that ``current`` becomes ``names``."""
+        names = set(getattr(n, 'name', n) for n in names)
+        current = set(current)
+        changes = [(add, n) for n in sorted(names - current)]
+        changes += [(remove, n) for n in sorted(current - names)]
+
+        result = BulkResult(kind)
+        for (func, name), res in self.conn.map(lambda c: c[0](c[1]), changes, ordered=False,
+                                               workers=workers):
+            result._record(name, res, result.added if func == add else result.removed)
+        return result
+
+    def add_users(self, users, workers=None):
+        """Add many users to this group.
+
+        Users are added concurrently with :py:meth:`.RestAuthConnection.map`. ``users`` may be any
+        iterable, including a generator, and is consumed only as fast as users are added.
+
+        .. versionadded:: 0.6.2
+
+        :param   users: The users or names of the users to add.
+        :type    users: iterable of :py:class:`.RestAuthUser` or str
+        :param workers: Number of concurrent requests, the default is the ``pool_size`` of the
+            connection.
+        :type  workers: int
+        :return: The users that were added, that do not exist and that could not be added for
+            other reasons (e.g. because this group does not exist).
+        :rtype: :py:class:`~.executor.BulkResult`
+        """
+        return _bulk(self.conn, self.add_user, users, 'user', 'added', workers)
+
+    def remove_users(self, users, workers=None):
+        """Remove many users from this group.
+
+        This works like :py:meth:`.add_users`. Users that are not a member of this group are
+        reported as not found.
+
+        .. versionadded:: 0.6.2
+
+        :param   users: The users or names of the users to remove.
+        :type    users: iterable of :py:class:`.RestAuthUser` or str
+        :param workers: Number of concurrent requests, the default is the ``pool_size`` of the
+            connection.
+        :type  workers: int
+        :return: The users that were removed, that do not exist or are not a member and that could
+            not be removed for other reasons.
+        :rtype: :py:class:`~.executor.BulkResult`
+        """
+        return _bulk(self.conn, self.remove_user, users, 'user', 'removed', workers)
+
+    def set_members(self, users, workers=None):
+        """Set the members of this group.
+
+        The current members are fetched once and only users that are not yet a member are added
+        and only members that are not in ``users`` are removed. All changes are applied
+        concurrently with :py:meth:`.RestAuthConnection.map`.
+
+        Members inherited from a meta-group are not direct members of this group: They are added
+        if they are in ``users`` and otherwise left alone, since they can only be removed from the
+        meta-group. A user that is both a direct and an inherited member is treated as inherited.
+
+        .. versionadded:: 0.6.2
+
+        :param   users: The users or names of the users that should be members of this group.
+        :type    users: iterable of :py:class:`.RestAuthUser` or str
+        :param workers: Number of concurrent requests, the default is the ``pool_size`` of the
+            connection.
+        :type  workers: int
+        :return: The users that were added and removed, that do not exist and that could not be
+            added or removed for other reasons.
+        :rtype: :py:class:`~.executor.BulkResult`
+
+        :raise ResourceNotFound: If the group does not exist.
+        """
+        members = set(self.get_members(flat=True))
+        if members:
+            members -= self._inherited(workers)
+        return self._apply(self.add_user, self.remove_user, members, users, 'user', workers)
+
+    def _inherited(self, workers):
+        """Get the members this group inherits from its meta-groups."""
+        from RestAuthClient.hierarchy import GroupHierarchy
+
+        ancestors = GroupHierarchy(self.conn, workers=workers).ancestors(self.name)
+        ancestors = [g for g in ancestors if g != self.name]  # the group may be part of a cycle
+
+        def fetch(name):
+            return RestAuthGroup(self.conn, name).get_members(flat=True)
+
+        inherited = set()
+        for name, members in self.conn.map(fetch, ancestors, workers=workers):
+            if isinstance(members, Exception):
+                raise members
+            inherited.update(members)
+        return inherited
+
+    def set_subgroups(self, groups, workers=None):
+        """Set the sub-groups of this group.
+
+        This works like :py:meth:`.set_members`, but for sub-groups.
+
+        .. versionadded:: 0.6.2
+
+        :param  groups: The groups or names of the groups that should be sub-groups of this group.
+        :type   groups: iterable of :py:class:`.RestAuthGroup` or str
+        :param workers: Number of concurrent requests, the default is the ``pool_size`` of the
+            connection.
+        :type  workers: int
+        :return: The groups that were added and removed, that do not exist and that could not be
+            added or removed for other reasons.
+        :rtype: :py:class:`~.executor.BulkResult`
+
+        :raise ResourceNotFound: If the group does not exist.
+        """
+        return self._apply(self.add_group, self.remove_group, self.get_groups(flat=True), groups,
+                           'group', workers)
+
     @classmethod
     def create(cls, conn, name):
         """Factory method that creates a *new* group in RestAuth.
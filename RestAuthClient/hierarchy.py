@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of RestAuthClient (https://python.restauth.net).
+#
+# RestAuthClient is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# RestAuthClient is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with RestAuthClient. If
+# not, see <http://www.gnu.org/licenses/>.
+
+"""Resolve nested groups.
+
+.. moduleauthor:: Mathias Ertl <mati@restauth.net>
+"""
+
+import threading
+
+from RestAuthCommon import error
+from RestAuthClient.group import RestAuthGroup
+
+
+class GroupHierarchy(object):
+    """The graph of groups and their sub-groups.
+
+    Members of a group are also members of all its sub-groups, so this class answers questions
+    that otherwise require crawling one level of sub-groups after the other. The graph is loaded
+    on demand, one level at a time, where all groups of a level are fetched concurrently with
+    :py:meth:`.RestAuthConnection.map`. Groups that are already known are never fetched again,
+    until :py:meth:`.refresh` is called:
+
+    .. code-block:: python
+
+       hierarchy = GroupHierarchy(conn)
+       hierarchy.descendants('admins')  # loads 'admins' and all its sub-groups
+       hierarchy.effective_groups('foobar')  # only loads groups not seen before
+
+    Unlike the server, the hierarchy tolerates cycles (see :py:meth:`.cycles`).
+
+    .. versionadded:: 0.6.2
+
+    :param    conn: A connection to a RestAuth service.
+    :type     conn: :py:class:`.RestAuthConnection`
+    :param workers: Number of concurrent requests, the default is the ``pool_size`` of ``conn``.
+    :type  workers: int
+    """
+
+    def __init__(self, conn, workers=None):
+        self.conn = conn
+        self.workers = workers
+
+        self._lock = threading.RLock()
+        self._load_lock = threading.RLock()  # serializes loading all groups
+        self._subgroups = {}  # group -> frozenset of sub-groups
+        self._metagroups = {}  # group -> set of groups that have group as sub-group
+        self._complete = False  # if all groups are loaded
+        self._descendants = {}
+        self._ancestors = {}
+
+    @property
+    def groups(self):
+        """Names of all groups loaded so far."""
+        return set(self._subgroups)
+
+    def __contains__(self, group):
+        return getattr(group, 'name', group) in self._subgroups
+
+    def _fetch(self, name):
+        return RestAuthGroup(self.conn, name).get_groups(flat=True)
+
+    def _map(self, names):
+        """Fetch the direct sub-groups of ``names``, groups that do not exist are ``None``."""
+        results = {}
+        for name, result in self.conn.map(self._fetch, names, workers=self.workers):
+            if isinstance(result, error.ResourceNotFound):
+                results[name] = None
+            elif isinstance(result, Exception):
+                raise result
+            else:
+                results[name] = frozenset(result)
+        return results
+
+    def _set(self, name, subgroups):
+        """Update the sub-groups of a group, return the names of groups that changed."""
+        old = self._subgroups.get(name)
+        if old == subgroups:
+            return set()
+
+        changed = set([name])
+        for sub in old or ():
+            self._metagroups[sub].discard(name)
+        if subgroups is None:
+            del self._subgroups[name]
+            for meta in self._metagroups.pop(name, ()):
+                self._subgroups[meta] = self._subgroups[meta] - set([name])
+                changed.add(meta)
+        else:
+            self._subgroups[name] = subgroups
+            self._metagroups.setdefault(name, set())
+            for sub in subgroups:
+                self._metagroups.setdefault(sub, set()).add(name)
+
+        self._descendants = {}
+        self._ancestors = {}
+        return changed
+
+    def _update(self, names):
+        """Fetch ``names`` and all sub-groups not loaded yet, level by level."""
+        changed = set()
+        level = set(names)
+        while level:
+            results = self._map(level)
+            with self._lock:
+                for name, subs in results.items():
+                    changed |= self._set(name, subs)
+                level = set(sub for subs in results.values() for sub in subs or ()
+                            if sub not in self._subgroups)
+        return changed
+
+    def load(self, groups=None):
+        """Load groups and all their sub-groups.
+
+        :param groups: The groups to load. If omitted, all groups are loaded.
+        :type  groups: list of str or :py:class:`.RestAuthGroup`
+        """
+        if groups is None:
+            with self._load_lock:
+                groups = RestAuthGroup.get_all(self.conn, flat=True)
+                self._update([g for g in groups if g not in self._subgroups])
+                self._complete = True  # only once all groups are loaded
+            return
+
+        self._update([getattr(g, 'name', g) for g in groups
+                      if getattr(g, 'name', g) not in self._subgroups])
+
+    def _load_all(self):
+        """Load all groups unless they are loaded already, concurrent callers wait."""
+        if not self._complete:
+            with self._load_lock:
+                if not self._complete:
+                    self.load()
+
+    def refresh(self, groups=None):
+        """Fetch the sub-groups of known groups again.
+
+        New sub-groups are loaded as well and groups that no longer exist are removed. If all
+        groups were loaded before, new groups are loaded too.
+
+        :param groups: Only refresh these groups. If omitted, all known groups are refreshed.
+        :type  groups: list of str or :py:class:`.RestAuthGroup`
+        :return: The names of groups that were added, removed or where sub-groups changed.
+        :rtype: set of str
+        """
+        if groups is not None:
+            return self._update([getattr(g, 'name', g) for g in groups])
+
+        names = set(self._subgroups)
+        if self._complete:
+            names |= set(RestAuthGroup.get_all(self.conn, flat=True))
+        return self._update(names)
+
+    def subgroups(self, group):
+        """Get the direct sub-groups of a group.
+
+        :param group: The group or the name of the group.
+        :type  group: str or :py:class:`.RestAuthGroup`
+        :rtype: frozenset of str
+        """
+        group = getattr(group, 'name', group)
+        self.load([group])
+        return self._subgroups.get(group, frozenset())
+
+    def descendants(self, group):
+        """Get all groups that inherit the members of a group.
+
+        If the group is part of a cycle, the group itself is included. Groups that do not exist
+        have no descendants.
+
+        :param group: The group or the name of the group.
+        :type  group: str or :py:class:`.RestAuthGroup`
+        :rtype: frozenset of str
+        """
+        group = getattr(group, 'name', group)
+        self.load([group])
+        with self._lock:
+            if group not in self._descendants:
+                self._descendants[group] = self._walk(group, self._subgroups)
+            return self._descendants[group]
+
+    def ancestors(self, group):
+        """Get all groups whose members are inherited by a group.
+
+        This requires all groups to be loaded, which is done automatically if necessary.
+
+        :param group: The group or the name of the group.
+        :type  group: str or :py:class:`.RestAuthGroup`
+        :rtype: frozenset of str
+        """
+        group = getattr(group, 'name', group)
+        self._load_all()
+        with self._lock:
+            if group not in self._ancestors:
+                self._ancestors[group] = self._walk(group, self._metagroups)
+            return self._ancestors[group]
+
+    def _walk(self, group, edges):
+        seen = set()
+        stack = [group]
+        while stack:
+            for name in edges.get(stack.pop(), ()):
+                if name not in seen:
+                    seen.add(name)
+                    stack.append(name)
+        return frozenset(seen)
+
+    def effective_groups(self, user, groups=None):
+        """Get all groups a user is a member of, directly or inherited.
+
+        :param   user: The user or the name of the user.
+        :type    user: str or :py:class:`.RestAuthUser`
+        :param groups: The groups the user is a direct member of. If omitted, they are fetched
+            with :py:meth:`.RestAuthGroup.get_all`.
+        :type  groups: list of str
+        :rtype: set of str
+        :raise ResourceNotFound: If the user does not exist.
+        """
+        if groups is None:
+            groups = RestAuthGroup.get_all(self.conn, user=user, flat=True)
+
+        self.load(groups)
+        effective = set(groups)
+        for group in groups:
+            effective |= self.descendants(group)
+        return effective
+
+    def is_member(self, user, group, groups=None):
+        """Check if a user is a member of a group, directly or inherited.
+
+        :param   user: The user or the name of the user.
+        :type    user: str or :py:class:`.RestAuthUser`
+        :param  group: The group or the name of the group.
+        :type   group: str or :py:class:`.RestAuthGroup`
+        :param groups: Passed to :py:meth:`.effective_groups`.
+        :rtype: bool
+        """
+        return getattr(group, 'name', group) in self.effective_groups(user, groups=groups)
+
+    def cycles(self):
+        """Find cycles in the loaded groups.
+
+        :return: A list of cycles, each being a sorted list of the names of all groups in the
+            cycle. A group that is a sub-group of itself is a cycle as well.
+        :rtype: list of lists
+        """
+        # Tarjan's algorithm for strongly connected components, without recursion
+        with self._lock:
+            index = {}
+            lowlink = {}
+            stack = []
+            on_stack = set()
+            cycles = []
+
+            for root in sorted(self._subgroups):
+                if root in index:
+                    continue
+
+                work = [(root, iter(sorted(self._subgroups[root])))]
+                index[root] = lowlink[root] = len(index)
+                stack.append(root)
+                on_stack.add(root)
+
+                while work:
+                    node, children = work[-1]
+                    for child in children:
+                        if child not in index:
+                            index[child] = lowlink[child] = len(index)
+                            stack.append(child)
+                            on_stack.add(child)
+                            work.append((child, iter(sorted(self._subgroups.get(child, ())))))
+                            break
+                        elif child in on_stack:
+                            lowlink[node] = min(lowlink[node], index[child])
+                    else:
+                        work.pop()
+                        if work:
+                            parent = work[-1][0]
+                            lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+                        if lowlink[node] == index[node]:
+                            component = []
+                            while True:
+                                name = stack.pop()
+                                on_stack.discard(name)
+                                component.append(name)
+                                if name == node:
+                                    break
+                            if len(component) > 1 or node in self._subgroups.get(node, ()):
+                                cycles.append(sorted(component))
+            return cycles
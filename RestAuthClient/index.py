@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of RestAuthClient (https://python.restauth.net).
+#
+# RestAuthClient is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# RestAuthClient is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with RestAuthClient. If
+# not, see <http://www.gnu.org/licenses/>.
+
+"""A local copy of all group memberships.
+
+.. moduleauthor:: Mathias Ertl <mati@restauth.net>
+"""
+
+import threading
+import time
+
+from array import array
+from bisect import bisect_left
+
+from RestAuthCommon import error
+from RestAuthClient.group import RestAuthGroup
+
+
+def _contains(ids, value):
+    i = bisect_left(ids, value)
+    return i < len(ids) and ids[i] == value
+
+
+class MembershipIndex(object):
+    """An in-memory index of the members of all groups.
+
+    The index answers membership questions without any requests. It is filled by
+    :py:meth:`.refresh`, which fetches the members of all groups concurrently with
+    :py:meth:`.RestAuthConnection.map`. Memberships include members inherited from meta-groups,
+    just like :py:meth:`.RestAuthGroup.get_members`.
+
+    Users and groups are stored as integer IDs, every group has a sorted array of the IDs of its
+    members and every user has a sorted array of the IDs of its groups. A membership thus uses
+    eight bytes and lookups are a binary search:
+
+    .. code-block:: python
+
+       index = MembershipIndex(conn, interval=300)  # refresh every five minutes
+       index.refresh()
+       if index.is_member('foobar', 'admins'):
+           ...
+
+    .. versionadded:: 0.6.2
+
+    :param     conn: A connection to a RestAuth service.
+    :type      conn: :py:class:`.RestAuthConnection`
+    :param interval: Call :py:meth:`.refresh` every ``interval`` seconds.
+    :type  interval: float
+    :param  workers: Number of concurrent requests, the default is the ``pool_size`` of ``conn``.
+    :type   workers: int
+    """
+
+    def __init__(self, conn, interval=None, workers=None):
+        self.conn = conn
+        self.interval = interval
+        self.workers = workers
+
+        self.refreshed = None
+        """Timestamp of the last successful refresh."""
+
+        self.error = None
+        """The exception raised by the last periodic refresh, if it failed."""
+
+        self._lock = threading.RLock()
+        self._user_ids = {}
+        self._users = []
+        self._group_ids = {}
+        self._groups = []
+        self._members = {}  # group ID -> array of user IDs
+        self._memberships = {}  # user ID -> array of group IDs
+
+        self._timer = None
+        if interval:
+            self._schedule()
+
+    def _intern(self, ids, names, name):
+        value = ids.get(name)
+        if value is None:
+            value = ids[name] = len(names)
+            names.append(name)
+        return value
+
+    def _fetch(self, name):
+        return RestAuthGroup(self.conn, name).get_members(flat=True)
+
+    def _set(self, group, members):
+        """Set the members of a group, return True if they changed."""
+        gid = self._intern(self._group_ids, self._groups, group)
+        old = self._members.get(gid)
+        if members is None:
+            new = None
+        else:
+            new = array('I', sorted(set(
+                self._intern(self._user_ids, self._users, user) for user in members)))
+        if old == new:
+            return False
+
+        old_ids = set(old or ())
+        new_ids = set(new or ())
+        for uid in old_ids - new_ids:
+            groups = self._memberships[uid]
+            del groups[bisect_left(groups, gid)]
+        for uid in new_ids - old_ids:
+            groups = self._memberships.setdefault(uid, array('I'))
+            groups.insert(bisect_left(groups, gid), gid)
+
+        if new is None:
+            del self._members[gid]
+        else:
+            self._members[gid] = new
+        return True
+
+    def refresh(self, groups=None):
+        """Fetch the members of groups.
+
+        :param groups: Only refresh these groups. If omitted, all groups are fetched and groups
+            that no longer exist are removed from the index.
+        :type  groups: list of str or :py:class:`.RestAuthGroup`
+        :return: The names of groups that were added, removed or where members changed.
+        :rtype: set of str
+        """
+        if groups is None:
+            names = RestAuthGroup.get_all(self.conn, flat=True)
+            with self._lock:
+                removed = set(self._groups[gid] for gid in self._members) - set(names)
+        else:
+            names = [getattr(g, 'name', g) for g in groups]
+            removed = set()
+
+        changed = set()
+        results = self.conn.map(self._fetch, names, ordered=False, workers=self.workers)
+        for name, result in results:
+            if isinstance(result, error.ResourceNotFound):
+                removed.add(name)
+            elif isinstance(result, Exception):
+                raise result
+            else:
+                with self._lock:
+                    if self._set(name, result):
+                        changed.add(name)
+
+        with self._lock:
+            for name in removed:
+                if self._set(name, None):
+                    changed.add(name)
+        self.refreshed = time.time()
+        return changed
+
+    def close(self):
+        """Stop refreshing the index periodically."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _schedule(self):
+        self._timer = threading.Timer(self.interval, self._periodic_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _periodic_refresh(self):
+        try:
+            self.refresh()
+            self.error = None
+        except Exception as e:  # keep the old data
+            self.error = e
+        finally:
+            if self._timer is not None:
+                self._schedule()
+
+    @property
+    def users(self):
+        """Names of all users that are a member of at least one group."""
+        with self._lock:
+            return [self._users[uid] for uid, groups in self._memberships.items() if groups]
+
+    @property
+    def groups(self):
+        """Names of all groups in the index."""
+        with self._lock:
+            return [self._groups[gid] for gid in self._members]
+
+    def __len__(self):
+        """The number of memberships in the index."""
+        with self._lock:
+            return sum(len(members) for members in self._members.values())
+
+    def is_member(self, user, group):
+        """Check if a user is a member of a group.
+
+        :param  user: The user or the name of the user.
+        :type   user: str or :py:class:`.RestAuthUser`
+        :param group: The group or the name of the group.
+        :type  group: str or :py:class:`.RestAuthGroup`
+        :return: True if the user is a member, False if not or if the group is not in the index.
+        :rtype: bool
+        """
+        uid = self._user_ids.get(getattr(user, 'name', user))
+        gid = self._group_ids.get(getattr(group, 'name', group))
+        if uid is None or gid is None:
+            return False
+        return _contains(self._members.get(gid, ()), uid)
+
+    def get_groups(self, user):
+        """Get the groups of a user.
+
+        :param user: The user or the name of the user.
+        :type  user: str or :py:class:`.RestAuthUser`
+        :return: The names of the groups, in no particular order.
+        :rtype: list of str
+        """
+        uid = self._user_ids.get(getattr(user, 'name', user))
+        with self._lock:
+            return [self._groups[gid] for gid in self._memberships.get(uid, ())]
+
+    def get_members(self, group):
+        """Get the members of a group.
+
+        :param group: The group or the name of the group.
+        :type  group: str or :py:class:`.RestAuthGroup`
+        :return: The names of the members, in no particular order.
+        :rtype: list of str
+        """
+        gid = self._group_ids.get(getattr(group, 'name', group))
+        members = self._members.get(gid, ())
+        return [self._users[uid] for uid in members]
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of RestAuthClient (https://python.restauth.net).
+#
+# RestAuthClient is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# RestAuthClient is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with RestAuthClient. If
+# not, see <http://www.gnu.org/licenses/>.
+
+"""Resumable bulk operations on many users or groups.
+
+.. moduleauthor:: Mathias Ertl <mati@restauth.net>
+"""
+
+import itertools
+import json
+import os
+import time
+
+from RestAuthCommon import error
+from RestAuthClient.error import GroupExists
+from RestAuthClient.error import HttpException
+from RestAuthClient.error import UserExists
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.user import RestAuthUser
+
+
+def _name(item):
+    if isinstance(item, (tuple, list)):
+        return item[0]
+    return getattr(item, 'name', item)
+
+
+def create_user(conn, item):
+    """Create a user, do nothing if the user already exists.
+
+    ``item`` is either the name of the user or a tuple of the name, password and properties.
+    """
+    args = tuple(item[1:]) if isinstance(item, (tuple, list)) else ()
+    try:
+        RestAuthUser.create(conn, _name(item), *args)
+    except UserExists:
+        pass
+
+
+def remove_user(conn, item):
+    """Remove a user, do nothing if the user does not exist."""
+    try:
+        RestAuthUser(conn, _name(item)).remove()
+    except error.ResourceNotFound:
+        pass
+
+
+def create_group(conn, item):
+    """Create a group, do nothing if the group already exists."""
+    try:
+        RestAuthGroup.create(conn, _name(item))
+    except GroupExists:
+        pass
+
+
+def remove_group(conn, item):
+    """Remove a group, do nothing if the group does not exist."""
+    try:
+        RestAuthGroup(conn, _name(item)).remove()
+    except error.ResourceNotFound:
+        pass
+
+
+class BulkJob(object):
+    """Apply an operation to many users or groups and record the progress in a checkpoint file.
+
+    Items are processed concurrently with :py:meth:`.RestAuthConnection.map`. After every
+    ``batch_size`` items, the position in ``items`` is appended to the checkpoint file. If a job
+    is interrupted, a new job with the same checkpoint file and the same ``items`` (in the same
+    order) continues at the last recorded position:
+
+    .. code-block:: python
+
+       users = ((name, password, {'email': email}) for name, password, email in read_csv())
+       job = BulkJob(conn, 'create_user', users, 'import.checkpoint', total=1000000,
+                     progress=lambda job: print('%.1f/s, ETA %ss' % (job.rate, job.eta)))
+       job.run()
+
+    The operations ``"create_user"``, ``"remove_user"``, ``"create_group"`` and ``"remove_group"``
+    are idempotent: A user or group that already exists (or is already gone) counts as success, so
+    items processed again after an interruption do not fail. Note that properties of users that
+    already exist are not updated. ``operation`` may also be any callable that takes the
+    connection and an item.
+
+    An item that fails is recorded in :py:attr:`.failed` and the job continues. If the RestAuth
+    service is unreachable (:py:exc:`.HttpException`) or returns HTTP status code 500, the job
+    records the position of the last item processed before and raises the exception.
+
+    .. versionadded:: 0.6.2
+
+    :param       conn: A connection to a RestAuth service.
+    :type        conn: :py:class:`.RestAuthConnection`
+    :param  operation: The name of an operation or a callable.
+    :type   operation: str or callable
+    :param      items: The names of users or groups (``"create_user"`` also accepts tuples of the
+        name, password and properties). Any iterable can be used, including a generator.
+    :type       items: iterable
+    :param checkpoint: The path of the checkpoint file, created if it does not exist.
+    :type  checkpoint: str
+    :param      total: The number of items, used to calculate :py:attr:`.eta`. The default is
+        ``len(items)`` if ``items`` has a length.
+    :type       total: int
+    :param batch_size: Number of items processed between two checkpoints.
+    :type  batch_size: int
+    :param    workers: Number of concurrent requests, the default is the ``pool_size`` of
+        ``conn``.
+    :type     workers: int
+    :param   progress: Called with the job after every checkpoint and when a run ends.
+    :type    progress: callable
+    :param   priority: The priority of the requests, see
+        :py:meth:`.RestAuthConnection.prioritize`.
+    :type    priority: str
+    :raise RestAuthRuntimeException: If ``operation`` is unknown.
+    """
+
+    operations = {
+        'create_user': create_user,
+        'remove_user': remove_user,
+        'create_group': create_group,
+        'remove_group': remove_group,
+    }
+
+    abort = (HttpException, error.InternalServerError)
+    """Exceptions that stop the job instead of being recorded as a failed item."""
+
+    def __init__(self, conn, operation, items, checkpoint, total=None, batch_size=1000,
+                 workers=None, progress=None, priority='bulk'):
+        if not callable(operation):
+            if operation not in self.operations:
+                raise error.RestAuthRuntimeException("Unknown operation: %s" % operation)
+            operation = self.operations[operation]
+
+        if total is None and hasattr(items, '__len__'):
+            total = len(items)
+
+        self.conn = conn
+        self.operation = operation
+        self.items = items
+        self.checkpoint = checkpoint
+        self.total = total
+        self.batch_size = batch_size
+        self.workers = workers
+        self.progress = progress
+        self.priority = priority
+
+        self.position = 0
+        """Number of items processed, including items processed by interrupted jobs."""
+
+        self.done = 0
+        """Number of items processed successfully."""
+
+        self.failed = {}
+        """Names of items that failed, mapped to an error message."""
+
+        self.rate = 0.0
+        """Items processed per second by the current run."""
+
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.checkpoint):
+            return
+
+        with open(self.checkpoint) as stream:
+            for line in stream:
+                try:
+                    batch = json.loads(line)
+                except ValueError:  # interrupted while writing the last line
+                    break
+                self.position = batch['position']
+                self.done += batch['done']
+                self.failed.update(batch['failed'])
+
+    def _commit(self, position, done, failed):
+        line = json.dumps({'position': position, 'done': done, 'failed': failed})
+        with open(self.checkpoint, 'a') as stream:
+            stream.write('%s\n' % line)
+            stream.flush()
+            os.fsync(stream.fileno())
+
+        self.position = position
+        self.done += done
+        self.failed.update(failed)
+
+    @property
+    def eta(self):
+        """Estimated number of seconds until the job is finished or None if unknown."""
+        if self.total is None or not self.rate:
+            return None
+        return max(self.total - self.position, 0) / self.rate
+
+    def run(self):
+        """Process all items that were not processed before.
+
+        :return: True if no item failed, including items that failed in interrupted jobs.
+        :rtype: bool
+        :raise HttpException: If the RestAuth service is unreachable.
+        :raise InternalServerError: When the RestAuth service returns HTTP status code 500.
+        """
+        start, started = self.position, time.time()
+        position, done, failed = self.position, 0, {}
+
+        items = itertools.islice(iter(self.items), self.position, None)
+        results = iter(self.conn.map(lambda i: self.operation(self.conn, i), items,
+                                     workers=self.workers, priority=self.priority))
+        try:
+            for item, result in results:
+                if isinstance(result, self.abort):
+                    raise result
+
+                position += 1
+                if isinstance(result, Exception):
+                    failed[_name(item)] = '%s: %s' % (type(result).__name__, result)
+                else:
+                    done += 1
+
+                if position - self.position >= self.batch_size:
+                    self._commit(position, done, failed)
+                    done, failed = 0, {}
+                    self.rate = (position - start) / max(time.time() - started, 1e-6)
+                    if self.progress is not None:
+                        self.progress(self)
+        finally:
+            results.close()
+            if position > self.position:
+                self._commit(position, done, failed)
+                self.rate = (position - start) / max(time.time() - started, 1e-6)
+
+        if self.progress is not None:
+            self.progress(self)
+        return not self.failed
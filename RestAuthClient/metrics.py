@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of RestAuthClient (https://python.restauth.net).
+#
+# RestAuthClient is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# RestAuthClient is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with RestAuthClient. If
+# not, see <http://www.gnu.org/licenses/>.
+
+"""Counters for events of a connection.
+
+.. moduleauthor:: Mathias Ertl <mati@restauth.net>
+"""
+
+import threading
+
+
+class Metrics(object):
+    """Thread-safe counters of events like retries of a :py:class:`.RestAuthConnection`.
+
+    Every connection has an instance as its ``metrics`` attribute. Counters that were never
+    incremented are zero:
+
+    .. code-block:: python
+
+       conn.metrics['retries']  # the number of retries so far, zero if there were none
+       conn.metrics.as_dict()  # a copy of all counters, e.g. to export them to a monitoring system
+
+    .. versionadded:: 0.6.2
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name, value=1):
+        """Increment a counter.
+
+        :param  name: The name of the counter.
+        :type   name: str
+        :param value: The value to add.
+        :type  value: int
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def __getitem__(self, name):
+        return self._counters.get(name, 0)
+
+    def as_dict(self):
+        """Get a copy of all counters.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self):
+        """Reset all counters to zero."""
+        with self._lock:
+            self._counters.clear()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of RestAuthClient (https://python.restauth.net).
+#
+# RestAuthClient is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# RestAuthClient is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with RestAuthClient. If
+# not, see <http://www.gnu.org/licenses/>.
+
+"""Check many memberships with as few requests as possible.
+
+.. moduleauthor:: Mathias Ertl <mati@restauth.net>
+"""
+
+from RestAuthCommon import error
+from RestAuthClient.group import RestAuthGroup
+
+
+class MembershipPlan(object):
+    """A plan to check if each of a list of users is a member of each of a list of groups.
+
+    There are three strategies to get the answers:
+
+    * ``"groups"`` fetches the members of every group (one request per group).
+    * ``"users"`` fetches the groups of every user (one request per user).
+    * ``"probes"`` checks every single membership (one request per user and group).
+
+    The estimated cost of a strategy is the number of requests plus the number of names expected
+    in the responses, weighted with ``name_cost``. The cheapest strategy is chosen unless
+    ``strategy`` is given. Requests are sent concurrently with :py:meth:`.RestAuthConnection.map`.
+    Plans are usually created with :py:meth:`.RestAuthConnection.plan_memberships`:
+
+    .. code-block:: python
+
+       plan = conn.plan_memberships(['alice', 'bob'], ['admins', 'staff', 'vpn'])
+       print(plan)  # shows the chosen strategy, the number of requests and the estimated cost
+       for user, memberships in zip(plan.users, plan.execute()):
+           # memberships is a list of booleans, one for every group
+           ...
+
+    Users and groups that do not exist are not a member of any group and have no members.
+
+    .. versionadded:: 0.6.2
+
+    :param        conn: A connection to a RestAuth service.
+    :type         conn: :py:class:`.RestAuthConnection`
+    :param       users: The users to check.
+    :type        users: list of str or :py:class:`.RestAuthUser`
+    :param      groups: The groups to check.
+    :type       groups: list of str or :py:class:`.RestAuthGroup`
+    :param    strategy: Force a strategy instead of choosing the cheapest one.
+    :type     strategy: str
+    :param  group_size: The expected number of members of a group.
+    :type   group_size: float
+    :param user_groups: The expected number of groups of a user.
+    :type  user_groups: float
+    :param   name_cost: The cost of transferring a name relative to the cost of a request.
+    :type    name_cost: float
+    :param     workers: Number of concurrent requests, the default is the ``pool_size`` of
+        ``conn``.
+    :type      workers: int
+    :raise RestAuthRuntimeException: If ``strategy`` is unknown.
+    """
+
+    strategies = ('groups', 'users', 'probes')
+
+    def __init__(self, conn, users, groups, strategy=None, group_size=100, user_groups=10,
+                 name_cost=0.001, workers=None):
+        self.conn = conn
+        self.users = [getattr(u, 'name', u) for u in users]
+        self.groups = [getattr(g, 'name', g) for g in groups]
+        self.workers = workers
+
+        unique_users = len(set(self.users))
+        unique_groups = len(set(self.groups))
+
+        self.requests = {
+            'groups': unique_groups,
+            'users': unique_users,
+            'probes': unique_users * unique_groups,
+        }
+        """The number of requests of every strategy."""
+
+        self.costs = {
+            'groups': unique_groups * (1 + group_size * name_cost),
+            'users': unique_users * (1 + user_groups * name_cost),
+            'probes': float(unique_users * unique_groups),
+        }
+        """The estimated costs of every strategy."""
+
+        if strategy is None:
+            strategy = min(self.strategies, key=self.costs.get)  # the first one wins a tie
+        elif strategy not in self.strategies:
+            raise error.RestAuthRuntimeException("Unknown strategy: %s" % strategy)
+
+        self.strategy = strategy
+        """The chosen strategy."""
+
+    def _map(self, func, items):
+        results = {}
+        for item, result in self.conn.map(func, set(items), ordered=False, workers=self.workers):
+            if isinstance(result, error.ResourceNotFound):
+                result = ()
+            elif isinstance(result, Exception):
+                raise result
+            results[item] = set(result)
+        return results
+
+    def _members(self, group):
+        return RestAuthGroup(self.conn, group).get_members(flat=True)
+
+    def _groups(self, user):
+        return RestAuthGroup.get_all(self.conn, user=user, flat=True)
+
+    def _probe(self, membership):
+        group, user = membership
+        try:
+            if RestAuthGroup(self.conn, group).is_member(user):
+                return [user]
+        except error.ResourceNotFound:
+            pass
+        return []
+
+    def execute(self):
+        """Execute the plan.
+
+        :return: A list with a row for every user, each row is a list of booleans with a column
+            for every group.
+        :rtype: list of lists
+        """
+        if self.strategy == 'groups':
+            members = self._map(self._members, self.groups)
+            return [[u in members[g] for g in self.groups] for u in self.users]
+        elif self.strategy == 'users':
+            groups = self._map(self._groups, self.users)
+            return [[g in groups[u] for g in self.groups] for u in self.users]
+        else:
+            members = self._map(self._probe, [(g, u) for u in self.users for g in self.groups])
+            return [[u in members[(g, u)] for g in self.groups] for u in self.users]
+
+    def __repr__(self):
+        return '<MembershipPlan: %s (%s requests, cost %.3f)>' % (
+            self.strategy, self.requests[self.strategy], self.costs[self.strategy])
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of RestAuthClient (https://python.restauth.net).
+#
+# RestAuthClient is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# RestAuthClient is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with RestAuthClient. If
+# not, see <http://www.gnu.org/licenses/>.
+
+"""Persistent HTTP connections shared by all requests of a :py:class:`.RestAuthConnection`.
+
+.. moduleauthor:: Mathias Ertl <mati@restauth.net>
+"""
+
+import socket
+import sys
+import threading
+
+if sys.version_info >= (3, ):  # pragma: py3
+    from http import client
+    STALE = (client.BadStatusLine, ConnectionError)
+else:  # pragma: py2
+    import httplib as client
+    STALE = (client.BadStatusLine, socket.error)
+
+
+def _send_rendered(self, method, url, headers, body=None):
+    """Send a request with header lines rendered by the caller.
+
+    ``headers`` is a sequence of header blocks, every block is one or more complete header lines
+    separated (but not terminated) by CRLF. Unlike :py:meth:`~http.client.HTTPConnection.request`,
+    this does not add a ``Host``, ``Accept-Encoding`` or ``Content-Length`` header and does not
+    format every header line separately. The request line, the state of the connection (including
+    tunnels set with :py:meth:`~http.client.HTTPConnection.set_tunnel`) and the body are handled
+    by :py:class:`~http.client.HTTPConnection` as usual.
+    """
+    self.putrequest(method, url, skip_host=True, skip_accept_encoding=True)
+    for block in headers:
+        # _output() is private, but it is what putheader() uses to buffer a formatted line. It is
+        # relied on deliberately (see RenderedRequestTests.test_output in the test suite).
+        self._output(block)
+    self.endheaders(body)
+
+
+class HTTPConnection(client.HTTPConnection):
+    """An HTTP connection that can send requests with pre-rendered headers.
+
+    .. versionadded:: 0.6.2
+    """
+    send_rendered = _send_rendered
+
+
+if hasattr(client, 'HTTPSConnection'):  # pragma: no branch, Python is built with SSL support
+    class HTTPSConnection(client.HTTPSConnection):
+        """An HTTPS connection that can send requests with pre-rendered headers.
+
+        .. versionadded:: 0.6.2
+        """
+        send_rendered = _send_rendered
+
+
+class PooledResponse(client.HTTPResponse):
+    """A response that returns its connection to the pool once it was read completely.
+
+    If the response is closed before the body was read completely, the connection is closed
+    instead.
+    """
+
+    _release_conn = None
+
+    def _close_conn(self):  # pragma: py3
+        client.HTTPResponse._close_conn(self)
+        self._release(not self.length)  # the length is left over if reading failed
+
+    def close(self):
+        if self.fp is not None and self.length != 0:
+            self._release(False)
+        client.HTTPResponse.close(self)
+        self._release(True)
+
+    def _release(self, reuse):
+        release, self._release_conn = self._release_conn, None
+        if release is not None:
+            release(reuse)
+
+
+class ConnectionPool(object):
+    """A pool of idle HTTP connections to the same host.
+
+    The pool never blocks: If no idle connection is available, a new one is created. At most
+    ``size`` connections are kept open once they are no longer used.
+
+    .. versionadded:: 0.6.2
+
+    :param factory: The class used to create new connections.
+    :type  factory: :py:class:`.HTTPConnection` or :py:class:`.HTTPSConnection`
+    :param  kwargs: Keyword arguments passed to ``factory``.
+    :type   kwargs: dict
+    :param    size: The maximum number of idle connections.
+    :type     size: int
+    """
+
+    def __init__(self, factory, kwargs, size=10):
+        self.factory = factory
+        self.kwargs = kwargs
+        self.size = size
+        self.host_header = b'Host: ' + kwargs['host'].encode('idna')
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Get an idle connection or a new one if there is none.
+
+        :return: A tuple of the connection and a boolean indicating if the connection was used
+            before.
+        """
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+
+        conn = self.factory(**self.kwargs)
+        conn.response_class = PooledResponse
+        return conn, False
+
+    def release(self, conn, reuse=True):
+        """Return a connection to the pool.
+
+        :param  conn: The connection to return.
+        :param reuse: If False, the connection is closed instead.
+        :type  reuse: bool
+        """
+        if reuse:
+            with self._lock:
+                if len(self._idle) < self.size:
+                    self._idle.append(conn)
+                    return
+        conn.close()
+
+    def attach(self, conn, response):
+        """Return ``conn`` to the pool as soon as ``response`` was read completely."""
+        if response.will_close:
+            return  # the server closes the connection
+
+        response._release_conn = lambda reuse: self.release(conn, reuse)
+        if response.length == 0:
+            response.close()  # e.g. "204 No Content", there is nothing to read
+
+    def clear(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def is_stale(self, exc):
+        """If ``exc`` indicates that the server closed an idle connection."""
+        return isinstance(exc, STALE) and not isinstance(exc, socket.timeout)
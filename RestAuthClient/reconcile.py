@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of RestAuthClient (https://python.restauth.net).
+#
+# RestAuthClient is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# RestAuthClient is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with RestAuthClient. If
+# not, see <http://www.gnu.org/licenses/>.
+
+"""Bring a RestAuth service into a desired state with as few changes as possible.
+
+.. moduleauthor:: Mathias Ertl <mati@restauth.net>
+"""
+
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.hierarchy import GroupHierarchy
+from RestAuthClient.user import RestAuthUser
+
+
+class Operation(object):
+    """A single change of a user or group.
+
+    :param   kind: Either ``"user"`` or ``"group"``.
+    :type    kind: str
+    :param   name: The name of the user or group.
+    :type    name: str
+    :param method: The method to call, ``"create"`` calls the classmethod of the same name.
+    :type  method: str
+    :param   args: Additional arguments for the method.
+    :type    args: tuple
+    :param requires: ``(kind, name)`` tuples of users and groups that must be created first.
+    :type  requires: list
+    """
+
+    def __init__(self, kind, name, method, args=(), requires=()):
+        self.kind = kind
+        self.name = name
+        self.method = method
+        self.args = args
+        self.requires = requires
+
+    def __call__(self, conn):
+        cls = RestAuthUser if self.kind == 'user' else RestAuthGroup
+        if self.method == 'create':
+            return cls.create(conn, self.name, *self.args)
+        return getattr(cls(conn, self.name), self.method)(*self.args)
+
+    def __str__(self):
+        args = ' '.join(str(a) if not isinstance(a, dict) else str(sorted(a.items()))
+                        for a in self.args if a is not None)
+        return ('%s %s: %s %s' % (self.kind, self.name, self.method, args)).strip()
+
+    def __repr__(self):
+        return '<Operation: %s>' % self
+
+
+class ReconcilePlan(object):
+    """The operations needed to bring a RestAuth service into a desired state.
+
+    Operations are grouped in phases that are executed one after the other. Operations of one
+    phase are independent of each other and executed concurrently:
+
+    1. Users and groups that do not exist yet are created (new users are created with their
+       properties).
+    2. Properties are set and memberships and sub-groups are added or removed.
+    3. Users and groups not in the desired state are removed (only if ``prune`` was True).
+
+    If creating a user or group fails, operations that require it are skipped. Plans are usually
+    created with :py:meth:`.RestAuthConnection.reconcile`.
+
+    .. versionadded:: 0.6.2
+
+    :param conn: A connection to a RestAuth service.
+    :type  conn: :py:class:`.RestAuthConnection`
+    :param phases: A list of lists of :py:class:`.Operation` instances.
+    :type  phases: list
+    """
+
+    def __init__(self, conn, phases):
+        self.conn = conn
+        self.phases = phases
+
+        self.done = []
+        """Operations executed successfully."""
+
+        self.failed = []
+        """Tuples of operations that failed and the exception raised."""
+
+        self.skipped = []
+        """Operations that were not executed because a user or group could not be created."""
+
+    def __iter__(self):
+        return (op for phase in self.phases for op in phase)
+
+    def __len__(self):
+        return sum(len(phase) for phase in self.phases)
+
+    def __str__(self):
+        return '\n'.join(str(op) for op in self)
+
+    def execute(self, workers=None):
+        """Execute all operations.
+
+        :param workers: Number of concurrent requests, the default is the ``pool_size`` of the
+            connection.
+        :type  workers: int
+        :return: True if all operations were executed successfully.
+        :rtype: bool
+        """
+        missing = set()
+        for phase in self.phases:
+            runnable = []
+            for op in phase:
+                if missing.intersection(op.requires):
+                    self.skipped.append(op)
+                else:
+                    runnable.append(op)
+
+            for op, result in self.conn.map(lambda o: o(self.conn), runnable, workers=workers):
+                if isinstance(result, Exception):
+                    self.failed.append((op, result))
+                    if op.method == 'create':
+                        missing.add((op.kind, op.name))
+                else:
+                    self.done.append(op)
+        return not self.failed and not self.skipped
+
+
+class Reconciler(object):
+    """Compare a desired state with the current state of a RestAuth service.
+
+    The desired state is a dictionary with the optional keys ``"users"`` and ``"groups"``:
+
+    .. code-block:: python
+
+       state = {
+           'users': {
+               'alice': {'email': 'alice@example.com'},
+               'bob': {},
+           },
+           'groups': {
+               'admins': {'users': ['alice']},
+               'staff': {'users': ['alice', 'bob'], 'groups': ['admins']},
+           },
+       }
+
+    Users map to the properties they should have, properties not mentioned are left untouched.
+    Groups map to their direct members (``"users"``) and sub-groups (``"groups"``), if a key is
+    omitted, members or sub-groups of that group are left untouched. Members that a group inherits
+    from its meta-groups are never removed from a group, but they are added as direct members if
+    the desired state lists them. Since RestAuth does not tell direct and inherited members apart,
+    such members are added again every time, which does not change anything if they already are
+    direct members.
+
+    .. versionadded:: 0.6.2
+
+    :param    conn: A connection to a RestAuth service.
+    :type     conn: :py:class:`.RestAuthConnection`
+    :param   state: The desired state.
+    :type    state: dict
+    :param   prune: Remove users (if ``state`` has a ``"users"`` key) and groups (if ``state``
+        has a ``"groups"`` key) that are not in the desired state.
+    :type    prune: bool
+    :param workers: Number of concurrent requests, the default is the ``pool_size`` of ``conn``.
+    :type  workers: int
+    """
+
+    def __init__(self, conn, state, prune=False, workers=None):
+        self.conn = conn
+        self.users = state.get('users')
+        self.groups = state.get('groups')
+        self.prune = prune
+        self.workers = workers
+        self._hierarchy = None
+        self._members = {}
+
+    def _fetch(self, tasks):
+        """Call all callables in ``tasks`` concurrently, raise the first exception."""
+        results = {}
+        for key, result in self.conn.map(lambda k: tasks[k](), list(tasks), workers=self.workers):
+            if isinstance(result, Exception):
+                raise result
+            results[key] = result
+        return results
+
+    def _inherited(self, group):
+        """Get the members a group inherits from its meta-groups."""
+        if self._hierarchy is None:
+            self._hierarchy = GroupHierarchy(self.conn, workers=self.workers)
+
+        ancestors = [g for g in self._hierarchy.ancestors(group) if g != group]
+        self._members.update(self._fetch(dict(
+            (('members', g), lambda g=g: RestAuthGroup(self.conn, g).get_members(flat=True))
+            for g in ancestors if ('members', g) not in self._members)))
+        return set(m for g in ancestors for m in self._members[('members', g)])
+
+    def plan(self):
+        """Fetch the current state and compute the operations needed.
+
+        :rtype: :py:class:`.ReconcilePlan`
+        """
+        tasks = {}
+        if self.users is not None:
+            tasks['users'] = lambda: RestAuthUser.get_all(self.conn, flat=True)
+        if self.groups is not None:
+            tasks['groups'] = lambda: RestAuthGroup.get_all(self.conn, flat=True)
+        current = self._fetch(tasks)
+        users = set(current.get('users', ()))
+        groups = set(current.get('groups', ()))
+
+        # fetch the details of existing users and groups
+        tasks = {}
+        for name, props in (self.users or {}).items():
+            if props and name in users:
+                tasks[('props', name)] = lambda n=name: RestAuthUser(self.conn, n).get_properties()
+        for name, desired in (self.groups or {}).items():
+            if name not in groups:
+                continue
+            if desired.get('users') is not None:
+                tasks[('members', name)] = lambda n=name: RestAuthGroup(
+                    self.conn, n).get_members(flat=True)
+            if desired.get('groups') is not None:
+                tasks[('groups', name)] = lambda n=name: RestAuthGroup(
+                    self.conn, n).get_groups(flat=True)
+        details = self._fetch(tasks)
+        self._members.update((k, v) for k, v in details.items() if k[0] == 'members')
+
+        create, update, remove = [], [], []
+        for name, props in sorted((self.users or {}).items()):
+            if name not in users:
+                create.append(Operation('user', name, 'create', (None, props or None)))
+            elif props:
+                existing = details[('props', name)]
+                changed = dict((k, v) for k, v in props.items() if existing.get(k) != v)
+                if changed:
+                    update.append(Operation('user', name, 'set_properties', (changed, )))
+
+        for name, desired in sorted((self.groups or {}).items()):
+            if name not in groups:
+                create.append(Operation('group', name, 'create'))
+
+            if desired.get('users') is not None:
+                wanted = set(desired['users'])
+                members = set(details.get(('members', name), ()))
+                if members:
+                    members -= self._inherited(name)  # only direct members
+                for user in sorted(wanted - members):
+                    update.append(Operation('group', name, 'add_user', (user, ),
+                                            requires=[('group', name), ('user', user)]))
+                for user in sorted(members - wanted):
+                    if not self.prune or self.users is None or user in self.users:
+                        update.append(Operation('group', name, 'remove_user', (user, )))
+
+            if desired.get('groups') is not None:
+                wanted = set(desired['groups'])
+                subgroups = set(details.get(('groups', name), ()))
+                for sub in sorted(wanted - subgroups):
+                    update.append(Operation('group', name, 'add_group', (sub, ),
+                                            requires=[('group', name), ('group', sub)]))
+                for sub in sorted(subgroups - wanted):
+                    if not self.prune or sub in self.groups:
+                        update.append(Operation('group', name, 'remove_group', (sub, )))
+
+        if self.prune:
+            for name in sorted(users - set(self.users or ())):
+                remove.append(Operation('user', name, 'remove'))
+            for name in sorted(groups - set(self.groups or ())):
+                remove.append(Operation('group', name, 'remove'))
+
+        return ReconcilePlan(self.conn, [create, update, remove])
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of RestAuthClient (https://python.restauth.net).
+#
+# RestAuthClient is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# RestAuthClient is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with RestAuthClient. If
+# not, see <http://www.gnu.org/licenses/>.
+
+"""Send reads to read-only replicas of a RestAuth service.
+
+.. moduleauthor:: Mathias Ertl <mati@restauth.net>
+"""
+
+import itertools
+import sys
+import threading
+import time
+
+if sys.version_info >= (3, ):  # pragma: py3
+    from urllib.parse import unquote
+    from urllib.parse import urlparse
+else:  # pragma: py2
+    from urllib import unquote
+    from urlparse import urlparse
+
+from RestAuthCommon import error
+from RestAuthClient.breaker import CircuitBreaker
+from RestAuthClient.common import RestAuthConnection
+from RestAuthClient.error import DeadlineExceeded
+from RestAuthClient.error import HttpException
+from RestAuthClient.pool import ConnectionPool
+from RestAuthClient.retry import RetryPolicy
+
+
+class ReplicatedRestAuthConnection(RestAuthConnection):
+    """A connection that sends reads to replicas and writes to the primary RestAuth service.
+
+    ``host`` is the writable primary, ``replicas`` are read-only copies of it. Requests that do
+    not change any data (GET requests and password verification) are distributed round-robin over
+    the replicas, all other requests are sent to the primary:
+
+    .. code-block:: python
+
+       conn = ReplicatedRestAuthConnection(
+           'https://auth.example.com', 'service', 'password',
+           replicas=['https://auth1.example.com', 'https://auth2.example.com'], sticky=5)
+
+    Replicas lag behind the primary, so after a write, reads of the affected user or group are
+    sent to the primary for ``sticky`` seconds and callers always see their own writes. Since
+    members are inherited by sub-groups, a change of any group sends reads of all groups to the
+    primary. Creating, removing or changing the password of a user sends reads of all users to the
+    primary.
+
+    If a replica is unreachable, the read is sent to the primary instead. Reads sent to a replica
+    and reads sent to the primary because a replica failed are counted in :py:attr:`.metrics` as
+    ``"replica_reads"`` and ``"replica_failovers"``. All other parameters are the same as for
+    :py:class:`.RestAuthConnection`, replicas use the same scheme, SSL context and timeout as
+    the primary. If a ``breaker`` is given, every replica gets its own
+    :py:class:`~.breaker.CircuitBreaker` with the same settings, so reads skip a replica that is
+    down without affecting the primary or the other replicas.
+
+    .. versionadded:: 0.6.2
+
+    :param replicas: The URLs of the replicas.
+    :type  replicas: list of str
+    :param   sticky: Seconds to send reads of a user or group to the primary after a write.
+    :type    sticky: float
+    """
+
+    collections = ('users', 'groups')
+
+    def __init__(self, host, user, passwd, replicas=(), sticky=5.0, **kwargs):
+        super(ReplicatedRestAuthConnection, self).__init__(host, user, passwd, **kwargs)
+        self.sticky = sticky
+
+        self._replicas = []
+        self._breakers = {}
+        for replica in replicas:
+            replica_kwargs = dict(self._conn_kwargs, host=urlparse(replica).netloc)
+            pool = ConnectionPool(self._conn, replica_kwargs, self.pool_size)
+            self._replicas.append(pool)
+
+            if self.breaker is not None:
+                b = self.breaker
+                breaker = CircuitBreaker(replica_kwargs['host'], b.threshold, b.window, b.slow,
+                                         b.cooldown, b.probes)
+                breaker.listeners.append(self._breaker_changed)
+                self._breakers[pool] = breaker
+        self._counter = itertools.count()
+
+        self._pinned = {}
+        self._pinned_lock = threading.Lock()
+
+    def _parts(self, url):
+        return [unquote(p) for p in url.split('?', 1)[0].strip('/').split('/')]
+
+    def _keys(self, url):
+        """Get the users and groups (or the list of them) a request refers to.
+
+        Only the first part of a URL may refer to a list, e.g. ``/groups/foo/users/`` refers to
+        the group ``foo`` but not to the list of all users.
+        """
+        parts = self._parts(url)
+        if parts[0] not in self.collections:
+            return []
+
+        keys = [(parts[0], parts[1] if len(parts) > 1 else None)]
+        keys += [(parts[i], parts[i + 1]) for i in range(2, len(parts) - 1, 2)
+                 if parts[i] in self.collections]
+        return keys
+
+    def _pin(self, url, body=None):
+        """Send reads of the resources changed by a write to the primary for a while."""
+        keys = self._keys(url)
+        if not keys:
+            return
+
+        parts = self._parts(url)
+        if len(parts) == 3 and parts[2] in self.collections and body:
+            # adding a user or sub-group to a group names the user or sub-group in the body
+            try:
+                name = self.content_handler.unmarshal_dict(body).get(parts[2][:-1])
+            except error.UnmarshalError:
+                name = None
+            if name is not None:
+                keys.append((parts[2], name))
+
+        collection = keys[0][0]
+        if collection == 'groups' or len(parts) < 3:
+            keys.append((collection, None))  # created, removed or inherited by other groups
+
+        now = time.time()
+        expires = now + self.sticky
+        with self._pinned_lock:
+            if len(self._pinned) > 1000:
+                self._pinned = dict((k, v) for k, v in self._pinned.items() if v > now)
+            for key in keys:
+                self._pinned[key] = expires
+
+    def is_pinned(self, url):
+        """If reads of ``url`` are currently sent to the primary.
+
+        :param url: The URL path of a request.
+        :type  url: str
+        :rtype: bool
+        """
+        pinned = self._pinned
+        if not pinned:
+            return False
+
+        now = time.time()
+        for collection, name in self._keys(url):
+            if pinned.get((collection, name), 0) > now or pinned.get((collection, None), 0) > now:
+                return True
+        return False
+
+    def _is_read(self, method, url):
+        """If a request does not change any data (GET requests and password verification)."""
+        if method == 'GET':
+            return True
+        posts = (self.retry or RetryPolicy).idempotent_posts
+        return method == 'POST' and any(p.match(url) for p in posts)
+
+    def _dispatch(self, method, url, body, headers, idempotent):
+        if not self._is_read(method, url):
+            try:
+                return super(ReplicatedRestAuthConnection, self)._dispatch(
+                    method, url, body, headers, idempotent)
+            finally:  # a failed request might still have changed data
+                self._pin(url, body)
+
+        if not self._replicas or self.is_pinned(url):
+            self._local.replica = None
+        else:
+            self._local.replica = self._replicas[next(self._counter) % len(self._replicas)]
+        try:
+            return super(ReplicatedRestAuthConnection, self)._dispatch(
+                method, url, body, headers, idempotent)
+        finally:
+            self._local.replica = None
+
+    def _select(self, method, url):
+        replica = getattr(self._local, 'replica', None)
+        if replica is None:
+            return self._pool
+        return replica
+
+    def _attempt(self, method, url, body, headers):
+        replica = getattr(self._local, 'replica', None)
+        if replica is None:
+            return super(ReplicatedRestAuthConnection, self)._attempt(method, url, body, headers)
+
+        self.metrics.increment('replica_reads')
+        try:
+            return self._guard(self._breakers.get(replica), method, url, body, headers)
+        except DeadlineExceeded:
+            raise
+        except HttpException:  # includes CircuitOpen if the breaker of the replica is open
+            self._local.replica = None
+            self.metrics.increment('replica_failovers')
+            return super(ReplicatedRestAuthConnection, self)._attempt(method, url, body, headers)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of RestAuthClient (https://python.restauth.net).
+#
+# RestAuthClient is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# RestAuthClient is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with RestAuthClient. If
+# not, see <http://www.gnu.org/licenses/>.
+
+"""Retry idempotent requests that failed because of a transport error.
+
+.. moduleauthor:: Mathias Ertl <mati@restauth.net>
+"""
+
+import random
+import re
+import threading
+
+
+class RetryBudget(object):
+    """A token bucket that limits retries to a fraction of all requests.
+
+    Every request adds ``ratio`` tokens to the bucket (up to ``capacity``), every retry takes one
+    token. If the RestAuth service is down, retries are thus limited to ``ratio`` times the number
+    of requests (plus the initial ``capacity``) and cannot multiply the load on the service.
+
+    .. versionadded:: 0.6.2
+
+    :param    ratio: Tokens added for every request.
+    :type     ratio: float
+    :param capacity: Maximum number of tokens, the bucket is full initially.
+    :type  capacity: float
+    """
+
+    def __init__(self, ratio=0.1, capacity=10):
+        self.ratio = ratio
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        """Add tokens for a request."""
+        with self._lock:
+            self.tokens = min(self.tokens + self.ratio, self.capacity)
+
+    def withdraw(self):
+        """Take a token for a retry.
+
+        :return: False if there are no tokens left.
+        :rtype: bool
+        """
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class RetryPolicy(object):
+    """When and how often to retry idempotent requests.
+
+    A request is retried if it raised :py:exc:`.HttpException` (e.g. because the connection was
+    reset), but not if it raised :py:exc:`.DeadlineExceeded`. Retries wait for a random time
+    between zero and ``backoff * 2 ** attempt`` seconds (but at most ``max_backoff``), the
+    randomization prevents many clients from retrying at the same time ("full jitter").
+
+    Only idempotent requests are retried: GET and PUT requests and POST requests to the URLs in
+    :py:attr:`.idempotent_posts`, which by default only match password verification
+    (:py:meth:`.RestAuthUser.verify_password`). Requests that create or delete users or groups are
+    never retried.
+
+    .. versionadded:: 0.6.2
+
+    :param     retries: Maximum number of retries of a request.
+    :type      retries: int
+    :param     backoff: Base of the time to wait before a retry in seconds.
+    :type      backoff: float
+    :param max_backoff: Maximum time to wait before a retry in seconds.
+    :type  max_backoff: float
+    :param      budget: Limits the number of retries, the default is a new
+        :py:class:`.RetryBudget`.
+    :type       budget: :py:class:`.RetryBudget`
+    """
+
+    idempotent = ('GET', 'PUT')
+    """HTTP methods that are always idempotent."""
+
+    idempotent_posts = (re.compile(r'^/users/[^/]+/$'), )
+    """Regular expressions matching URL paths of POST requests that do not change any data."""
+
+    def __init__(self, retries=2, backoff=0.05, max_backoff=1.0, budget=None):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = RetryBudget() if budget is None else budget
+
+    def is_idempotent(self, method, url):
+        """If a request may be retried.
+
+        :param method: The HTTP method of the request.
+        :type  method: str
+        :param    url: The URL path of the request.
+        :type     url: str
+        :rtype: bool
+        """
+        if method in self.idempotent:
+            return True
+        return method == 'POST' and any(p.match(url) for p in self.idempotent_posts)
+
+    def delay(self, attempt):
+        """Get the time to wait before a retry.
+
+        :param attempt: The number of the failed attempt, starting with zero.
+        :type  attempt: int
+        :return: The time to wait in seconds or None if the request should not be retried.
+        :rtype: float
+        """
+        if attempt >= self.retries or not self.budget.withdraw():
+            return None
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
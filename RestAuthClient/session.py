@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of RestAuthClient (https://python.restauth.net).
+#
+# RestAuthClient is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# RestAuthClient is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with RestAuth. If not,
+# see <http://www.gnu.org/licenses/>.
+
+"""Request-scoped sessions that memoize reads and batch writes.
+
+.. moduleauthor:: Mathias Ertl <mati@restauth.net>
+"""
+
+import threading
+
+from RestAuthCommon import error
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.user import RestAuthLogin
+from RestAuthClient.user import RestAuthUser
+
+_REMOVED = object()  # marks a property removed in a session
+
+
+class BufferedResponse(object):
+    """A response that was read completely and can be read any number of times.
+
+    :param status: The HTTP status code.
+    :type  status: int
+    :param   body: The body of the response.
+    :type    body: bytes
+    :param headers: The headers of the response.
+    :type  headers: dict
+    """
+
+    def __init__(self, status, body=b'', headers=None):
+        self.status = status
+        self.body = body
+        self.headers = dict((k.lower(), v) for k, v in (headers or {}).items())
+
+    @classmethod
+    def from_response(cls, response):
+        """Read a :py:class:`~http.client.HTTPResponse` into a new instance."""
+        return cls(response.status, response.read(), dict(response.getheaders()))
+
+    def read(self):
+        return self.body
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name.lower(), default)
+
+
+class SessionUser(RestAuthUser):
+    """A :py:class:`.RestAuthUser` bound to a :py:class:`.RestAuthSession`.
+
+    Property changes and password changes are queued until the session is flushed, reads of
+    properties see any queued changes. Methods that change data return None.
+    """
+
+    def set_password(self, password=None):
+        self.conn._queue(None, RestAuthUser, self.name, 'set_password', password)
+
+    def verify_password(self, password):
+        if self.name in self.conn._passwords:
+            self.conn.flush()  # a queued password change must be visible
+
+        # verifying a password is a POST request, but it does not change any data
+        return RestAuthUser(self.conn.conn, self.name).verify_password(password)
+
+    def set_property(self, prop, value):
+        self.conn._queue_properties(self.name, {prop: value})
+
+    def set_properties(self, props):
+        self.conn._queue_properties(self.name, props)
+
+    def remove_property(self, prop):
+        self.conn._queue_properties(self.name, {prop: _REMOVED})
+
+    def get_property(self, prop):
+        value = self.conn._queued_properties(self.name).get(prop)
+        if value is _REMOVED:
+            raise error.ResourceNotFound(BufferedResponse(404, headers={
+                'Resource-Type': 'property'}))
+        elif value is not None:
+            return value
+        return super(SessionUser, self).get_property(prop)
+
+    def get_properties(self):
+        props = super(SessionUser, self).get_properties()
+        for key, value in self.conn._queued_properties(self.name).items():
+            if value is _REMOVED:
+                props.pop(key, None)
+            else:
+                props[key] = value
+        return props
+
+
+class SessionGroup(RestAuthGroup):
+    """A :py:class:`.RestAuthGroup` bound to a :py:class:`.RestAuthSession`.
+
+    Changes to members and sub-groups are queued until the session is flushed. Since members are
+    inherited by sub-groups, reading memberships flushes queued membership changes first, unless
+    the answer is already known from the queued changes.
+    """
+
+    def add_user(self, user):
+        if hasattr(user, 'name'):
+            user = user.name
+        self.conn._queue((self.name, user), RestAuthGroup, self.name, 'add_user', user)
+
+    def remove_user(self, user):
+        if hasattr(user, 'name'):
+            user = user.name
+        self.conn._queue((self.name, user), RestAuthGroup, self.name, 'remove_user', user)
+
+    def add_group(self, group):
+        if hasattr(group, 'name'):
+            group = group.name
+        self.conn._queue(False, RestAuthGroup, self.name, 'add_group', group)
+
+    def remove_group(self, group):
+        if hasattr(group, 'name'):
+            group = group.name
+        self.conn._queue(False, RestAuthGroup, self.name, 'remove_group', group)
+
+    def is_member(self, user):
+        if hasattr(user, 'name'):
+            user = user.name
+
+        # a user that was just added is a member for sure
+        if self.conn._added.get((self.name, user)):
+            return True
+        return super(SessionGroup, self).is_member(user)
+
+
+class RestAuthSession(object):
+    """A unit of work on a :py:class:`.RestAuthConnection`.
+
+    A session memoizes all reads, so asking the same question twice (or through different paths,
+    e.g. :py:meth:`.RestAuthUser.in_group` and :py:meth:`.RestAuthGroup.is_member`) costs only one
+    request. Property, password, membership and sub-group changes made through
+    :py:meth:`.user` and :py:meth:`.group` are queued and sent when the session is flushed. Reads
+    always see queued changes. Sessions are usually created with
+    :py:meth:`.RestAuthConnection.session` and used as context manager:
+
+    .. code-block:: python
+
+       with conn.session() as session:
+           user = session.user('foobar')
+           if user.in_group('admins'):  # does one request
+               user.set_property('last login', '...')  # does no request
+               user.set_property('email', '...')  # does no request
+           session.group('admins').is_member(user)  # does no request
+       # properties are set with one request when leaving the block
+
+    Changes are discarded if the block is left because of an exception. Any other request (e.g.
+    creating a user) flushes queued changes before it is sent.
+
+    Sessions are thread-safe, so work done for one request of your application may be spread over
+    several threads. Queued changes are shared by all threads and sent by whichever thread flushes
+    the session.
+
+    .. versionadded:: 0.6.2
+
+    :param conn: The connection used to send requests.
+    :type  conn: :py:class:`.RestAuthConnection`
+    """
+    _user = SessionUser
+    _group = SessionGroup
+    _login = RestAuthLogin
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.content_handler = conn.content_handler
+        self.cache = conn.cache
+        self.quote = conn.quote
+
+        # used by RestAuthConnection.__eq__
+        self._conn = conn._conn
+        self._conn_kwargs = conn._conn_kwargs
+        self.auth_header = conn.auth_header
+
+        self._lock = threading.RLock()
+        self._responses = {}
+        self._pending = []
+        self._properties = {}
+        self._passwords = set()
+        self._added = {}
+
+    def user(self, name):
+        """Get a user bound to this session."""
+        return self._user(self, name)
+
+    def group(self, name):
+        """Get a group bound to this session."""
+        return self._group(self, name)
+
+    def _queue(self, membership, cls, name, method, *args):
+        """Queue a call of ``method`` on ``cls(conn, name)``.
+
+        :param membership: A tuple of ``(group, user)`` if a user is added to or removed from a
+            group, False if group inheritance changes or None if memberships do not change.
+        """
+        with self._lock:
+            self._pending.append((cls, name, method, args))
+            if membership:
+                self._added[membership] = method == 'add_user'
+            elif membership is None:
+                self._passwords.add(name)
+
+    def _queue_properties(self, name, props):
+        with self._lock:
+            self._properties.setdefault(name, {}).update(props)
+
+    def _queued_properties(self, name):
+        with self._lock:
+            return dict(self._properties.get(name, {}))
+
+    def _discard(self):
+        pending, self._pending = self._pending, []
+        properties, self._properties = self._properties, {}
+        self._passwords = set()
+        self._added = {}
+        return pending, properties
+
+    def flush(self):
+        """Send all queued changes.
+
+        Property changes are combined into a single request per user. If a change fails, the
+        exception is raised and the remaining changes are discarded.
+        """
+        with self._lock:
+            pending, properties = self._discard()
+            if not pending and not properties:
+                return
+            self._responses = {}
+
+            for cls, name, method, args in pending:
+                getattr(cls(self.conn, name), method)(*args)
+
+            for name, props in properties.items():
+                user = RestAuthUser(self.conn, name)
+                values = dict((k, v) for k, v in props.items() if v is not _REMOVED)
+                if values:
+                    user.set_properties(values)
+                for key in [k for k, v in props.items() if v is _REMOVED]:
+                    user.remove_property(key)
+
+    def get(self, url, params=None, headers=None):
+        """Perform a GET request, unless the same request was already sent in this session.
+
+        Parameters are the same as for :py:meth:`.RestAuthConnection.get`, but the returned
+        response is a :py:class:`.BufferedResponse`.
+        """
+        with self._lock:
+            if url.startswith('/groups/') and self._pending:
+                self.flush()  # queued membership changes may be inherited by other groups
+
+            key = (url, tuple(sorted((params or {}).items())))
+            if key not in self._responses:
+                response = self.conn.get(url, params=params, headers=headers)
+                self._responses[key] = BufferedResponse.from_response(response)
+            return self._responses[key]
+
+    def post(self, url, params, headers=None):
+        """Flush queued changes and perform a POST request."""
+        return self._write(self.conn.post, url, params, headers=headers)
+
+    def put(self, url, params, headers=None):
+        """Flush queued changes and perform a PUT request."""
+        return self._write(self.conn.put, url, params, headers=headers)
+
+    def delete(self, url, headers=None):
+        """Flush queued changes and perform a DELETE request."""
+        return self._write(self.conn.delete, url, headers=headers)
+
+    def map(self, func, items, **kwargs):
+        """Flush queued changes and call ``func`` for every element of ``items`` concurrently.
+
+        Parameters are the same as for :py:meth:`.RestAuthConnection.map`. Changes ``func`` makes
+        through this session are queued as usual, so bulk methods like
+        :py:meth:`.RestAuthGroup.add_users` send nothing until the session is flushed.
+        """
+        self.flush()
+        return self.conn.map(func, items, **kwargs)
+
+    def _propagate(self, func):
+        return self.conn._propagate(func)
+
+    def _write(self, func, *args, **kwargs):
+        with self._lock:
+            self.flush()
+            self._responses = {}
+            return func(*args, **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            with self._lock:
+                self._discard()
+        return False
+
+    def __eq__(self, other):
+        return self.conn == other
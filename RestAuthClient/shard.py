@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of RestAuthClient (https://python.restauth.net).
+#
+# RestAuthClient is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# RestAuthClient is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with RestAuthClient. If
+# not, see <http://www.gnu.org/licenses/>.
+
+"""Distribute users over several independent RestAuth services.
+
+.. moduleauthor:: Mathias Ertl <mati@restauth.net>
+"""
+
+import bisect
+import hashlib
+import struct
+
+from RestAuthCommon import error
+from RestAuthClient.error import GroupExists
+from RestAuthClient.error import UserExists
+from RestAuthClient.executor import Executor
+from RestAuthClient.hierarchy import GroupHierarchy
+
+_POINT = struct.Struct('>Q')
+
+
+def _hash(key):
+    if not isinstance(key, bytes):
+        key = key.encode('utf-8')
+    return _POINT.unpack_from(hashlib.md5(key).digest())[0]
+
+
+class ShardedRestAuthConnection(object):
+    """Distribute users over several independent RestAuth services (the *shards*).
+
+    Every user is stored on exactly one shard, chosen by consistent hashing of the username: Every
+    shard owns ``vnodes`` points on a hash ring and a user belongs to the shard owning the first
+    point after the hash of the username. When a shard is added, only about ``1 / len(shards)``
+    of all users move to the new shard, see :py:meth:`.rebalance`.
+
+    .. code-block:: python
+
+       sharded = ShardedRestAuthConnection({
+           'eu': RestAuthConnection('https://auth.eu.example.com', 'service', 'password'),
+           'us': RestAuthConnection('https://auth.us.example.com', 'service', 'password'),
+       })
+       user = sharded.get_user('mati')  # a RestAuthUser using the connection to its shard
+       user.verify_password('password')
+       for name in sharded.get_all_users(flat=True):  # all shards are queried concurrently
+           ...
+
+    Groups exist independently on every shard and contain the users of that shard, so group
+    membership is always checked on the shard of the user. Use :py:meth:`.get_group` to get a
+    group on the shard of a user and :py:meth:`.create_group` to create a group on all shards.
+
+    .. versionadded:: 0.6.2
+
+    :param shards: Connections to all shards, mapped by a name. The name determines the points of
+        the shard on the hash ring, so it must not change when the host of a shard changes.
+    :type  shards: dict
+    :param vnodes: The number of points (virtual nodes) of every shard on the hash ring.
+    :type  vnodes: int
+    """
+
+    def __init__(self, shards, vnodes=100):
+        self.shards = {}
+        self.vnodes = vnodes
+        self._ring = []
+        self._points = []
+        for name, conn in shards.items():
+            self.add_shard(name, conn)
+
+    def add_shard(self, name, conn):
+        """Add a shard to the hash ring.
+
+        Users that now belong to the new shard are not moved automatically, use
+        :py:meth:`.rebalance` afterwards.
+
+        :param name: The name of the shard.
+        :type  name: str
+        :param conn: The connection to the shard.
+        :type  conn: :py:class:`.RestAuthConnection`
+        """
+        self.shards[name] = conn
+        for i in range(self.vnodes):
+            bisect.insort(self._ring, (_hash('%s-%s' % (name, i)), name))
+        self._points = [point for point, shard in self._ring]
+
+    def get_shard(self, name):
+        """Get the name of the shard a user belongs to.
+
+        :param name: The name of the user.
+        :type  name: str
+        :rtype: str
+        :raise RestAuthRuntimeException: If there are no shards.
+        """
+        if not self._ring:
+            raise error.RestAuthRuntimeException("No shards configured.")
+
+        index = bisect.bisect(self._points, _hash(name)) % len(self._ring)
+        return self._ring[index][1]
+
+    def get_connection(self, name):
+        """Get the connection to the shard a user belongs to.
+
+        :param name: The name of the user.
+        :type  name: str
+        :rtype: :py:class:`.RestAuthConnection`
+        """
+        return self.shards[self.get_shard(name)]
+
+    def get_user(self, name):
+        """Get a user on the shard it belongs to.
+
+        Like the constructor of :py:class:`.RestAuthUser`, this does not verify that the user
+        exists.
+
+        :param name: The name of the user.
+        :type  name: str
+        :rtype: :py:class:`.RestAuthUser`
+        """
+        conn = self.get_connection(name)
+        return conn._user(conn, name)
+
+    def create_user(self, name, password=None, properties=None):
+        """Create a user on the shard it belongs to.
+
+        See :py:meth:`.RestAuthUser.create` for the parameters and exceptions.
+
+        :rtype: :py:class:`.RestAuthUser`
+        """
+        conn = self.get_connection(name)
+        return conn._user.create(conn, name, password, properties)
+
+    def get_group(self, name, user):
+        """Get a group on the shard of a user, e.g. to check if the user is a member.
+
+        :param name: The name of the group.
+        :type  name: str
+        :param user: The user or the name of a user.
+        :type  user: :py:class:`.RestAuthUser` or str
+        :rtype: :py:class:`.RestAuthGroup`
+        """
+        conn = self.get_connection(getattr(user, 'name', user))
+        return conn._group(conn, name)
+
+    def _fan_out(self, func):
+        """Call ``func`` with every connection concurrently, yield ``(shard, result)`` tuples."""
+        tasks = dict((name, conn._propagate(lambda conn=conn: func(conn)))
+                     for name, conn in self.shards.items())
+        results = iter(Executor(lambda name: tasks[name](), sorted(tasks), workers=len(tasks),
+                                ordered=False))
+        try:
+            for shard, result in results:
+                if isinstance(result, Exception):
+                    raise result
+                yield shard, result
+        finally:
+            results.close()
+
+    def create_group(self, name):
+        """Create a group on all shards, shards where the group already exists are ignored.
+
+        :param name: The name of the group.
+        :type  name: str
+        :raise Unauthorized: When a connection uses wrong credentials.
+        :raise Forbidden: When the client is not allowed to create groups.
+        :raise PreconditionFailed: When the groupname is invalid.
+        :raise InternalServerError: When a RestAuth service returns HTTP status code 500.
+        :raise UnknownStatus: If the response status is unknown.
+        """
+        def create(conn):
+            try:
+                conn._group.create(conn, name)
+            except GroupExists:
+                pass
+
+        for shard, result in self._fan_out(create):
+            pass
+
+    def get_all_users(self, flat=False):
+        """Get all users of all shards.
+
+        All shards are queried concurrently, users are returned as soon as the response of their
+        shard arrives. The order of users is therefore undefined.
+
+        :param flat: If True, return names instead of :py:class:`.RestAuthUser` instances.
+        :type  flat: bool
+        :return: A generator of users or names.
+        :raise Unauthorized: When a connection uses wrong credentials.
+        :raise Forbidden: When the client is not allowed to perform this action.
+        :raise InternalServerError: When a RestAuth service returns HTTP status code 500.
+        :raise UnknownStatus: If the response status is unknown.
+        """
+        for shard, users in self._fan_out(lambda conn: conn._user.get_all(conn, flat=flat)):
+            for user in users:
+                yield user
+
+    def get_all_groups(self, flat=False):
+        """Get all groups of all shards.
+
+        Like :py:meth:`.get_all_users`, all shards are queried concurrently and results are
+        returned as soon as they arrive. A group that exists on several shards is returned only
+        once.
+
+        :param flat: If True, return names instead of :py:class:`.RestAuthGroup` instances. Groups
+            are returned with the connection of the shard where they were found first.
+        :type  flat: bool
+        :return: A generator of groups or names.
+        :raise Unauthorized: When a connection uses wrong credentials.
+        :raise Forbidden: When the client is not allowed to perform this action.
+        :raise InternalServerError: When a RestAuth service returns HTTP status code 500.
+        :raise UnknownStatus: If the response status is unknown.
+        """
+        seen = set()
+        for shard, groups in self._fan_out(lambda conn: conn._group.get_all(conn)):
+            for group in groups:
+                if group.name not in seen:
+                    seen.add(group.name)
+                    yield group.name if flat else group
+
+    def get_members(self, name, flat=False):
+        """Get the members of a group on all shards.
+
+        Shards where the group does not exist are ignored.
+
+        :param name: The name of the group.
+        :type  name: str
+        :param flat: If True, return names instead of :py:class:`.RestAuthUser` instances.
+        :type  flat: bool
+        :return: A generator of users or names.
+        """
+        def fetch(conn):
+            try:
+                return conn._group(conn, name).get_members(flat=flat)
+            except error.ResourceNotFound:
+                return []
+
+        for shard, members in self._fan_out(fetch):
+            for member in members:
+                yield member
+
+    def misplaced(self):
+        """Find users that are not stored on the shard they belong to.
+
+        :return: A generator of ``(name, source, target)`` tuples, where ``source`` is the shard
+            the user is stored on and ``target`` the shard the user belongs to.
+        """
+        for shard, users in self._fan_out(lambda conn: conn._user.get_all(conn, flat=True)):
+            for user in users:
+                target = self.get_shard(user)
+                if target != shard:
+                    yield user, shard, target
+
+    def _move(self, name, source, target, password, hierarchy):
+        """Copy a user with its properties and groups to ``target`` and remove it from ``source``.
+        """
+        secret = password(name)
+        if secret is None:
+            return None
+
+        src, dest = self.shards[source], self.shards[target]
+        user = src._user(src, name)
+        properties = user.get_properties()
+
+        # only copy direct memberships, groups inherited through a meta-group are not copied
+        groups = set(user.get_groups(flat=True))
+        groups = sorted(g for g in groups if not (hierarchy.ancestors(g) - set([g])) & groups)
+
+        try:
+            dest._user.create(dest, name, secret, properties)
+        except UserExists:
+            pass  # copied by an interrupted rebalance
+
+        for group in groups:
+            try:
+                dest._group.create(dest, group)
+            except GroupExists:
+                pass
+        result = dest._user(dest, name).add_groups(groups)
+        if result.failed:
+            raise list(result.failed.values())[0]
+        user.remove()
+        return target
+
+    def rebalance(self, password, workers=10):
+        """Move users that are not stored on the shard they belong to, e.g. after adding a shard.
+
+        Users are copied with their properties and direct group memberships (groups are created
+        on the target shard if necessary) and removed from their old shard afterwards. An
+        interrupted rebalance can be restarted. The RestAuth protocol does not expose passwords,
+        so ``password`` must return the password of every moved user. Users it returns None for
+        are not moved:
+
+        .. code-block:: python
+
+           sharded.add_shard('asia', RestAuthConnection('https://auth.asia.example.com', ...))
+           for name, result in sharded.rebalance(passwords.get, workers=20):
+               if result is None:
+                   print('Password of %s unknown, not moved.' % name)
+               elif isinstance(result, Exception):
+                   print('Could not move %s: %s' % (name, result))
+
+        :param password: Called with the name of a user to get the password of the moved user.
+        :type  password: callable
+        :param  workers: Number of users moved concurrently.
+        :type   workers: int
+        :return: A generator of ``(name, result)`` tuples like :py:meth:`.RestAuthConnection.map`,
+            where ``result`` is the name of the new shard, None if the user was not moved or the
+            exception raised.
+        """
+        hierarchies = dict((name, GroupHierarchy(conn)) for name, conn in self.shards.items())
+
+        def move(item):
+            return self._move(item[0], item[1], item[2], password, hierarchies[item[1]])
+
+        results = iter(Executor(move, self.misplaced(), workers=workers, ordered=False))
+        try:
+            for item, result in results:
+                yield item[0], result
+        finally:
+            results.close()
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of RestAuthClient (https://python.restauth.net).
+#
+# RestAuthClient is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# RestAuthClient is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with RestAuthClient. If
+# not, see <http://www.gnu.org/licenses/>.
+
+"""Store a copy of all data of a RestAuth service in an SQLite database.
+
+.. moduleauthor:: Mathias Ertl <mati@restauth.net>
+"""
+
+import sqlite3
+import time
+
+from RestAuthCommon import error
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.user import RestAuthUser
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY, started REAL NOT NULL, finished REAL);
+CREATE TABLE IF NOT EXISTS users (
+    name TEXT PRIMARY KEY, synced REAL);
+CREATE TABLE IF NOT EXISTS properties (
+    user TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (user, key));
+CREATE TABLE IF NOT EXISTS groups (
+    name TEXT PRIMARY KEY, synced REAL);
+CREATE TABLE IF NOT EXISTS members (
+    grp TEXT NOT NULL, user TEXT NOT NULL, PRIMARY KEY (grp, user));
+CREATE TABLE IF NOT EXISTS subgroups (
+    grp TEXT NOT NULL, subgroup TEXT NOT NULL, PRIMARY KEY (grp, subgroup));
+"""
+
+
+class Snapshot(object):
+    """A copy of all users, their properties, all groups, their members and sub-groups.
+
+    :py:meth:`.sync` lists all users and groups and fetches the details of users and groups that
+    are new or outdated concurrently with :py:meth:`.RestAuthConnection.map`. Results are written
+    in transactions of ``batch_size`` users or groups, which also serve as checkpoints: If a sync
+    is interrupted, the next sync continues where the last one stopped.
+
+    .. code-block:: python
+
+       with Snapshot('restauth.sqlite3') as snapshot:
+           snapshot.sync(conn)  # fetch everything
+           snapshot.sync(conn, max_age=3600)  # fetch details older than an hour
+           snapshot.sync(conn, max_age=None)  # fetch only new users and groups
+
+    The file is a normal SQLite database, the tables are ``users``, ``properties``, ``groups``,
+    ``members`` and ``subgroups``. The members of a group include members inherited from
+    meta-groups, just like :py:meth:`.RestAuthGroup.get_members`. Passwords are never part of a
+    snapshot.
+
+    .. versionadded:: 0.6.2
+
+    :param path: The path to the SQLite database, created if it does not exist.
+    :type  path: str
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database."""
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _start(self):
+        """Get the start time of an unfinished sync or start a new one."""
+        row = self.db.execute('SELECT id, started FROM runs WHERE finished IS NULL').fetchone()
+        if row is not None:
+            return row
+
+        with self.db:
+            now = time.time()
+            cursor = self.db.execute('INSERT INTO runs (started) VALUES (?)', (now, ))
+        return cursor.lastrowid, now
+
+    def _list(self, table, names, removed):
+        """Update the list of users or groups, return the number of removed entries."""
+        current = set(r[0] for r in self.db.execute('SELECT name FROM %s' % table))
+        gone = current - set(names)
+        with self.db:
+            self.db.executemany('INSERT OR IGNORE INTO %s (name) VALUES (?)' % table,
+                                [(n, ) for n in names if n not in current])
+            for name in gone:
+                removed(name)
+        return len(gone)
+
+    def _outdated(self, table, threshold):
+        query = 'SELECT name FROM %s WHERE synced IS NULL OR synced < ? ORDER BY name' % table
+        return [r[0] for r in self.db.execute(query, (threshold, ))]
+
+    def _crawl(self, conn, func, names, write, removed, workers, batch_size):
+        """Fetch ``names`` concurrently and write results in batches."""
+        batch = []
+        count = 0
+        for name, result in conn.map(func, names, ordered=False, workers=workers):
+            if isinstance(result, error.ResourceNotFound):
+                result = None  # removed in the meantime
+            elif isinstance(result, Exception):
+                self._write(batch, write, removed)
+                raise result
+
+            batch.append((name, result))
+            if len(batch) >= batch_size:
+                count += self._write(batch, write, removed)
+                batch = []
+        return count + self._write(batch, write, removed)
+
+    def _write(self, batch, write, removed):
+        now = time.time()
+        with self.db:
+            for name, result in batch:
+                if result is None:
+                    removed(name)
+                else:
+                    write(name, result, now)
+        return len(batch)
+
+    def _remove_user(self, name):
+        self.db.execute('DELETE FROM users WHERE name = ?', (name, ))
+        self.db.execute('DELETE FROM properties WHERE user = ?', (name, ))
+        self.db.execute('DELETE FROM members WHERE user = ?', (name, ))
+
+    def _write_user(self, name, props, now):
+        self.db.execute('DELETE FROM properties WHERE user = ?', (name, ))
+        self.db.executemany('INSERT INTO properties (user, key, value) VALUES (?, ?, ?)',
+                            [(name, k, v) for k, v in props.items()])
+        self.db.execute('UPDATE users SET synced = ? WHERE name = ?', (now, name))
+
+    def _remove_group(self, name):
+        self.db.execute('DELETE FROM groups WHERE name = ?', (name, ))
+        self.db.execute('DELETE FROM members WHERE grp = ?', (name, ))
+        self.db.execute('DELETE FROM subgroups WHERE grp = ? OR subgroup = ?', (name, name))
+
+    def _write_group(self, name, result, now):
+        members, subgroups = result
+        self.db.execute('DELETE FROM members WHERE grp = ?', (name, ))
+        self.db.executemany('INSERT INTO members (grp, user) VALUES (?, ?)',
+                            [(name, m) for m in members])
+        self.db.execute('DELETE FROM subgroups WHERE grp = ?', (name, ))
+        self.db.executemany('INSERT INTO subgroups (grp, subgroup) VALUES (?, ?)',
+                            [(name, g) for g in subgroups])
+        self.db.execute('UPDATE groups SET synced = ? WHERE name = ?', (now, name))
+
+    def sync(self, conn, max_age=0, workers=None, batch_size=100):
+        """Update the snapshot.
+
+        All users and groups are listed to find new and removed ones. The properties of users and
+        the members and sub-groups of groups are fetched if they were never fetched before or if
+        they are older than ``max_age`` seconds. An interrupted sync is continued by the next sync,
+        where ``max_age`` is relative to the start of the interrupted sync.
+
+        :param       conn: A connection to a RestAuth service.
+        :type        conn: :py:class:`.RestAuthConnection`
+        :param    max_age: Fetch details older than this many seconds. The default ``0`` fetches
+            all details, so the snapshot is current afterwards. ``None`` only fetches details
+            never fetched before, so changed properties, members and sub-groups of existing users
+            and groups are not updated.
+        :type     max_age: float
+        :param    workers: Number of concurrent requests, the default is the ``pool_size`` of
+            ``conn``.
+        :type     workers: int
+        :param batch_size: Number of users or groups written in one transaction.
+        :type  batch_size: int
+        :return: The number of users and groups fetched and removed, with the keys ``"users"``,
+            ``"groups"``, ``"removed_users"`` and ``"removed_groups"``.
+        :rtype: dict
+        """
+        run, started = self._start()
+        if max_age is None:
+            threshold = 0
+        else:
+            threshold = started - max_age
+        stats = {}
+
+        def get_user(name):
+            return RestAuthUser(conn, name).get_properties()
+
+        def get_group(name):
+            group = RestAuthGroup(conn, name)
+            return group.get_members(flat=True), group.get_groups(flat=True)
+
+        stats['removed_users'] = self._list(
+            'users', RestAuthUser.get_all(conn, flat=True), self._remove_user)
+        stats['users'] = self._crawl(conn, get_user, self._outdated('users', threshold),
+                                     self._write_user, self._remove_user, workers, batch_size)
+
+        stats['removed_groups'] = self._list(
+            'groups', RestAuthGroup.get_all(conn, flat=True), self._remove_group)
+        stats['groups'] = self._crawl(conn, get_group, self._outdated('groups', threshold),
+                                      self._write_group, self._remove_group, workers, batch_size)
+
+        with self.db:
+            self.db.execute('UPDATE runs SET finished = ? WHERE id = ?', (time.time(), run))
+        return stats
+
+    @property
+    def synced(self):
+        """Timestamp when the last complete sync was started or None if there was none."""
+        row = self.db.execute('SELECT MAX(started) FROM runs WHERE finished IS NOT NULL')
+        return row.fetchone()[0]
+
+    def get_users(self):
+        """Get the names of all users."""
+        return [r[0] for r in self.db.execute('SELECT name FROM users ORDER BY name')]
+
+    def get_properties(self, user):
+        """Get the properties of a user."""
+        query = 'SELECT key, value FROM properties WHERE user = ?'
+        return dict(self.db.execute(query, (user, )))
+
+    def get_groups(self):
+        """Get the names of all groups."""
+        return [r[0] for r in self.db.execute('SELECT name FROM groups ORDER BY name')]
+
+    def get_members(self, group):
+        """Get the names of the members of a group."""
+        query = 'SELECT user FROM members WHERE grp = ? ORDER BY user'
+        return [r[0] for r in self.db.execute(query, (group, ))]
+
+    def get_subgroups(self, group):
+        """Get the names of the sub-groups of a group."""
+        query = 'SELECT subgroup FROM subgroups WHERE grp = ? ORDER BY subgroup'
+        return [r[0] for r in self.db.execute(query, (group, ))]
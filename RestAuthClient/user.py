@@ -16,6 +16,7 @@
 """Module handling code relevant to user authentication and property management."""
 
 import sys
+import threading
 
 if sys.version_info > (3, ):  # pragma: py3
     PY3 = True
@@ -25,9 +26,57 @@ else:  # pragma: py2
     import httplib as http
 
 from RestAuthCommon import error
+from RestAuthClient.error import CircuitOpen
 from RestAuthClient.error import PropertyExists
 from RestAuthClient.error import UnknownStatus
 from RestAuthClient.error import UserExists
+from RestAuthClient.executor import _bulk
+
+
+class _Fetch(threading.Thread):
+    """Thread that stores the return value or the exception raised by a function."""
+
+    def __init__(self, func, *args, **kwargs):
+        super(_Fetch, self).__init__()
+        self.daemon = True
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.result = self.exception = None
+
+    def run(self):
+        try:
+            self.result = self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            self.exception = e
+
+    def get(self):
+        self.join()
+        if self.exception is not None:
+            raise self.exception
+        return self.result
+
+
+class RestAuthLogin(object):
+    """The result of a successful :py:meth:`.RestAuthUser.login`.
+
+    .. versionadded:: 0.6.2
+
+    :param user: The user that logged in.
+    :type  user: :py:class:`.RestAuthUser`
+    :param properties: The properties of the user, if requested.
+    :type  properties: dict
+    :param groups: The groups of the user, if requested.
+    :type  groups: [:py:class:`.RestAuthGroup` or str]
+    """
+
+    def __init__(self, user, properties=None, groups=None):
+        self.user = user
+        self.properties = properties
+        self.groups = groups
+
+    def __repr__(self):  # pragma: no cover
+        return '<Login: {0}>'.format(self.user)
 
 
 class RestAuthUser(object):
@@ -108,6 +157,53 @@ class RestAuthUser(object):
         else:  # pragma: no cover
             raise UnknownStatus(resp)
 
+    def login(self, password, properties=True, groups=True, flat=False):
+        """Verify the password and fetch the properties and groups of this user.
+
+        The properties and groups are fetched in parallel to verifying the password, so logging in
+        a user costs about one round trip instead of three. If the password is wrong, the
+        speculatively fetched data is discarded.
+
+        .. versionadded:: 0.6.2
+
+        :param password: The password to verify.
+        :type  password: str
+        :param properties: Also fetch the properties of the user.
+        :type  properties: bool
+        :param groups: Also fetch the groups of the user.
+        :type  groups: bool
+        :param flat: If True, return group names as str instead of :py:class:`.RestAuthGroup`
+            instances.
+        :type  flat: bool
+        :return: The login with properties and groups or None if the password is wrong or the user
+            does not exist.
+        :rtype: :py:class:`.RestAuthLogin`
+
+        :raise Unauthorized: When the connection uses wrong credentials.
+        :raise Forbidden: When the client is not allowed to perform this action.
+        :raise NotAcceptable: When the server cannot generate a response in the content type used
+            by this connection (see also: :py:meth:`~.RestAuthConnection.set_content_handler`).
+        :raise InternalServerError: When the RestAuth service returns HTTP status code 500.
+        :raise UnknownStatus: If the response status is unknown.
+        """
+        fetches = []
+        if properties:
+            fetches.append(_Fetch(self.conn._propagate(self.get_properties)))
+        if groups:
+            fetches.append(_Fetch(self.conn._propagate(self.get_groups), flat=flat))
+        for fetch in fetches:
+            fetch.start()
+
+        if not self.verify_password(password):
+            return None  # threads are daemonic, we do not have to wait for them
+
+        login = self.conn._login(self)
+        if properties:
+            login.properties = fetches.pop(0).get()
+        if groups:
+            login.groups = fetches.pop(0).get()
+        return login
+
     def remove(self):
         """Remove this user.
 
@@ -118,6 +214,9 @@ class RestAuthUser(object):
         :raise UnknownStatus: If the response status is unknown.
         """
         resp = self.delete('/users/%s/' % self.quote(self.name))
+        if self.conn.cache is not None:
+            self.conn.cache.invalidate_user(self.name)
+
         if resp.status == http.NO_CONTENT:
             return
         if resp.status == http.NOT_FOUND:
@@ -136,9 +235,25 @@ class RestAuthUser(object):
         :raise InternalServerError: When the RestAuth service returns HTTP status code 500.
         :raise UnknownStatus: If the response status is unknown.
         """
-        resp = self.get('/users/%s/props/' % self.quote(self.name))
+        cache = self.conn.cache
+        if cache is not None:
+            props = cache.get_properties(self.name)
+            if props is not None:
+                return props
+
+        try:
+            resp = self.get('/users/%s/props/' % self.quote(self.name))
+        except CircuitOpen:
+            props = None if cache is None else cache.get_properties(self.name, stale=True)
+            if props is None:
+                raise
+            return props
+
         if resp.status == http.OK:
-            return self.conn.content_handler.unmarshal_dict(resp.read())
+            props = self.conn.content_handler.unmarshal_dict(resp.read())
+            if cache is not None:
+                cache.set_properties(self.name, props)
+            return props
         elif resp.status == http.NOT_FOUND:
             raise error.ResourceNotFound(resp)
         else:  # pragma: no cover
@@ -167,6 +282,9 @@ class RestAuthUser(object):
         """
         params = {'prop': prop, 'value': value}
         resp = self.post('/users/%s/props/' % self.quote(self.name), params=params)
+        if self.conn.cache is not None:
+            self.conn.cache.invalidate_properties(self.name)
+
         if resp.status == http.CREATED:
             return
         elif resp.status == http.NOT_FOUND:
@@ -223,6 +341,9 @@ class RestAuthUser(object):
         """
         resp = self.put('/users/%s/props/%s/' % (self.quote(self.name), self.quote(prop)),
                         params={'value': value})
+        if self.conn.cache is not None:
+            self.conn.cache.invalidate_properties(self.name)
+
         if resp.status == http.OK:
             return self.conn.content_handler.unmarshal_str(resp.read())
         if resp.status == http.CREATED:
@@ -253,6 +374,9 @@ class RestAuthUser(object):
         :raise UnknownStatus: If the response status is unknown.
         """
         resp = self.put('/users/%s/props/' % self.quote(self.name), params=props)
+        if self.conn.cache is not None:
+            self.conn.cache.invalidate_properties(self.name)
+
         if resp.status == http.NO_CONTENT:
             return
         elif resp.status == http.NOT_FOUND:
@@ -275,6 +399,11 @@ class RestAuthUser(object):
         :raise InternalServerError: When the RestAuth service returns HTTP status code 500.
         :raise UnknownStatus: If the response status is unknown.
         """
+        if self.conn.cache is not None:
+            props = self.conn.cache.get_properties(self.name)
+            if props is not None and prop in props:
+                return props[prop]
+
         resp = self.get('/users/%s/props/%s/' % (self.quote(self.name), self.quote(prop)))
         if resp.status == http.OK:
             return self.conn.content_handler.unmarshal_str(resp.read())
@@ -293,6 +422,9 @@ class RestAuthUser(object):
         :raise UnknownStatus: If the response status is unknown.
         """
         resp = self.delete('/users/%s/props/%s/' % (self.quote(self.name), self.quote(prop)))
+        if self.conn.cache is not None:
+            self.conn.cache.invalidate_properties(self.name)
+
         if resp.status == http.NO_CONTENT:
             return
         elif resp.status == http.NOT_FOUND:
@@ -373,6 +505,44 @@ class RestAuthUser(object):
             grp = self.conn._group(self.conn, grp)
         grp.remove_user(self.name)
 
+    def add_groups(self, groups, workers=None):
+        """Make this user a member of many groups.
+
+        This is the counterpart of :py:meth:`.RestAuthGroup.add_users`, groups are added
+        concurrently and ``groups`` is consumed as a stream.
+
+        .. versionadded:: 0.6.2
+
+        :param  groups: The groups or names of the groups.
+        :type   groups: iterable of :py:class:`.RestAuthGroup` or str
+        :param workers: Number of concurrent requests, the default is the ``pool_size`` of the
+            connection.
+        :type  workers: int
+        :return: The groups the user was added to, the groups that do not exist and the groups the
+            user could not be added to for other reasons (e.g. because the user does not exist).
+        :rtype: :py:class:`~.executor.BulkResult`
+        """
+        return _bulk(self.conn, self.add_group, groups, 'group', 'added', workers)
+
+    def remove_groups(self, groups, workers=None):
+        """Remove the membership of this user from many groups.
+
+        This works like :py:meth:`.add_groups`. Note that RestAuth reports the *user* as not found
+        if the user is not a member of a group, so such groups are listed as failed.
+
+        .. versionadded:: 0.6.2
+
+        :param  groups: The groups or names of the groups.
+        :type   groups: iterable of :py:class:`.RestAuthGroup` or str
+        :param workers: Number of concurrent requests, the default is the ``pool_size`` of the
+            connection.
+        :type  workers: int
+        :return: The groups the user was removed from, the groups that do not exist and the groups
+            the user could not be removed from for other reasons.
+        :rtype: :py:class:`~.executor.BulkResult`
+        """
+        return _bulk(self.conn, self.remove_group, groups, 'group', 'removed', workers)
+
     @classmethod
     def create(cls, conn, name, password=None, properties=None):
         """Factory method that creates a *new* user in the RestAuth database.
@@ -405,6 +575,8 @@ class RestAuthUser(object):
 
         resp = conn.post('/users/', params)
         if resp.status == http.CREATED:
+            if conn.cache is not None:
+                conn.cache.set_user(name)
             return cls(conn, name)
         elif resp.status == http.CONFLICT:
             raise UserExists(name)
@@ -460,10 +632,15 @@ class RestAuthUser(object):
         :raise InternalServerError: When the RestAuth service returns HTTP status code 500.
         :raise UnknownStatus: If the response status is unknown.
         """
+        if conn.cache is not None and conn.cache.get_user(name):
+            return cls(conn, name)
+
         # this just verify that the user exists in RestAuth:
         resp = conn.get('/users/%s/' % (conn.quote(name)))
 
         if resp.status == http.NO_CONTENT:
+            if conn.cache is not None:
+                conn.cache.set_user(name)
             return cls(conn, name)
         elif resp.status == http.NOT_FOUND:
             raise error.ResourceNotFound(resp)
@@ -515,3 +692,158 @@ class RestAuthUser(object):
             return '<User: {0}>'.format(self.name.encode('utf-8'))
         else:
             return '<User: {0}>'.format(self.name)
+
+
+class PropertyWriter(object):
+    """Buffer property updates and send them with as few requests as possible.
+
+    Updates are collected per user and sent with a single :py:meth:`.RestAuthUser.set_properties`
+    call per user. Repeated updates of the same property only send the last value. Pending updates
+    are sent when :py:meth:`.flush` is called, when ``max_size`` updates are pending or every
+    ``interval`` seconds. The writer can also be used as context manager, in which case all
+    pending updates are sent when leaving the block:
+
+    .. code-block:: python
+
+       with PropertyWriter(conn, max_size=500) as writer:
+           for name, email in addresses:
+               writer.set_property(name, 'email', email)
+
+    If setting the properties of a user fails because a property name is invalid, the properties
+    are set one by one to find out which property caused the error. Errors are reported per
+    property by :py:meth:`.flush` and passed to the ``callback``, if given.
+
+    .. versionadded:: 0.6.2
+
+    :param conn: A connection to a RestAuth service.
+    :type  conn: :py:class:`.RestAuthConnection`
+    :param max_size: Send pending updates once this many properties are pending.
+    :type  max_size: int
+    :param interval: Send pending updates every ``interval`` seconds.
+    :type  interval: float
+    :param callback: Called as ``callback(user, prop, exception)`` for every property that could
+        not be set.
+    :type  callback: callable
+    """
+
+    def __init__(self, conn, max_size=100, interval=None, callback=None):
+        self.conn = conn
+        self.max_size = max_size
+        self.interval = interval
+        self.callback = callback
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.RLock()  # serializes flushes, so later updates land last
+        self._pending = {}
+        self._size = 0
+        self._timer = None
+        if interval:
+            self._schedule()
+
+    def set_property(self, user, prop, value):
+        """Queue setting a property.
+
+        :param user: The user or the name of the user.
+        :type  user: :py:class:`.RestAuthUser` or str
+        :param prop: The property to set.
+        :type  prop: str
+        :param value: The new value of the property.
+        :type  value: str
+        :return: Errors if pending updates had to be sent, see :py:meth:`.flush`.
+        """
+        return self.set_properties(user, {prop: value})
+
+    def set_properties(self, user, props):
+        """Queue setting multiple properties.
+
+        :param user: The user or the name of the user.
+        :type  user: :py:class:`.RestAuthUser` or str
+        :param props: The properties to set.
+        :type  props: dict
+        :return: Errors if pending updates had to be sent, see :py:meth:`.flush`.
+        """
+        if hasattr(user, 'name'):
+            user = user.name
+
+        with self._lock:
+            pending = self._pending.setdefault(user, {})
+            self._size -= len(pending)
+            pending.update(props)
+            self._size += len(pending)
+            full = self._size >= self.max_size
+
+        if full:
+            return self.flush()
+        return {}
+
+    def flush(self):
+        """Send all pending updates.
+
+        Flushes never overlap: If another thread is already sending updates, this call waits for it
+        to finish, so a property always ends up with the value that was set last.
+
+        :return: A dictionary of ``{username: {property: exception}}`` for all properties that
+            could not be set.
+        :rtype: dict
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending, self._size = self._pending, {}, 0
+
+            errors = {}
+            for name, props in pending.items():
+                failed = self._write(self.conn._user(self.conn, name), props)
+                if failed:
+                    errors[name] = failed
+                    if self.callback is not None:
+                        for prop, e in failed.items():
+                            self.callback(name, prop, e)
+            return errors
+
+    def _write(self, user, props):
+        try:
+            user.set_properties(props)
+            return {}
+        except error.PreconditionFailed as e:
+            if len(props) == 1:
+                return dict((prop, e) for prop in props)
+        except Exception as e:
+            return dict((prop, e) for prop in props)
+
+        # At least one property name is invalid, set them one by one to find out which.
+        errors = {}
+        for prop, value in props.items():
+            try:
+                user.set_property(prop, value)
+            except Exception as e:
+                errors[prop] = e
+        return errors
+
+    def close(self):
+        """Stop sending updates periodically and send all pending updates.
+
+        :return: Errors of the last flush, see :py:meth:`.flush`.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return self.flush()
+
+    def _schedule(self):
+        self._timer = threading.Timer(self.interval, self._periodic_flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _periodic_flush(self):
+        try:
+            self.flush()
+        finally:
+            if self._timer is not None:
+                self._schedule()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
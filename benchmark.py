@@ -7,11 +7,9 @@ import time
 from queue import Queue
 from threading import Thread
 
-from RestAuthClient.restauth_user import (
-    User, get as user_get, create as user_create, get_all as user_get_all)
-from RestAuthClient.group import (
-    create as group_create, get as group_get, get_all as group_get_all)
 from RestAuthClient.common import RestAuthConnection
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.user import RestAuthUser
 
 parser = argparse.ArgumentParser(description="Benchmark a RestAuth service.")
 parser.add_argument('-c', '--count', type=int, metavar='N', default=100,
@@ -26,10 +24,46 @@ parser.add_argument(
 )
 parser.add_argument('-t', '--threads', type=int, metavar='N', default=50,
                     help="Start N threads at once (default: %(default)s).")
+parser.add_argument('--micro', type=int, metavar='N', nargs='?', const=2000,
+                    help="Only measure the client-side cost of N sequential calls of frequently "
+                    "used methods (default: %(const)s).")
 args = parser.parse_args()
 
 count = args.count
 
+
+def micro(conn, calls):
+    """Measure wall clock and CPU time per call of frequently used methods."""
+    user = RestAuthUser.create(conn, 'benchmark', 'foobar', {'key': 'val'})
+    group = RestAuthGroup.create(conn, 'benchmark')
+    group.add_user(user)
+
+    benchmarks = [
+        ('verify_password', lambda: user.verify_password('foobar')),
+        ('is_member', lambda: group.is_member('benchmark')),
+        ('get_property', lambda: user.get_property('key')),
+        ('RestAuthUser.get', lambda: RestAuthUser.get(conn, 'benchmark')),
+    ]
+    try:
+        for name, func in benchmarks:
+            for i in range(int(calls / 10)):  # warm up the connection pool
+                func()
+
+            start, cpu_start = time.time(), time.process_time()
+            for i in range(calls):
+                func()
+            wall, cpu = time.time() - start, time.process_time() - cpu_start
+            print('%-17s %8.1f us/call, %8.1f us CPU/call' % (
+                name, wall / calls * 1000000, cpu / calls * 1000000))
+    finally:
+        user.remove()
+        group.remove()
+
+
+if args.micro:
+    micro(RestAuthConnection(args.host, args.user, args.password), args.micro)
+    sys.exit(0)
+
 usernames = ['user%s' % i for i in range(1, count)]
 props = dict([('key%s' % i, 'val%s' % i) for i in range(1, int(count / 10))])
 groupnames = ['group%s' % i for i in range(1, count)]
@@ -55,7 +89,7 @@ def worker(queue):
     while True:
         username = queue.get()
         try:
-            users.append(user_create(conn, username, 'foobar'))
+            users.append(RestAuthUser.create(conn, username, 'foobar'))
         except Exception as e:
             print(e.args[0].read())
         queue.task_done()
@@ -73,9 +107,9 @@ sys.stdout.flush()
 def worker(queue):
     while True:
         username = queue.get()
-        user_get(conn, username)
-        user_get(conn, username)
-        user_get(conn, username)
+        RestAuthUser.get(conn, username)
+        RestAuthUser.get(conn, username)
+        RestAuthUser.get(conn, username)
         queue.task_done()
 q = execute(worker)
 start = time.time()
@@ -200,7 +234,7 @@ sys.stdout.flush()
 def worker(queue):
     while True:
         name = queue.get()
-        groups.append(group_create(conn, name))
+        groups.append(RestAuthGroup.create(conn, name))
         queue.task_done()
 q = execute(worker)
 start = time.time()
@@ -16,6 +16,7 @@
 
 from __future__ import unicode_literals
 
+import importlib
 import os
 import re
 import sys
@@ -111,10 +112,16 @@ class version(Command):
         print(get_version())
 
 
+test_parts = [
+    'connection', 'users', 'groups', 'cache', 'session', 'executor', 'hierarchy', 'index',
+    'planner', 'expression', 'export', 'snapshot', 'reconcile', 'job', 'retry', 'breaker',
+    'replica', 'shard',
+]
+
+
 def run_test_suite(host, user, passwd, part=None, fail_on_error=False):
     if part is None:
-        from tests import connection, users, groups
-        suite = connection, users, groups
+        suite = [importlib.import_module('tests.%s' % name) for name in test_parts]
     else:
         mod = __import__('tests', globals(), locals(), [part], -1)
         suite = [getattr(mod, part)]
@@ -165,8 +172,7 @@ class test(Command):
     description = "Run test suite."
     user_options = server_options + [
         # cast to str because Python2 distutils requires a str.
-        (str('part='), None,
-         'Only test one module (either "connection", "users" or "groups")'),
+        (str('part='), None, 'Only test one module (one of %s)' % ', '.join(test_parts)),
     ]
 
     def initialize_options(self):
@@ -176,8 +182,8 @@ class test(Command):
         self.part = None
 
     def finalize_options(self):
-        if self.part not in [None, 'connection', 'users', 'groups']:
-            print('part must be one of "connection", "users" or "groups"')
+        if self.part is not None and self.part not in test_parts:
+            print('part must be one of %s' % ', '.join(test_parts))
             sys.exit(1)
 
     def run(self):
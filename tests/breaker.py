@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import socket
+import time
+
+from RestAuthClient.breaker import CLOSED
+from RestAuthClient.breaker import HALF_OPEN
+from RestAuthClient.breaker import OPEN
+from RestAuthClient.breaker import CircuitBreaker
+from RestAuthClient.cache import RestAuthCache
+from RestAuthClient.common import RestAuthConnection
+from RestAuthClient.error import CircuitOpen
+from RestAuthClient.error import HttpException
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.retry import RetryPolicy
+from RestAuthClient.user import RestAuthUser
+
+from .base import RestAuthClientTestCase
+
+
+class FailingConnection(RestAuthConnection):
+    """Connection where all requests fail with a transport error while ``down`` is True."""
+    down = False
+    sent = 0
+
+    def _gate(self, *args):
+        self.sent += 1
+        if self.down:
+            raise HttpException(socket.error('Connection refused'))
+        return super(FailingConnection, self)._gate(*args)
+
+
+class CircuitBreakerTests(RestAuthClientTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker(window=4, cooldown=0.05)
+        self.changes = []
+        self.breaker.listeners.append(lambda b, old, new: self.changes.append((old, new)))
+
+    def tearDown(self):
+        pass
+
+    def record_failures(self, count):
+        for i in range(count):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record(False)
+
+    def test_threshold(self):
+        self.record_failures(1)
+        self.breaker.record(True)
+        self.record_failures(1)
+        self.assertEqual(CLOSED, self.breaker.state)  # fewer than window requests
+
+        self.record_failures(1)  # 3 of 4 failed
+        self.assertEqual(OPEN, self.breaker.state)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual([(CLOSED, OPEN)], self.changes)
+
+    def test_window(self):
+        for i in range(10):  # failures never make up half of the window
+            self.breaker.record(i % 3 != 0)
+            self.breaker.record(True)
+        self.assertEqual(CLOSED, self.breaker.state)
+
+    def test_half_open(self):
+        self.record_failures(4)
+        time.sleep(0.06)
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(HALF_OPEN, self.breaker.state)
+        self.assertFalse(self.breaker.allow())  # only one probe
+
+        self.breaker.record(True)
+        self.assertEqual(CLOSED, self.breaker.state)
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual([(CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED)], self.changes)
+
+    def test_probe_failed(self):
+        self.record_failures(4)
+        time.sleep(0.06)
+        self.record_failures(1)
+        self.assertEqual(OPEN, self.breaker.state)
+        self.assertFalse(self.breaker.allow())
+
+        time.sleep(0.06)
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()  # e.g. the deadline passed
+        self.assertTrue(self.breaker.allow())
+
+    def test_stale(self):
+        generation = self.breaker.allow()  # sent before the breaker opened
+        self.record_failures(4)
+        time.sleep(0.06)
+        probe = self.breaker.allow()
+        self.assertTrue(probe)
+
+        self.breaker.record(True, generation=generation)
+        self.breaker.release(generation)
+        self.assertEqual(HALF_OPEN, self.breaker.state)
+        self.assertFalse(self.breaker.allow())  # the probe is still running
+
+        self.breaker.record(True, generation=probe)
+        self.assertEqual(CLOSED, self.breaker.state)
+
+    def test_slow(self):
+        breaker = CircuitBreaker(threshold=1, window=2, slow=0.1)
+        breaker.record(True, 0.05)
+        breaker.record(True, 0.2)
+        self.assertEqual(CLOSED, breaker.state)
+        breaker.record(True, 0.3)
+        self.assertEqual(OPEN, breaker.state)
+
+
+class ConnectionTests(RestAuthClientTestCase):
+    def setUp(self):
+        super(ConnectionTests, self).setUp()
+        self.cache = RestAuthCache(memberships=0.05, properties=0.05)
+        self.breaker = CircuitBreaker(window=2, cooldown=60)
+        self.failing = FailingConnection('http://[::1]:8000', 'example.com', 'nopass',
+                                         cache=self.cache, breaker=self.breaker)
+
+    def tearDown(self):
+        for user in RestAuthUser.get_all(self.conn):
+            user.remove()
+        for group in RestAuthGroup.get_all(self.conn):
+            group.remove()
+
+    def test_open(self):
+        self.failing.down = True
+        for i in range(2):
+            self.assertRaises(HttpException, RestAuthUser.get_all, self.failing)
+        self.assertEqual(OPEN, self.breaker.state)
+
+        start = time.time()
+        self.assertRaises(CircuitOpen, RestAuthUser.get_all, self.failing)
+        self.assertTrue(time.time() - start < 0.05)
+        self.assertEqual(2, self.failing.sent)
+
+        metrics = self.failing.metrics
+        self.assertEqual((1, 1), (metrics['breaker_open'], metrics['breaker_rejected']))
+
+    def test_close(self):
+        self.breaker.cooldown = 0.05
+        self.failing.down = True
+        for i in range(2):
+            self.assertRaises(HttpException, RestAuthUser.get_all, self.failing)
+
+        self.failing.down = False
+        time.sleep(0.06)
+        self.assertEqual([], RestAuthUser.get_all(self.failing))
+        self.assertEqual(CLOSED, self.breaker.state)
+        self.assertEqual({'breaker_open': 1, 'breaker_half_open': 1, 'breaker_closed': 1},
+                         self.failing.metrics.as_dict())
+
+    def test_no_retry(self):
+        self.failing.retry = RetryPolicy(backoff=0.001)
+        self.failing.down = True
+        self.breaker.window = 1
+        self.assertRaises(CircuitOpen, RestAuthUser.get_all, self.failing)
+        self.assertEqual(1, self.failing.sent)
+
+    def test_stale_cache(self):
+        user = RestAuthUser.create(self.conn, 'mati', properties={'foo': 'bar'})
+        group = RestAuthGroup.create(self.conn, 'group')
+        group.add_user(user)
+
+        failing_user = RestAuthUser(self.failing, 'mati')
+        failing_group = RestAuthGroup(self.failing, 'group')
+        self.assertEqual('bar', failing_user.get_properties()['foo'])
+        self.assertTrue(failing_group.is_member('mati'))
+        time.sleep(0.06)  # cache entries are now expired
+
+        self.failing.down = True
+        self.assertRaises(HttpException, failing_user.get_properties)  # 1 of 2 requests failed
+        self.assertEqual(OPEN, self.breaker.state)
+
+        self.assertEqual('bar', failing_user.get_properties()['foo'])
+        self.assertTrue(failing_group.is_member('mati'))
+        self.assertRaises(CircuitOpen, failing_group.is_member, 'other')
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import gc
+import os
+import shutil
+import tempfile
+import time
+import weakref
+
+from RestAuthClient import cache as cache_module
+from RestAuthClient.cache import RestAuthCache
+from RestAuthClient.common import RestAuthConnection
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.user import RestAuthUser
+
+from .base import RestAuthClientTestCase
+from .base import mime_type
+
+username = "mati \u6109"
+groupname = "group \u6114"
+propKey = "mati \u6112"
+propVal = "mati \u6113"
+
+
+class CachedTests(RestAuthClientTestCase):
+    def setUp(self):
+        super(CachedTests, self).setUp()
+        self.cache = RestAuthCache(memberships=60, properties=60, users=60)
+        self.cached = RestAuthConnection('http://[::1]:8000', 'example.com', 'nopass',
+                                         content_handler=mime_type, cache=self.cache)
+
+        self.user = RestAuthUser.create(self.conn, username, 'foobar')
+        self.group = RestAuthGroup.create(self.conn, groupname)
+
+    def tearDown(self):
+        for user in RestAuthUser.get_all(self.conn):
+            user.remove()
+        for grp in RestAuthGroup.get_all(self.conn):
+            grp.remove()
+
+    def test_membership(self):
+        grp = RestAuthGroup(self.cached, groupname)
+        self.assertFalse(grp.is_member(username))
+
+        # changed behind the back of the cache:
+        self.group.add_user(username)
+        self.assertFalse(grp.is_member(username))
+
+        # changes on the cached connection invalidate the cache:
+        grp.remove_user(username)
+        grp.add_user(username)
+        self.assertTrue(grp.is_member(username))
+        self.assertTrue(RestAuthUser(self.cached, username).in_group(groupname))
+
+    def test_properties(self):
+        user = RestAuthUser(self.cached, username)
+        self.assertEqual(user.get_properties(), self.user.get_properties())
+
+        self.user.set_property(propKey, propVal)
+        self.assertFalse(propKey in user.get_properties())
+
+        user.set_property(propKey, propVal)
+        self.assertEqual(propVal, user.get_properties()[propKey])
+        self.assertEqual(propVal, user.get_property(propKey))
+
+    def test_users(self):
+        self.assertEqual(self.user, RestAuthUser.get(self.cached, username))
+        self.user.remove()
+        self.assertEqual(self.user, RestAuthUser.get(self.cached, username))
+
+
+class PersistenceTests(RestAuthClientTestCase):
+    def setUp(self):
+        super(PersistenceTests, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_roundtrip(self):
+        cache = RestAuthCache(memberships=60, properties=60, users=60, path=self.path,
+                              persist=['memberships', 'properties', 'users'])
+        cache.set_membership(groupname, username, True)
+        cache.set_membership('foo', username, False)
+        cache.set_properties(username, {propKey: propVal})
+        cache.set_user(username)
+        cache.save()
+
+        loaded = RestAuthCache(memberships=60, properties=60, users=60, path=self.path,
+                               persist=['memberships', 'properties', 'users'])
+        self.assertTrue(loaded.get_membership(groupname, username))
+        self.assertFalse(loaded.get_membership('foo', username))
+        self.assertEqual(None, loaded.get_membership('bar', username))
+        self.assertEqual({propKey: propVal}, loaded.get_properties(username))
+        self.assertTrue(loaded.get_user(username))
+        self.assertFalse(loaded.get_user('foobar'))
+
+        # invalidated entries are not resurrected from the file:
+        loaded.invalidate_user(username)
+        self.assertEqual(None, loaded.get_membership(groupname, username))
+        self.assertEqual(None, loaded.get_properties(username))
+        self.assertFalse(loaded.get_user(username))
+
+    def test_persist_opt_in(self):
+        cache = RestAuthCache(memberships=60, properties=60, path=self.path,
+                              persist=['memberships'])
+        cache.set_membership(groupname, username, True)
+        cache.set_properties(username, {propKey: propVal})
+        cache.save()
+
+        loaded = RestAuthCache(memberships=60, properties=60, path=self.path,
+                               persist=['memberships', 'properties'])
+        self.assertTrue(loaded.get_membership(groupname, username))
+        self.assertEqual(None, loaded.get_properties(username))
+
+    def test_expired(self):
+        cache = RestAuthCache(memberships=0.1, path=self.path, persist=['memberships'])
+        cache.set_membership(groupname, username, True)
+        cache.save()
+        time.sleep(0.2)
+
+        loaded = RestAuthCache(memberships=60, path=self.path, persist=['memberships'])
+        self.assertEqual(None, loaded.get_membership(groupname, username))
+
+    def test_invalid_file(self):
+        with open(self.path, 'wb') as stream:
+            stream.write(b'foobar')
+
+        cache = RestAuthCache(memberships=60, path=self.path, persist=['memberships'])
+        self.assertEqual(None, cache.get_membership(groupname, username))
+
+    def test_collected(self):
+        cache = RestAuthCache(memberships=60, path=self.path, persist=['memberships'],
+                              save_interval=60)
+        cache.set_membership(groupname, username, True)
+        self.assertIn(cache, cache_module._persisted)
+
+        ref = weakref.ref(cache)
+        del cache
+        gc.collect()
+        self.assertEqual(None, ref())
+
+        cache_module._save_all()  # must not fail for collected caches
+        self.assertFalse(os.path.exists(self.path))
@@ -2,8 +2,31 @@
 
 from __future__ import unicode_literals
 
+import os
+import select
+import shutil
+import socket
+import ssl
+import sys
+import tempfile
+import threading
+import time
+import weakref
+
+if sys.version_info >= (3, ):
+    from http.server import BaseHTTPRequestHandler
+    from http.server import HTTPServer
+else:
+    from BaseHTTPServer import BaseHTTPRequestHandler
+    from BaseHTTPServer import HTTPServer
+
+from RestAuthClient import cache as cache_module
+from RestAuthClient.cache import RestAuthCache
 from RestAuthClient.common import RestAuthConnection
+from RestAuthClient.error import DeadlineExceeded
 from RestAuthClient.error import HttpException
+from RestAuthClient.pool import HTTPConnection
+from RestAuthClient.pool import HTTPSConnection
 from RestAuthClient.user import RestAuthUser
 from RestAuthCommon import error
 
@@ -166,3 +189,304 @@ class BasicTests(RestAuthClientTestCase):
 
         # casts to str in python2:
         self.assertEqual(self.conn._sanitize_qs({str('foo'): str('bar')}), 'foo=bar')
+
+    def test_keep_alive(self):
+        conn = RestAuthConnection('http://[::1]:8000', rest_user, rest_passwd, pool_size=1)
+        RestAuthUser.get_all(conn)
+        self.assertEqual(1, len(conn._pool._idle))
+        idle = conn._pool._idle[0]
+
+        RestAuthUser.get_all(conn)
+        self.assertEqual([idle], conn._pool._idle)
+
+    def test_stale_connection(self):
+        conn = RestAuthConnection('http://[::1]:8000', rest_user, rest_passwd, pool_size=1)
+        RestAuthUser.get_all(conn)
+        conn._pool._idle[0].sock.shutdown(socket.SHUT_RDWR)  # as if the server closed it
+
+        self.assertEqual([], RestAuthUser.get_all(conn))
+
+    def test_priority(self):
+        self.assertEqual('interactive', self.conn.priority)
+        with self.conn.prioritize('bulk'):
+            self.assertEqual('bulk', self.conn.priority)
+            results = self.conn.map(lambda i: self.conn.priority, range(3))
+            self.assertEqual(['bulk'] * 3, [r for i, r in results])
+        self.assertEqual('interactive', self.conn.priority)
+
+        results = self.conn.map(lambda i: self.conn.priority, range(3), priority='bulk')
+        self.assertEqual(['bulk'] * 3, [r for i, r in results])
+        results = self.conn.map(lambda i: self.conn.priority, range(3))
+        self.assertEqual(['interactive'] * 3, [r for i, r in results])
+
+        self.assertRaises(error.RestAuthRuntimeException, self.conn.map, id, [], priority='foo')
+        with self.assertRaises(error.RestAuthRuntimeException):
+            with self.conn.prioritize('foo'):
+                pass
+
+    def test_bulk_size(self):
+        active = {'interactive': 0, 'bulk': 0}
+        peak = {'interactive': 0, 'bulk': 0}
+        lock = threading.Lock()
+
+        class SlowConnection(RestAuthConnection):
+            def _send(self, *args):
+                with lock:
+                    active[self.priority] += 1
+                    peak[self.priority] = max(peak[self.priority], active[self.priority])
+                time.sleep(0.05)
+                try:
+                    return super(SlowConnection, self)._send(*args)
+                finally:
+                    with lock:
+                        active[self.priority] -= 1
+
+        conn = SlowConnection('http://[::1]:8000', rest_user, rest_passwd, pool_size=4)
+        self.assertEqual(2, conn.bulk_size)
+        bulk = conn.map(lambda i: RestAuthUser.get_all(conn), range(8), priority='bulk')
+        interactive = conn.map(lambda i: RestAuthUser.get_all(conn), range(4))
+
+        thread = threading.Thread(target=list, args=(bulk, ))
+        thread.start()
+        list(interactive)
+        thread.join()
+        self.assertEqual(2, peak['bulk'])
+        self.assertEqual(4, peak['interactive'])  # never waits for bulk requests
+
+    def silent_server(self):
+        """Get a connection to a server that never responds."""
+        sock = socket.socket(socket.AF_INET6)
+        sock.bind(('::1', 0))
+        sock.listen(50)
+        self.addCleanup(sock.close)
+        return RestAuthConnection('http://[::1]:%s' % sock.getsockname()[1], rest_user,
+                                  rest_passwd)
+
+    def test_deadline(self):
+        self.assertEqual(None, self.conn.remaining)
+        with self.conn.deadline(10):
+            self.assertTrue(9 < self.conn.remaining <= 10)
+            with self.conn.deadline(20):  # does not extend the outer deadline
+                self.assertTrue(self.conn.remaining <= 10)
+            self.assertEqual([], RestAuthUser.get_all(self.conn))
+        self.assertEqual(None, self.conn.remaining)
+
+        with self.conn.deadline(0):
+            self.assertRaises(DeadlineExceeded, RestAuthUser.get_all, self.conn)
+
+        # pooled connections use the default timeout again
+        self.assertEqual([], RestAuthUser.get_all(self.conn))
+        self.assertEqual(socket._GLOBAL_DEFAULT_TIMEOUT, self.conn._pool._idle[-1].timeout)
+
+    def test_deadline_timeout(self):
+        conn = self.silent_server()
+        start = time.time()
+        with conn.deadline(0.2):
+            self.assertRaises(DeadlineExceeded, RestAuthUser.get_all, conn)
+        self.assertTrue(time.time() - start < 1)
+
+    def test_deadline_map(self):
+        conn = self.silent_server()
+        start = time.time()
+        with conn.deadline(0.2):
+            results = list(conn.map(lambda i: RestAuthUser.get_all(conn), range(20), workers=2))
+        self.assertTrue(time.time() - start < 1)  # pending calls are cancelled
+        self.assertTrue(all(isinstance(r, DeadlineExceeded) for i, r in results))
+
+        user = RestAuthUser(conn, 'foobar')
+        start = time.time()
+        with conn.deadline(0.2):
+            self.assertRaises(DeadlineExceeded, user.login, 'password')
+        self.assertTrue(time.time() - start < 1)
+
+    def test_service(self):
+        transport = RestAuthConnection('http://[::1]:8000', 'example.net', 'nopass',
+                                       cache=RestAuthCache(properties=60))
+        self.assertRaises(error.Forbidden, RestAuthUser.get_all, transport)
+
+        conn = transport.service(rest_user, rest_passwd)
+        self.assertEqual([], RestAuthUser.get_all(conn))
+        self.assertEqual(1, len(transport._pool._idle))  # the view uses the same pool
+
+        other = conn.service('wrong', 'credentials')
+        self.assertRaises(error.Unauthorized, RestAuthUser.get_all, other)
+        self.assertEqual(1, len(transport._pool._idle))
+
+        # every service has its own cache, shared by all views of the service
+        self.assertEqual({'properties': 60, 'memberships': None, 'users': None}, conn.cache.ttl)
+        self.assertFalse(conn.cache is transport.cache)
+        self.assertFalse(conn.cache is other.cache)
+        self.assertTrue(conn.cache is transport.service(rest_user, rest_passwd).cache)
+
+        # views use the current content handler of the transport
+        self.assertIn(b'Accept: application/json', conn._headers().split(b'\r\n'))
+        transport.set_content_handler('application/x-www-form-urlencoded')
+        mime = 'application/x-www-form-urlencoded'
+        self.assertIn(b'Accept: ' + mime.encode(), conn._headers().split(b'\r\n'))
+        self.assertIn(b'Content-Type: ' + mime.encode(),
+                      conn._headers({'Content-Type': mime}).split(b'\r\n'))
+
+    def test_service_persisted_cache(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'cache')
+            transport = RestAuthConnection('http://[::1]:8000', 'example.net', 'nopass',
+                                           cache=RestAuthCache(memberships=60, path=path,
+                                                               persist=['memberships'],
+                                                               save_interval=60))
+            threads = threading.active_count()
+            cache = transport.service('tenant/a', 'password').cache
+            self.assertEqual(path + '.tenant%2Fa', cache.path)
+            self.assertEqual(('memberships', ), cache.persist)
+            self.assertEqual(60, cache.ttl['memberships'])
+
+            # views share the cache of their service and start no threads
+            self.assertTrue(cache is transport.service('tenant/a', 'password').cache)
+            self.assertFalse(cache is transport.service('tenant/b', 'password').cache)
+            self.assertEqual(threads, threading.active_count())
+
+            # caches of services are saved with the cache of the transport
+            cache.set_membership('group', 'user', True)
+            cache_module._periodic_save(weakref.ref(transport.cache), 60)
+            loaded = RestAuthCache(memberships=60, path=cache.path, persist=['memberships'])
+            self.assertTrue(loaded.get_membership('group', 'user'))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_headers(self):
+        conn = RestAuthConnection('http://[::1]:8000', rest_user, rest_passwd)
+        self.assertIs(conn._headers(), conn._headers())  # rendered only once
+        self.assertNotIn(b'Content-Type', conn._headers())
+        content_type = {'Content-Type': 'application/json'}
+        self.assertIs(conn._headers(content_type), conn._headers(dict(content_type)))
+        self.assertIn(b'Content-Type: application/json',
+                      conn._headers(content_type).split(b'\r\n'))
+
+        # only post() and put() add a Content-Type
+        sent = []
+        dispatch = conn._dispatch
+
+        def record(method, url, body, headers, idempotent):
+            sent.append(headers)
+            return dispatch(method, url, body, headers, idempotent)
+
+        conn._dispatch = record
+        conn.send('POST', '/users/', 'raw body')
+        conn.post('/users/', {'user': 'foo'})
+        self.assertEqual([conn._headers(), conn._headers(content_type)], sent)
+        del conn._dispatch
+        RestAuthUser(conn, 'foo').remove()
+
+        conn.set_credentials('wrong', 'credentials')
+        self.assertRaises(error.Unauthorized, RestAuthUser.get_all, conn)
+        conn.set_credentials(rest_user, rest_passwd)
+        self.assertEqual([], RestAuthUser.get_all(conn))
+
+        # additional headers are rendered for every request
+        headers = conn._headers({'Accept': 'wrong/mime', 'X-Foo': 'bar'})
+        self.assertIn(b'Accept: wrong/mime', headers.split(b'\r\n'))
+        self.assertNotIn(b'application/json', headers)
+        self.assertRaises(error.NotAcceptable, conn.send, 'GET', '/users/',
+                          headers={'Accept': 'wrong/mime'})
+
+
+certificate = os.path.join(os.path.dirname(__file__), 'localhost.pem')
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    """Respond with the request line, the headers and the body of the request."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        echo = ('%s\r\n%s' % (self.requestline, self.headers)).encode('latin-1') + body
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(echo)))
+        self.end_headers()
+        self.wfile.write(echo)
+
+    do_GET = do_POST
+
+    def log_message(self, *args):
+        pass
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    """A proxy that only supports tunnels created with CONNECT."""
+
+    def do_CONNECT(self):
+        host, port = self.path.rsplit(':', 1)
+        upstream = socket.create_connection((host, int(port)))
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.flush()
+
+        sockets = [self.connection, upstream]
+        while True:
+            for sock in select.select(sockets, [], [])[0]:
+                data = sock.recv(8192)
+                if not data:
+                    upstream.close()
+                    return
+                sockets[sock is self.connection].sendall(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class RenderedRequestTests(RestAuthClientTestCase):
+    """Requests with pre-rendered headers over HTTPS and through a tunnel."""
+
+    def serve(self, server):
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.servers.append(server)
+        return server.server_address[1]
+
+    def setUp(self):
+        self.servers = []
+        server = HTTPServer(('localhost', 0), EchoHandler)
+        context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+        context.load_cert_chain(certificate)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        self.port = self.serve(server)
+        self.context = ssl.create_default_context(cafile=certificate)
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def test_output(self):
+        # send_rendered() relies on the private HTTPConnection._output() to buffer header lines
+        for cls in (HTTPConnection, HTTPSConnection):
+            self.assertTrue(callable(getattr(cls, '_output', None)),
+                            '%s._output() no longer exists' % cls.__name__)
+
+    def test_https(self):
+        conn = RestAuthConnection('https://localhost:%s' % self.port, rest_user, rest_passwd,
+                                  ssl_context=self.context, pool_size=1)
+        for i in range(2):  # the second request reuses the connection
+            response = conn.send('POST', '/users/', 'body %s' % i, {'X-Foo': 'bar'})
+            lines = response.read().splitlines()
+            self.assertEqual(b'POST /users/ HTTP/1.1', lines[0])
+            self.assertIn(b'Host: localhost:%d' % self.port, lines)
+            self.assertIn(b'X-Foo: bar', lines)
+            self.assertIn(b'Content-Length: 6', lines)
+            self.assertEqual(('body %s' % i).encode('ascii'), lines[-1])
+        self.assertEqual(1, len(conn._pool._idle))
+
+    def test_tunnel(self):
+        proxy_port = self.serve(HTTPServer(('localhost', 0), ProxyHandler))
+        conn = HTTPSConnection('localhost', proxy_port, context=self.context)
+        conn.set_tunnel('localhost', self.port)
+        try:
+            for i in range(2):
+                host = b'Host: localhost:%d' % self.port
+                conn.send_rendered('GET', '/users/', (host, b'X-Foo: bar\r\nX-Bar: foo'))
+                lines = conn.getresponse().read().splitlines()
+                self.assertEqual(b'GET /users/ HTTP/1.1', lines[0])
+                self.assertEqual([host, b'X-Foo: bar', b'X-Bar: foo'], lines[1:4])
+        finally:
+            conn.close()
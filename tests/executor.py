@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import threading
+
+from RestAuthClient.error import HttpException
+from RestAuthClient.error import UserExists
+from RestAuthClient.executor import AdaptiveLimit
+from RestAuthClient.user import RestAuthUser
+
+from .base import RestAuthClientTestCase
+
+usernames = ["mati \u6109 %s" % i for i in range(20)]
+
+
+class ExecutorTests(RestAuthClientTestCase):
+    def tearDown(self):
+        for user in RestAuthUser.get_all(self.conn):
+            user.remove()
+
+    def create(self, name):
+        return RestAuthUser.create(self.conn, name, 'foobar')
+
+    def test_ordered(self):
+        results = list(self.conn.map(self.create, usernames, workers=5))
+        self.assertEqual(usernames, [item for item, result in results])
+        self.assertEqual(usernames, [result.name for item, result in results])
+        self.assertCountEqual(usernames, RestAuthUser.get_all(self.conn, flat=True))
+
+    def test_unordered(self):
+        results = list(self.conn.map(self.create, iter(usernames), ordered=False))
+        self.assertCountEqual(usernames, [item for item, result in results])
+        self.assertCountEqual(usernames, [result.name for item, result in results])
+
+    def test_errors(self):
+        self.create(usernames[3])
+
+        results = self.conn.map(self.create, usernames)
+        for item, result in results:
+            if item == usernames[3]:
+                self.assertTrue(isinstance(result, UserExists))
+            else:
+                self.assertEqual(item, result.name)
+        self.assertEqual(len(usernames), results.done)
+        self.assertEqual(1, results.errors)
+        self.assertFalse(results.cancelled)
+
+    def test_max_errors(self):
+        self.create(usernames[0])
+
+        results = self.conn.map(self.create, usernames, workers=1, max_errors=1)
+        processed = [item for item, result in results]
+        self.assertTrue(results.cancelled)
+        self.assertEqual(1, results.errors)
+        self.assertTrue(len(processed) < len(usernames))
+        self.assertEqual(usernames[:len(processed)], processed)
+        self.assertCountEqual(processed, RestAuthUser.get_all(self.conn, flat=True))
+
+    def test_progress(self):
+        calls = []
+        results = self.conn.map(self.create, usernames, progress=lambda *a: calls.append(a))
+        list(results)
+        self.assertEqual([(i, 0) for i in range(1, len(usernames) + 1)], calls)
+
+    def test_adaptive(self):
+        limit = AdaptiveLimit(maximum=8)
+        results = list(self.conn.map(self.create, usernames, adaptive=limit))
+        self.assertEqual(usernames, [result.name for item, result in results])
+        self.assertEqual(1, limit.history[0][1])
+        self.assertTrue(len(limit.history) > 1)
+        self.assertTrue(1 <= limit.limit <= 8)
+
+    def test_adaptive_limit(self):
+        limit = AdaptiveLimit(maximum=10)
+        for i in range(1 + 2 + 4 + 8):  # slow start
+            limit.update(0.1, None)
+        self.assertEqual(10, limit.limit)
+        self.assertAlmostEqual(0.1, limit.baseline)
+
+        # errors back off once per round
+        limit.update(0.1, HttpException(Exception('timeout')))
+        limit.update(0.1, HttpException(Exception('timeout')))
+        self.assertEqual(5, limit.limit)
+        for i in range(3):
+            limit.update(0.1, None)
+        self.assertEqual(5, limit.limit)
+
+        # additive increase
+        for i in range(5):
+            limit.update(0.1, None)
+        self.assertEqual(6, limit.limit)
+
+        # latency inflation
+        for i in range(6):
+            limit.update(0.5, None)
+        self.assertEqual(3, limit.limit)
+        self.assertEqual([1, 2, 4, 8, 10, 5, 6, 3], [l for t, l in limit.history])
+
+    def test_adaptive_limit_shared(self):
+        limit = AdaptiveLimit(maximum=10 ** 6)
+
+        def update():
+            for i in range(1000):
+                limit.update(0.1, None)
+
+        threads = [threading.Thread(target=update) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 8000 calls complete 12 rounds of slow start (4095 calls), no call is lost
+        self.assertEqual(4096, limit.limit)
+        self.assertEqual(8000 - 4095, limit._calls)
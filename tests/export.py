@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import unittest
+
+from RestAuthClient.export import MembershipGraph
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.user import RestAuthUser
+
+from .base import RestAuthClientTestCase
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import scipy
+except ImportError:
+    scipy = None
+
+username1 = "mati \u6109"
+username2 = "mati \u6110"
+username3 = "mati \u6111"
+groupname1 = "group \u6114"
+groupname2 = "group \u6115"
+groupname3 = "group \u6116"
+
+
+class MembershipGraphTests(RestAuthClientTestCase):
+    def setUp(self):
+        super(MembershipGraphTests, self).setUp()
+        for name in [username1, username2, username3]:
+            RestAuthUser.create(self.conn, name, 'foobar')
+        for name in [groupname1, groupname2, groupname3]:
+            RestAuthGroup.create(self.conn, name)
+
+        RestAuthGroup(self.conn, groupname1).add_user(username1)
+        RestAuthGroup(self.conn, groupname1).add_user(username3)
+        RestAuthGroup(self.conn, groupname3).add_user(username2)
+
+    def tearDown(self):
+        for user in RestAuthUser.get_all(self.conn):
+            user.remove()
+        for grp in RestAuthGroup.get_all(self.conn):
+            grp.remove()
+
+    def test_fetch(self):
+        graph = MembershipGraph.fetch(self.conn)
+        self.assertEqual([username1, username2, username3], graph.users)
+        self.assertEqual([groupname1, groupname2, groupname3], graph.groups)
+        self.assertEqual([0, 2, 2, 3], list(graph.indptr))
+        self.assertEqual([0, 2, 1], list(graph.indices))
+        self.assertEqual((3, 3), graph.shape)
+        self.assertEqual(3, len(graph))
+
+        self.assertEqual([username1, username3], graph.get_members(0))
+        self.assertEqual([], graph.get_members(1))
+        self.assertEqual([username2], graph.get_members(2))
+
+    def test_empty(self):
+        self.tearDown()
+        graph = MembershipGraph.fetch(self.conn)
+        self.assertEqual((0, 0), graph.shape)
+        self.assertEqual([0], list(graph.indptr))
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed.")
+    def test_numpy(self):
+        graph = MembershipGraph.fetch(self.conn)
+        indptr, indices = graph.to_numpy()
+        self.assertEqual([0, 2, 2, 3], indptr.tolist())
+        self.assertEqual([0, 2, 1], indices.tolist())
+
+        graph.indices[0] = 1  # memory is shared
+        self.assertEqual(1, indices[0])
+
+    @unittest.skipIf(numpy is None or scipy is None, "SciPy is not installed.")
+    def test_scipy(self):
+        matrix = MembershipGraph.fetch(self.conn).to_scipy()
+        self.assertEqual((3, 3), matrix.shape)
+        self.assertEqual([[True, False, True], [False, False, False], [False, True, False]],
+                         matrix.toarray().tolist())
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.user import RestAuthUser
+from RestAuthCommon import error
+
+from .base import RestAuthClientTestCase
+
+username1 = "mati \u6109"
+username2 = "mati \u6110"
+username3 = "mati \u6111"
+groupname1 = "group \u6114"
+groupname2 = "group \u6115"
+groupname3 = "group \u6116"
+groupname4 = "group \u6117"
+
+
+class GroupExpressionTests(RestAuthClientTestCase):
+    def setUp(self):
+        super(GroupExpressionTests, self).setUp()
+        for name in [username1, username2, username3]:
+            RestAuthUser.create(self.conn, name, 'foobar')
+        self.group1 = RestAuthGroup.create(self.conn, groupname1)
+        self.group2 = RestAuthGroup.create(self.conn, groupname2)
+        self.group3 = RestAuthGroup.create(self.conn, groupname3)
+        self.group4 = RestAuthGroup.create(self.conn, groupname4)  # no members
+
+        self.group1.add_user(username1)
+        self.group1.add_user(username2)
+        self.group2.add_user(username2)
+        self.group2.add_user(username3)
+        self.group3.add_user(username3)
+
+        self.expr1 = self.conn.members_of(groupname1)
+
+    def tearDown(self):
+        for user in RestAuthUser.get_all(self.conn):
+            user.remove()
+        for grp in RestAuthGroup.get_all(self.conn):
+            grp.remove()
+
+    def test_union(self):
+        expr = self.expr1 | groupname2 | self.group3
+        self.assertEqual([groupname1, groupname2, groupname3], expr.groups)
+        self.assertEqual(3, len(expr.operands))
+        self.assertEqual(set([username1, username2, username3]), expr.evaluate())
+        self.assertCountEqual([username1, username2, username3], list(expr))
+
+    def test_intersection(self):
+        expr = self.expr1 & groupname2
+        self.assertEqual(set([username2]), expr.evaluate())
+        self.assertEqual([username2], list(expr))
+
+        expr = self.expr1 & groupname2 & groupname3
+        self.assertEqual(set(), expr.evaluate())
+        self.assertEqual([], list(expr))
+
+    def test_difference(self):
+        expr = self.expr1 - groupname2
+        self.assertEqual(set([username1]), expr.evaluate())
+        self.assertEqual([username1], list(expr))
+
+        expr = (self.conn.members_of(groupname2) - groupname1) - groupname3
+        self.assertEqual(3, len(expr.operands))
+        self.assertEqual(set(), expr.evaluate())
+
+        expr = self.conn.members_of(groupname2) - (self.expr1 - groupname3)
+        self.assertEqual(set([username3]), expr.evaluate())
+
+    def test_nested(self):
+        expr = (self.expr1 | groupname3) & self.conn.members_of(groupname2)
+        self.assertEqual(set([username2, username3]), expr.evaluate())
+        self.assertCountEqual([username2, username3], list(expr))
+
+    def test_short_circuit(self):
+        # the empty group is fetched first, so the result is known before the missing group
+        expr = self.conn.members_of(groupname4) & 'foo bar'
+        self.assertEqual(set(), expr.evaluate(workers=1))
+        self.assertEqual([], list(expr.iterate(workers=1)))
+
+        expr = self.conn.members_of(groupname4) - 'foo bar'
+        self.assertEqual(set(), expr.evaluate(workers=1))
+
+    def test_not_found(self):
+        expr = self.expr1 | 'foo bar'
+        self.assertRaises(error.ResourceNotFound, expr.evaluate)
@@ -250,6 +250,55 @@ class BasicTests(RestAuthClientTestCase):
         except error.ResourceNotFound as e:
             self.assertEqual("group", e.get_type())
 
+    def test_addUsers(self):
+        grp = RestAuthGroup.create(self.conn, groupname_1)
+        names = (name for name in [username_1, user2, username_3 + "foo"])
+        result = grp.add_users(names, workers=2)
+        self.assertTrue(result)
+        self.assertCountEqual([username_1, username_2], result.added)
+        self.assertEqual([username_3 + "foo"], result.not_found)
+        self.assertEqual({}, result.failed)
+        self.assertCountEqual([user1, user2], grp.get_members())
+
+        result = grp.remove_users([user1, username_3])
+        self.assertEqual([username_1], result.removed)
+        self.assertEqual([username_3], result.not_found)  # not a member
+        self.assertEqual([user2], grp.get_members())
+
+    def test_addUsersInvalidGroup(self):
+        grp = RestAuthGroup(self.conn, groupname_1)
+        result = grp.add_users([user1, user2])
+        self.assertFalse(result)
+        self.assertEqual([], result.added)
+        self.assertEqual([], result.not_found)
+        self.assertCountEqual([username_1, username_2], result.failed)
+        self.assertEqual("group", result.failed[username_1].get_type())
+
+    def test_setMembers(self):
+        grp = RestAuthGroup.create(self.conn, groupname_1)
+        grp.add_user(user1)
+        grp.add_user(user2)
+
+        result = grp.set_members([user2, username_3, username_3 + "foo"])
+        self.assertTrue(result)
+        self.assertEqual([username_3], result.added)
+        self.assertEqual([username_1], result.removed)
+        self.assertEqual([username_3 + "foo"], result.not_found)
+        self.assertCountEqual([username_2, username_3], grp.get_members(flat=True))
+
+        # nothing to do
+        result = grp.set_members([username_2, username_3])
+        self.assertTrue(result)
+        self.assertEqual(([], []), (result.added, result.removed))
+
+    def test_setMembersInvalidGroup(self):
+        grp = RestAuthGroup(self.conn, groupname_1)
+        try:
+            grp.set_members([user1])
+            self.fail()
+        except error.ResourceNotFound as e:
+            self.assertEqual("group", e.get_type())
+
 
 class MetaGroupTests(RestAuthClientTestCase):
     def setUp(self):
@@ -290,6 +339,26 @@ class MetaGroupTests(RestAuthClientTestCase):
         self.assertEqual([self.grp2], self.grp1.get_groups())
         self.assertEqual([], self.grp2.get_groups())
 
+    def test_setMembersInherited(self):
+        self.grp1.add_user(user1)
+        self.grp1.add_user(user2)
+        self.grp1.add_group(self.grp2)
+        self.grp2.add_user(user3)
+
+        # user1 is only inherited, so it is added, user2 cannot be removed from grp2
+        result = self.grp2.set_members([user1, user3])
+        self.assertTrue(result)
+        self.assertEqual([username_1], result.added)
+        self.assertEqual([], result.removed)
+        self.assertEqual(([], {}), (result.not_found, result.failed))
+
+        self.grp1.remove_user(user1)
+        self.assertCountEqual([username_1, username_2, username_3],
+                              self.grp2.get_members(flat=True))
+
+        result = self.grp2.set_members([user1])
+        self.assertEqual(([], [username_3]), (result.added, result.removed))
+
     def test_simpleInheritanceClass(self):
         # test passing group instances to add/remove_group:
         self.grp1.add_user(user1)
@@ -329,6 +398,16 @@ class MetaGroupTests(RestAuthClientTestCase):
         self.grp1.add_group(self.grp2)
         self.assertEqual(self.grp1.get_groups(flat=True), [self.grp2.name])
 
+    def test_setSubgroups(self):
+        grp3 = RestAuthGroup.create(self.conn, groupname_3)
+        self.grp1.add_group(self.grp2)
+
+        result = self.grp1.set_subgroups([grp3])
+        self.assertTrue(result)
+        self.assertEqual([groupname_3], result.added)
+        self.assertEqual([groupname_2], result.removed)
+        self.assertEqual([grp3], self.grp1.get_groups())
+
     def test_addInvalidGroup(self):
         grp3 = RestAuthGroup(self.conn, groupname_3 + "foo")
         try:
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import socket
+import threading
+import time
+
+from RestAuthClient.error import HttpException
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.hierarchy import GroupHierarchy
+from RestAuthClient.user import RestAuthUser
+
+from .base import RestAuthClientTestCase
+
+username = "mati \u6109"
+groupname1 = "group \u6114"
+groupname2 = "group \u6115"
+groupname3 = "group \u6116"
+groupname4 = "group \u6117"
+
+
+class FlakyHierarchy(GroupHierarchy):
+    """Hierarchy where fetching the sub-groups of ``fail`` fails once."""
+    fail = None
+    delay = 0
+
+    def _fetch(self, name):
+        time.sleep(self.delay)
+        if name == self.fail:
+            self.fail = None
+            raise HttpException(socket.error('Connection reset by peer'))
+        return super(FlakyHierarchy, self)._fetch(name)
+
+
+class HierarchyTests(RestAuthClientTestCase):
+    def setUp(self):
+        super(HierarchyTests, self).setUp()
+        self.user = RestAuthUser.create(self.conn, username, 'foobar')
+        self.group1 = RestAuthGroup.create(self.conn, groupname1)
+        self.group2 = RestAuthGroup.create(self.conn, groupname2)
+        self.group3 = RestAuthGroup.create(self.conn, groupname3)
+        self.group4 = RestAuthGroup.create(self.conn, groupname4)
+
+        # group1 -> group2 -> group3, group4 is not related
+        self.group1.add_group(self.group2)
+        self.group2.add_group(self.group3)
+        self.hierarchy = GroupHierarchy(self.conn)
+
+    def tearDown(self):
+        for user in RestAuthUser.get_all(self.conn):
+            user.remove()
+        for grp in RestAuthGroup.get_all(self.conn):
+            grp.remove()
+
+    def test_descendants(self):
+        self.assertEqual(set([groupname2, groupname3]), self.hierarchy.descendants(groupname1))
+        self.assertEqual(set([groupname3]), self.hierarchy.descendants(self.group2))
+        self.assertEqual(set(), self.hierarchy.descendants(groupname3))
+        self.assertEqual(set([groupname1, groupname2, groupname3]), self.hierarchy.groups)
+
+        self.assertEqual(set([groupname3]), self.hierarchy.subgroups(groupname2))
+        self.assertEqual(set(), self.hierarchy.descendants('foobar'))
+
+    def test_ancestors(self):
+        self.assertEqual(set([groupname1, groupname2]), self.hierarchy.ancestors(groupname3))
+        self.assertEqual(set(), self.hierarchy.ancestors(groupname4))
+        self.assertTrue(groupname4 in self.hierarchy)
+
+    def test_load_failed(self):
+        hierarchy = FlakyHierarchy(self.conn)
+        hierarchy.fail = groupname2
+        self.assertRaises(HttpException, hierarchy.ancestors, groupname3)
+        self.assertEqual(set([groupname1, groupname2]), hierarchy.ancestors(groupname3))
+
+    def test_concurrent_load(self):
+        hierarchy = FlakyHierarchy(self.conn)
+        hierarchy.delay = 0.01
+        results = []
+
+        def work():
+            results.append(hierarchy.ancestors(groupname3))
+
+        threads = [threading.Thread(target=work) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([set([groupname1, groupname2])] * 5, results)
+
+    def test_effective_groups(self):
+        self.group2.add_user(self.user)
+
+        self.assertEqual(set([groupname2, groupname3]),
+                         self.hierarchy.effective_groups(username))
+        self.assertTrue(self.hierarchy.is_member(username, groupname3))
+        self.assertFalse(self.hierarchy.is_member(username, groupname1))
+
+        # without any request:
+        self.assertEqual(set([groupname1, groupname2, groupname3]),
+                         self.hierarchy.effective_groups(username, groups=[groupname1]))
+
+    def test_cycles(self):
+        self.assertEqual([], self.hierarchy.cycles())
+
+        self.group3.add_group(self.group1)
+        self.group4.add_group(self.group4)
+        self.hierarchy.load()
+        self.assertEqual([sorted([groupname1, groupname2, groupname3]), [groupname4]],
+                         sorted(self.hierarchy.cycles()))
+        self.assertEqual(set([groupname1, groupname2, groupname3]),
+                         self.hierarchy.descendants(groupname1))
+
+    def test_refresh(self):
+        self.hierarchy.load()
+        self.assertEqual(set(), self.hierarchy.refresh())
+
+        self.group3.add_group(self.group4)
+        self.group2.remove()
+        group5 = RestAuthGroup.create(self.conn, 'foobar')
+
+        self.assertEqual(set([groupname1, groupname2, groupname3, 'foobar']),
+                         self.hierarchy.refresh())
+        self.assertEqual(set(), self.hierarchy.descendants(groupname1))
+        self.assertEqual(set([groupname4]), self.hierarchy.descendants(groupname3))
+        self.assertFalse(groupname2 in self.hierarchy)
+        self.assertTrue(group5 in self.hierarchy)
+
+        # only refresh one group:
+        self.group3.remove_group(self.group4)
+        self.assertEqual(set(), self.hierarchy.refresh([self.group1]))
+        self.assertEqual(set([groupname3]), self.hierarchy.refresh([self.group3]))
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import time
+
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.index import MembershipIndex
+from RestAuthClient.user import RestAuthUser
+
+from .base import RestAuthClientTestCase
+
+username1 = "mati \u6109"
+username2 = "mati \u6110"
+username3 = "mati \u6111"
+groupname1 = "group \u6114"
+groupname2 = "group \u6115"
+groupname3 = "group \u6116"
+
+
+class MembershipIndexTests(RestAuthClientTestCase):
+    def setUp(self):
+        super(MembershipIndexTests, self).setUp()
+        self.user1 = RestAuthUser.create(self.conn, username1, 'foobar')
+        self.user2 = RestAuthUser.create(self.conn, username2, 'foobar')
+        self.user3 = RestAuthUser.create(self.conn, username3, 'foobar')
+        self.group1 = RestAuthGroup.create(self.conn, groupname1)
+        self.group2 = RestAuthGroup.create(self.conn, groupname2)
+        self.group3 = RestAuthGroup.create(self.conn, groupname3)
+
+        self.group1.add_user(self.user1)
+        self.group1.add_user(self.user2)
+        self.group2.add_user(self.user2)
+        self.index = MembershipIndex(self.conn)
+
+    def tearDown(self):
+        self.index.close()
+        for user in RestAuthUser.get_all(self.conn):
+            user.remove()
+        for grp in RestAuthGroup.get_all(self.conn):
+            grp.remove()
+
+    def test_lookups(self):
+        self.assertEqual(set([groupname1, groupname2, groupname3]), self.index.refresh())
+        self.assertEqual(3, len(self.index))
+
+        self.assertTrue(self.index.is_member(username1, groupname1))
+        self.assertTrue(self.index.is_member(self.user2, self.group2))
+        self.assertFalse(self.index.is_member(username1, groupname2))
+        self.assertFalse(self.index.is_member(username3, groupname1))
+        self.assertFalse(self.index.is_member(username1, 'foobar'))
+
+        self.assertCountEqual([groupname1, groupname2], self.index.get_groups(username2))
+        self.assertEqual([], self.index.get_groups(username3))
+        self.assertCountEqual([username1, username2], self.index.get_members(groupname1))
+        self.assertEqual([], self.index.get_members(groupname3))
+        self.assertCountEqual([groupname1, groupname2, groupname3], self.index.groups)
+        self.assertCountEqual([username1, username2], self.index.users)
+
+    def test_inherited(self):
+        self.group1.add_group(self.group3)
+        self.index.refresh()
+        self.assertTrue(self.index.is_member(username1, groupname3))
+        self.assertCountEqual([groupname1, groupname3], self.index.get_groups(username1))
+
+    def test_refresh(self):
+        self.index.refresh()
+        self.assertEqual(set(), self.index.refresh())
+
+        self.group1.remove_user(self.user1)
+        self.group3.add_user(self.user3)
+        self.group2.remove()
+        self.assertEqual(set([groupname1, groupname2, groupname3]), self.index.refresh())
+
+        self.assertFalse(self.index.is_member(username1, groupname1))
+        self.assertTrue(self.index.is_member(username3, groupname3))
+        self.assertFalse(self.index.is_member(username2, groupname2))
+        self.assertEqual([groupname1], self.index.get_groups(username2))
+        self.assertEqual([], self.index.get_groups(username1))
+
+        # only refresh some groups:
+        self.group1.add_user(self.user1)
+        self.group3.remove_user(self.user3)
+        self.assertEqual(set([groupname3]), self.index.refresh([self.group3]))
+        self.assertFalse(self.index.is_member(username1, groupname1))
+
+    def test_interval(self):
+        index = MembershipIndex(self.conn, interval=0.1)
+        try:
+            time.sleep(0.3)
+            self.assertTrue(index.is_member(username1, groupname1))
+            self.assertEqual(None, index.error)
+        finally:
+            index.close()
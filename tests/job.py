@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+
+from RestAuthClient.error import HttpException
+from RestAuthClient.job import BulkJob
+from RestAuthClient.job import create_user
+from RestAuthClient.user import RestAuthUser
+from RestAuthCommon import error
+
+from .base import RestAuthClientTestCase
+
+usernames = ["mati %s \u6109" % i for i in range(10)]
+
+
+class BulkJobTests(RestAuthClientTestCase):
+    def setUp(self):
+        super(BulkJobTests, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.checkpoint = os.path.join(self.tmpdir, 'job.checkpoint')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        for user in RestAuthUser.get_all(self.conn):
+            user.remove()
+
+    def test_create(self):
+        RestAuthUser.create(self.conn, usernames[0])  # already exists
+        reports = []
+        job = BulkJob(self.conn, 'create_user', usernames, self.checkpoint, batch_size=3,
+                      progress=lambda j: reports.append((j.position, j.eta)))
+        self.assertTrue(job.run())
+        self.assertEqual((10, 10, {}), (job.position, job.done, job.failed))
+        self.assertCountEqual(usernames, RestAuthUser.get_all(self.conn, flat=True))
+
+        self.assertEqual([3, 6, 9, 10], [r[0] for r in reports])
+        self.assertEqual(0, reports[-1][1])  # ETA
+        self.assertTrue(job.rate > 0)
+
+        # the checkpoint file has one line per batch
+        with open(self.checkpoint) as stream:
+            self.assertEqual(4, len(stream.readlines()))
+
+        job = BulkJob(self.conn, 'remove_user', usernames + ['foobar'],
+                      self.checkpoint + '.remove')
+        self.assertTrue(job.run())
+        self.assertEqual(11, job.done)
+        self.assertEqual([], RestAuthUser.get_all(self.conn))
+
+    def test_resume(self):
+        calls = []
+
+        def create(conn, name):
+            calls.append(name)
+            if name == usernames[5]:
+                raise HttpException(Exception('connection reset'))
+            return create_user(conn, name)
+
+        job = BulkJob(self.conn, create, (n for n in usernames), self.checkpoint, batch_size=2,
+                      workers=1)
+        self.assertRaises(HttpException, job.run)
+        self.assertEqual(5, job.position)
+
+        calls = []
+        job = BulkJob(self.conn, create_user, iter(usernames), self.checkpoint, batch_size=2,
+                      workers=1)
+        self.assertEqual((5, 5), (job.position, job.done))
+        job.operation = lambda conn, name: calls.append(name) or create_user(conn, name)
+        self.assertTrue(job.run())
+        self.assertEqual(usernames[5:], calls)
+        self.assertEqual((10, 10), (job.position, job.done))
+        self.assertCountEqual(usernames, RestAuthUser.get_all(self.conn, flat=True))
+
+    def test_truncated_checkpoint(self):
+        with open(self.checkpoint, 'w') as stream:
+            stream.write('{"position": 4, "done": 3, "failed": {"foo": "ValueError: foo"}}\n')
+            stream.write('{"position": 8, "do')
+
+        job = BulkJob(self.conn, 'create_user', usernames, self.checkpoint)
+        self.assertEqual((4, 3), (job.position, job.done))
+        self.assertEqual(['foo'], list(job.failed))
+        self.assertFalse(job.run())  # the old failure is still reported
+        self.assertEqual(usernames[4:], sorted(RestAuthUser.get_all(self.conn, flat=True)))
+
+    def test_failed(self):
+        def create(conn, name):
+            if name == usernames[3]:
+                raise ValueError('invalid')
+            return create_user(conn, name)
+
+        job = BulkJob(self.conn, create, usernames, self.checkpoint)
+        self.assertFalse(job.run())
+        self.assertEqual(9, job.done)
+        self.assertEqual({usernames[3]: 'ValueError: invalid'}, job.failed)
+
+    def test_unknown_operation(self):
+        self.assertRaises(error.RestAuthRuntimeException, BulkJob, self.conn, 'foo', [],
+                          self.checkpoint)
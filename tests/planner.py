@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.user import RestAuthUser
+from RestAuthCommon import error
+
+from .base import RestAuthClientTestCase
+
+username1 = "mati \u6109"
+username2 = "mati \u6110"
+username3 = "mati \u6111"
+groupname1 = "group \u6114"
+groupname2 = "group \u6115"
+groupname3 = "group \u6116"
+
+
+class MembershipPlanTests(RestAuthClientTestCase):
+    def setUp(self):
+        super(MembershipPlanTests, self).setUp()
+        self.user1 = RestAuthUser.create(self.conn, username1, 'foobar')
+        self.user2 = RestAuthUser.create(self.conn, username2, 'foobar')
+        self.user3 = RestAuthUser.create(self.conn, username3, 'foobar')
+        self.group1 = RestAuthGroup.create(self.conn, groupname1)
+        self.group2 = RestAuthGroup.create(self.conn, groupname2)
+        self.group3 = RestAuthGroup.create(self.conn, groupname3)
+
+        self.group1.add_user(self.user1)
+        self.group1.add_user(self.user2)
+        self.group2.add_user(self.user2)
+        self.group2.add_group(self.group3)  # user2 is also a member of group3
+
+        self.users = [username1, self.user2, username3, 'foobar']
+        self.groups = [groupname1, groupname2, self.group3, 'foobar']
+        self.expected = [
+            [True, False, False, False],
+            [True, True, True, False],
+            [False, False, False, False],
+            [False, False, False, False],
+        ]
+
+    def tearDown(self):
+        for user in RestAuthUser.get_all(self.conn):
+            user.remove()
+        for grp in RestAuthGroup.get_all(self.conn):
+            grp.remove()
+
+    def test_strategies(self):
+        for strategy in ['groups', 'users', 'probes']:
+            plan = self.conn.plan_memberships(self.users, self.groups, strategy=strategy)
+            self.assertEqual(strategy, plan.strategy)
+            self.assertEqual(self.expected, plan.execute())
+
+    def test_choose(self):
+        plan = self.conn.plan_memberships(self.users, self.groups[:2])
+        self.assertEqual('groups', plan.strategy)
+        self.assertEqual({'groups': 2, 'users': 4, 'probes': 8}, plan.requests)
+
+        plan = self.conn.plan_memberships(self.users[:2], self.groups)
+        self.assertEqual('users', plan.strategy)
+
+        plan = self.conn.plan_memberships([username1], [groupname1])
+        self.assertEqual('probes', plan.strategy)
+
+        # large groups make fetching members expensive:
+        plan = self.conn.plan_memberships(self.users, self.groups[:2], group_size=10000)
+        self.assertEqual('users', plan.strategy)
+
+    def test_check_memberships(self):
+        self.assertEqual(self.expected, self.conn.check_memberships(self.users, self.groups))
+        self.assertEqual([[True]], self.conn.check_memberships([username1], [groupname1]))
+        self.assertEqual([], self.conn.check_memberships([], self.groups))
+
+    def test_wrong_strategy(self):
+        self.assertRaises(error.RestAuthRuntimeException, self.conn.plan_memberships,
+                          self.users, self.groups, strategy='foobar')
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.user import RestAuthUser
+
+from .base import RestAuthClientTestCase
+from .base import PY3
+
+if PY3:
+    from io import StringIO
+else:
+    from StringIO import StringIO
+
+username1 = "mati \u6109"
+username2 = "mati \u6110"
+username3 = "mati \u6111"
+groupname1 = "group \u6114"
+groupname2 = "group \u6115"
+groupname3 = "group \u6116"
+propKey = "mati \u6112"
+propVal = "mati \u6113"
+
+
+class ReconcileTests(RestAuthClientTestCase):
+    def setUp(self):
+        super(ReconcileTests, self).setUp()
+        self.user1 = RestAuthUser.create(self.conn, username1, 'foobar')
+        self.user2 = RestAuthUser.create(self.conn, username2, 'foobar')
+        self.group1 = RestAuthGroup.create(self.conn, groupname1)
+        self.group2 = RestAuthGroup.create(self.conn, groupname2)
+        self.group1.add_user(self.user1)
+        self.group1.add_user(self.user2)
+
+        self.state = {
+            'users': {
+                username1: {propKey: propVal},
+                username3: {propKey: propVal},
+            },
+            'groups': {
+                groupname1: {'users': [username1, username3]},
+                groupname3: {'users': [username3], 'groups': [groupname1]},
+            },
+        }
+
+    def tearDown(self):
+        for user in RestAuthUser.get_all(self.conn):
+            user.remove()
+        for grp in RestAuthGroup.get_all(self.conn):
+            grp.remove()
+
+    def operations(self, plan):
+        return [(op.kind, op.name, op.method) for op in plan]
+
+    def test_reconcile(self):
+        plan = self.conn.reconcile(self.state)
+        self.assertEqual([
+            ('user', username3, 'create'),
+            ('group', groupname3, 'create'),
+            ('user', username1, 'set_properties'),
+            ('group', groupname1, 'add_user'),
+            ('group', groupname1, 'remove_user'),
+            ('group', groupname3, 'add_user'),
+            ('group', groupname3, 'add_group'),
+        ], self.operations(plan))
+        self.assertEqual(7, len(plan.done))
+        self.assertEqual([], plan.failed)
+
+        self.assertEqual(propVal, self.user1.get_property(propKey))
+        self.assertEqual(propVal, RestAuthUser(self.conn, username3).get_property(propKey))
+        self.assertCountEqual([username1, username3], self.group1.get_members(flat=True))
+        self.assertEqual([groupname1], RestAuthGroup(self.conn, groupname3).get_groups(flat=True))
+        self.assertCountEqual([username1, username2, username3],
+                              RestAuthUser.get_all(self.conn, flat=True))
+
+        # the second time, only username3 is added again: it is also inherited from groupname3,
+        # and RestAuth does not tell direct and inherited members apart
+        plan = self.conn.reconcile(self.state)
+        self.assertEqual([('group', groupname1, 'add_user')], self.operations(plan))
+        self.assertEqual([username3], [op.args[0] for op in plan])
+
+    def test_prune(self):
+        plan = self.conn.reconcile(self.state, prune=True)
+        self.assertEqual([
+            ('user', username3, 'create'),
+            ('group', groupname3, 'create'),
+            ('user', username1, 'set_properties'),
+            ('group', groupname1, 'add_user'),
+            ('group', groupname3, 'add_user'),
+            ('group', groupname3, 'add_group'),
+            ('user', username2, 'remove'),
+            ('group', groupname2, 'remove'),
+        ], self.operations(plan))
+        self.assertCountEqual([username1, username3], RestAuthUser.get_all(self.conn, flat=True))
+        self.assertCountEqual([groupname1, groupname3],
+                              RestAuthGroup.get_all(self.conn, flat=True))
+
+    def test_dry_run(self):
+        stream = StringIO()
+        plan = self.conn.reconcile(self.state, dry_run=True, stream=stream)
+        self.assertEqual(7, len(stream.getvalue().splitlines()))
+        self.assertEqual('user %s: create' % username3, str(plan.phases[0][0]).split(' [')[0])
+        self.assertEqual([], plan.done)
+
+        # nothing was changed:
+        self.assertEqual(7, len(self.conn.reconcile(self.state, dry_run=True, stream=stream)))
+
+    def test_inherited(self):
+        # user2 is inherited from group1, so it is not removed from group2
+        self.group1.add_group(self.group2)
+        plan = self.conn.reconcile({'groups': {groupname2: {'users': []}}})
+        self.assertEqual(0, len(plan))
+
+        # user1 is only inherited, so it is added as a direct member
+        plan = self.conn.reconcile({'groups': {groupname2: {'users': [username1]}}})
+        self.assertEqual([('group', groupname2, 'add_user')], self.operations(plan))
+        self.assertEqual([username1], [op.args[0] for op in plan])
+        self.assertEqual([], plan.failed)
+
+    def test_skipped(self):
+        state = {'users': {'foo/bar': {}}, 'groups': {groupname1: {'users': ['foo/bar']}}}
+        plan = self.conn.reconcile(state)
+        self.assertEqual(1, len(plan.failed))
+        self.assertEqual('create', plan.failed[0][0].method)
+        self.assertEqual([('group', groupname1, 'add_user')], self.operations(plan.skipped))
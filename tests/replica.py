@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import time
+
+from RestAuthClient.breaker import CLOSED
+from RestAuthClient.breaker import OPEN
+from RestAuthClient.breaker import CircuitBreaker
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.replica import ReplicatedRestAuthConnection
+from RestAuthClient.user import RestAuthUser
+
+from .base import RestAuthClientTestCase
+from .base import mime_type
+
+username = "mati 愉"
+password = "mati 愐"
+
+
+class ReplicaTests(RestAuthClientTestCase):
+    def setUp(self):
+        super(ReplicaTests, self).setUp()
+        # the "replica" is the same service, so every read succeeds
+        self.replicated = ReplicatedRestAuthConnection(
+            'http://[::1]:8000', 'example.com', 'nopass', content_handler=mime_type,
+            replicas=['http://[::1]:8000'], sticky=0.1)
+        self.user = RestAuthUser.create(self.conn, username, password)
+        self.group = RestAuthGroup.create(self.conn, 'group')
+        time.sleep(0.01)
+
+    def tearDown(self):
+        for user in RestAuthUser.get_all(self.conn):
+            user.remove()
+        for group in RestAuthGroup.get_all(self.conn):
+            group.remove()
+
+    def test_reads(self):
+        user = RestAuthUser(self.replicated, username)
+        self.assertTrue(user.verify_password(password))
+        self.assertEqual([username], RestAuthUser.get_all(self.replicated, flat=True))
+        self.assertFalse(RestAuthGroup(self.replicated, 'group').is_member(username))
+        self.assertEqual(3, self.replicated.metrics['replica_reads'])
+
+    def test_read_your_writes(self):
+        metrics = self.replicated.metrics
+        user = RestAuthUser(self.replicated, username)
+        user.create_property('foo', 'bar')
+        self.assertEqual('bar', user.get_property('foo'))
+        self.assertEqual(0, metrics['replica_reads'])
+
+        # other users are still read from replicas
+        RestAuthUser.create(self.conn, 'other')
+        self.assertNotIn('foo', RestAuthUser(self.replicated, 'other').get_properties())
+        self.assertEqual(1, metrics['replica_reads'])
+
+        time.sleep(0.11)
+        self.assertEqual('bar', user.get_property('foo'))
+        self.assertEqual(2, metrics['replica_reads'])
+
+    def test_groups(self):
+        RestAuthGroup.create(self.conn, 'other')
+        group = RestAuthGroup(self.replicated, 'group')
+        group.add_user(username)
+
+        # members are inherited by sub-groups, so all groups are read from the primary
+        self.assertTrue(group.is_member(username))
+        self.assertEqual([], RestAuthGroup(self.replicated, 'other').get_members(flat=True))
+        self.assertEqual(0, self.replicated.metrics['replica_reads'])
+
+    def test_create(self):
+        RestAuthUser.create(self.replicated, 'new')
+        self.assertCountEqual(['new', username], RestAuthUser.get_all(self.replicated, flat=True))
+        RestAuthUser.get(self.replicated, 'new')
+        self.assertEqual(0, self.replicated.metrics['replica_reads'])
+
+    def test_is_pinned(self):
+        self.replicated.sticky = 60
+        self.replicated.send('PUT', '/users/foo%2Fbar/props/email/', 'x')
+        self.assertTrue(self.replicated.is_pinned('/users/foo%2Fbar/props/'))
+        self.assertTrue(self.replicated.is_pinned('/groups/baz/users/foo%2Fbar/'))
+        self.assertFalse(self.replicated.is_pinned('/users/foo/'))
+        self.assertFalse(self.replicated.is_pinned('/users/'))
+
+        # adding a user to a group pins the group and the user, but not all users
+        body = self.replicated.content_handler.marshal_dict({'user': 'new'})
+        self.replicated.send('POST', '/groups/baz/users/', body)
+        self.assertTrue(self.replicated.is_pinned('/users/new/props/'))
+        self.assertTrue(self.replicated.is_pinned('/groups/baz/'))
+        self.assertFalse(self.replicated.is_pinned('/users/'))
+        self.assertFalse(self.replicated.is_pinned('/users/other/'))
+
+        self.replicated.send('DELETE', '/users/foo/')
+        self.assertTrue(self.replicated.is_pinned('/users/'))
+        self.assertTrue(self.replicated.is_pinned('/users/other/'))
+
+    def test_failover(self):
+        replicated = ReplicatedRestAuthConnection(
+            'http://[::1]:8000', 'example.com', 'nopass', content_handler=mime_type,
+            replicas=['http://[::1]:1'])
+        self.assertEqual([username], RestAuthUser.get_all(replicated, flat=True))
+        self.assertEqual(1, replicated.metrics['replica_reads'])
+        self.assertEqual(1, replicated.metrics['replica_failovers'])
+
+    def test_breakers(self):
+        replicated = ReplicatedRestAuthConnection(
+            'http://[::1]:8000', 'example.com', 'nopass', content_handler=mime_type,
+            replicas=['http://[::1]:1'], breaker=CircuitBreaker(window=1, cooldown=60))
+        replica_breaker = list(replicated._breakers.values())[0]
+        self.assertEqual('[::1]:1', replica_breaker.host)
+
+        self.assertEqual([username], RestAuthUser.get_all(replicated, flat=True))
+        self.assertEqual(OPEN, replica_breaker.state)
+        self.assertEqual(CLOSED, replicated.breaker.state)
+
+        # the replica is skipped without trying to connect
+        self.assertEqual([username], RestAuthUser.get_all(replicated, flat=True))
+        self.assertEqual(2, replicated.metrics['replica_failovers'])
+        self.assertEqual(1, replicated.metrics['breaker_rejected'])
+        self.assertEqual(CLOSED, replicated.breaker.state)
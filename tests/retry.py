@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import socket
+
+from RestAuthClient.common import RestAuthConnection
+from RestAuthClient.error import HttpException
+from RestAuthClient.retry import RetryBudget
+from RestAuthClient.retry import RetryPolicy
+from RestAuthClient.user import RestAuthUser
+
+from .base import RestAuthClientTestCase
+
+
+class FlakyConnection(RestAuthConnection):
+    """Connection where the next ``failures`` requests fail with a transport error."""
+    failures = 0
+
+    def _gate(self, *args):
+        if self.failures:
+            self.failures -= 1
+            raise HttpException(socket.error('Connection reset by peer'))
+        return super(FlakyConnection, self)._gate(*args)
+
+
+class LegacyConnection(FlakyConnection):
+    """Connection overriding post() with its signature from before retries were added."""
+
+    def post(self, url, params, headers=None):
+        return super(LegacyConnection, self).post(url, params, headers)
+
+
+class RetryTests(RestAuthClientTestCase):
+    def setUp(self):
+        super(RetryTests, self).setUp()
+        self.policy = RetryPolicy(retries=2, backoff=0.001)
+        self.flaky = FlakyConnection('http://[::1]:8000', 'example.com', 'nopass',
+                                     retry=self.policy)
+
+    def tearDown(self):
+        for user in RestAuthUser.get_all(self.conn):
+            user.remove()
+
+    def test_budget(self):
+        budget = RetryBudget(ratio=0.5, capacity=2)
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+
+        for i in range(10):
+            budget.deposit()
+        self.assertEqual(2, budget.tokens)
+
+    def test_delay(self):
+        self.assertTrue(0 <= self.policy.delay(0) <= 0.001)
+        self.assertTrue(0 <= self.policy.delay(1) <= 0.002)
+        self.assertEqual(None, self.policy.delay(2))
+
+        policy = RetryPolicy(budget=RetryBudget(capacity=0))
+        self.assertEqual(None, policy.delay(0))
+
+    def test_retry(self):
+        self.flaky.failures = 2
+        self.assertEqual([], RestAuthUser.get_all(self.flaky))
+        self.assertEqual(2, self.flaky.metrics['retries'])
+
+        self.flaky.failures = 3
+        self.assertRaises(HttpException, RestAuthUser.get_all, self.flaky)
+        self.assertEqual(4, self.flaky.metrics['retries'])
+
+    def test_idempotent(self):
+        self.flaky.failures = 1
+        self.assertRaises(HttpException, RestAuthUser.create, self.flaky, 'foobar', 'password')
+        self.assertEqual(0, self.flaky.metrics['retries'])
+
+        user = RestAuthUser.create(self.flaky, 'foobar', 'password')
+        self.flaky.failures = 1
+        self.assertTrue(user.verify_password('password'))
+        self.flaky.failures = 1
+        user.set_password('password2')  # PUT
+        self.assertEqual(2, self.flaky.metrics['retries'])
+
+    def test_legacy_post(self):
+        RestAuthUser.create(self.conn, 'foobar', 'password')
+        conn = LegacyConnection('http://[::1]:8000', 'example.com', 'nopass', retry=self.policy)
+        conn.failures = 1
+        self.assertTrue(RestAuthUser(conn, 'foobar').verify_password('password'))
+        self.assertEqual(1, conn.metrics['retries'])
+
+        self.assertTrue(self.policy.is_idempotent('POST', '/users/foo%2Fbar/'))
+        self.assertFalse(self.policy.is_idempotent('POST', '/users/'))
+        self.assertFalse(self.policy.is_idempotent('POST', '/users/foobar/props/'))
+        self.assertFalse(self.policy.is_idempotent('DELETE', '/users/foobar/'))
+
+    def test_budget_exhausted(self):
+        conn = FlakyConnection('http://[::1]:8000', 'example.com', 'nopass',
+                               retry=RetryPolicy(budget=RetryBudget(ratio=0, capacity=1)))
+        conn.failures = 2
+        self.assertRaises(HttpException, RestAuthUser.get_all, conn)
+        self.assertEqual({'retries': 1, 'retry_budget_exhausted': 1}, conn.metrics.as_dict())
+
+    def test_deadline(self):
+        conn = FlakyConnection('http://[::1]:8000', 'example.com', 'nopass',
+                               retry=RetryPolicy(backoff=10, max_backoff=10))
+        conn.failures = 1
+        with conn.deadline(0.01):
+            try:
+                RestAuthUser.get_all(conn)
+            except HttpException:
+                pass
+        self.assertEqual(0, conn.metrics['retries'])
+
+    def test_disabled(self):
+        conn = FlakyConnection('http://[::1]:8000', 'example.com', 'nopass')
+        self.assertEqual(None, conn.retry)
+        conn.failures = 1
+        self.assertRaises(HttpException, RestAuthUser.get_all, conn)
+        self.assertEqual(0, conn.metrics['retries'])
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import threading
+
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.user import RestAuthUser
+from RestAuthCommon import error
+
+from .base import RestAuthClientTestCase
+
+username = "mati \u6109"
+password = "mati \u6111"
+propKey = "mati \u6112"
+propVal = "mati \u6113"
+propKey2 = "mati \u6114"
+propVal2 = "mati \u6115"
+groupname = "group \u6114"
+groupname2 = "group \u6115"
+username2 = "mati \u6116"
+
+
+class SessionTests(RestAuthClientTestCase):
+    def setUp(self):
+        super(SessionTests, self).setUp()
+        self.user = RestAuthUser.create(self.conn, username, password)
+        self.group = RestAuthGroup.create(self.conn, groupname)
+
+    def tearDown(self):
+        for user in RestAuthUser.get_all(self.conn):
+            user.remove()
+        for grp in RestAuthGroup.get_all(self.conn):
+            grp.remove()
+
+    def test_memoize(self):
+        with self.conn.session() as session:
+            user = session.user(username)
+            self.assertFalse(user.in_group(groupname))
+
+            # changed behind the back of the session:
+            self.group.add_user(username)
+            self.assertFalse(session.group(groupname).is_member(user))
+            self.assertEqual(self.user, RestAuthUser.get(session, username))
+
+        self.assertTrue(self.user.in_group(groupname))
+
+    def test_properties(self):
+        self.user.set_property(propKey2, propVal2)
+
+        with self.conn.session() as session:
+            user = session.user(username)
+            user.set_property(propKey, propVal)
+            user.remove_property(propKey2)
+
+            self.assertEqual(propVal, user.get_property(propKey))
+            self.assertRaises(error.ResourceNotFound, user.get_property, propKey2)
+            props = user.get_properties()
+            self.assertEqual(propVal, props[propKey])
+            self.assertFalse(propKey2 in props)
+
+            # nothing was sent yet:
+            props = self.user.get_properties()
+            self.assertFalse(propKey in props)
+            self.assertEqual(propVal2, props[propKey2])
+
+        props = self.user.get_properties()
+        self.assertEqual(propVal, props[propKey])
+        self.assertFalse(propKey2 in props)
+
+    def test_threads(self):
+        with self.conn.session() as session:
+            def work(i):
+                session.user(username).set_property('prop %s' % i, 'value %s' % i)
+                session.user(username).get_properties()
+
+            threads = [threading.Thread(target=work, args=(i, )) for i in range(10)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        props = self.user.get_properties()
+        for i in range(10):
+            self.assertEqual('value %s' % i, props['prop %s' % i])
+
+    def test_memberships(self):
+        grp2 = RestAuthGroup.create(self.conn, groupname2)
+
+        with self.conn.session() as session:
+            group = session.group(groupname)
+            group.add_user(username)
+            self.assertTrue(group.is_member(username))
+            self.assertEqual([], self.group.get_members())
+
+            # inherited membership is visible as well:
+            group.add_group(groupname2)
+            self.assertTrue(session.group(groupname2).is_member(username))
+            self.assertCountEqual([self.group, grp2], session.user(username).get_groups())
+
+    def test_bulk(self):
+        RestAuthUser.create(self.conn, username2)
+        grp2 = RestAuthGroup.create(self.conn, groupname2)
+
+        with self.conn.session() as session:
+            result = session.group(groupname).add_users([username, username2])
+            self.assertCountEqual([username, username2], result.added)
+            self.assertEqual([], self.group.get_members())  # nothing was sent yet
+
+            result = session.user(username).add_groups([groupname2])
+            self.assertEqual([groupname2], result.added)
+            self.assertEqual([], grp2.get_members())
+
+            self.assertEqual([username], session.group(groupname).set_members([username2]).removed)
+
+        self.assertEqual([username2], self.group.get_members(flat=True))
+        self.assertEqual([username], grp2.get_members(flat=True))
+
+    def test_password(self):
+        with self.conn.session() as session:
+            user = session.user(username)
+            user.set_password(password + "new")
+            self.assertTrue(self.user.verify_password(password))
+            self.assertTrue(user.verify_password(password + "new"))
+
+    def test_login(self):
+        self.user.set_property(propKey, propVal)
+        self.group.add_user(username)
+
+        with self.conn.session() as session:
+            user = session.user(username)
+            user.set_property(propKey2, propVal2)
+            self.assertIsNone(user.login(password + "wrong"))
+
+            login = user.login(password, flat=True)
+            self.assertEqual(propVal, login.properties[propKey])
+            self.assertEqual(propVal2, login.properties[propKey2])  # sees queued changes
+            self.assertEqual([groupname], login.groups)
+
+    def test_exception(self):
+        try:
+            with self.conn.session() as session:
+                session.user(username).set_property(propKey, propVal)
+                session.group(groupname).add_user(username)
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+
+        self.assertFalse(propKey in self.user.get_properties())
+        self.assertFalse(self.group.is_member(username))
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from collections import Counter
+
+from RestAuthClient.common import RestAuthConnection
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.shard import ShardedRestAuthConnection
+from RestAuthClient.user import RestAuthUser
+from RestAuthCommon import error
+
+from .base import RestAuthClientTestCase
+from .base import mime_type
+
+usernames = ["mati %s 愉" % i for i in range(1000)]
+
+
+class RecordingUser(RestAuthUser):
+    added = []
+
+    def add_groups(self, groups, workers=None):
+        self.added.extend(groups)
+        return super(RecordingUser, self).add_groups(groups, workers)
+
+
+class RecordingConnection(RestAuthConnection):
+    """Connection to the same service that records the groups added to users."""
+    _user = RecordingUser
+
+
+class HashRingTests(RestAuthClientTestCase):
+    def setUp(self):
+        self.sharded = ShardedRestAuthConnection({'eu': self.conn, 'us': self.conn})
+
+    def tearDown(self):
+        pass
+
+    def test_distribution(self):
+        shards = Counter(self.sharded.get_shard(name) for name in usernames)
+        self.assertEqual(set(['eu', 'us']), set(shards))
+        self.assertTrue(min(shards.values()) > 350)
+
+        # the ring does not depend on the order shards are added in
+        sharded = ShardedRestAuthConnection({'us': self.conn})
+        sharded.add_shard('eu', self.conn)
+        self.assertEqual([self.sharded.get_shard(n) for n in usernames],
+                         [sharded.get_shard(n) for n in usernames])
+
+    def test_add_shard(self):
+        before = dict((name, self.sharded.get_shard(name)) for name in usernames)
+        self.sharded.add_shard('asia', self.conn)
+        moved = [name for name in usernames if self.sharded.get_shard(name) != before[name]]
+
+        # only users moving to the new shard move, about a third of them
+        self.assertEqual(set(['asia']), set(self.sharded.get_shard(name) for name in moved))
+        self.assertTrue(200 < len(moved) < 450)
+
+    def test_no_shards(self):
+        sharded = ShardedRestAuthConnection({})
+        self.assertRaises(error.RestAuthRuntimeException, sharded.get_shard, 'foo')
+
+
+class ShardedTests(RestAuthClientTestCase):
+    def setUp(self):
+        super(ShardedTests, self).setUp()
+        self.sharded = ShardedRestAuthConnection({'eu': self.conn})
+
+    def tearDown(self):
+        for user in RestAuthUser.get_all(self.conn):
+            user.remove()
+        for group in RestAuthGroup.get_all(self.conn):
+            group.remove()
+
+    def test_users(self):
+        user = self.sharded.create_user(usernames[0], 'password', {'foo': 'bar'})
+        self.assertEqual(self.conn, user.conn)
+        self.assertTrue(self.sharded.get_user(usernames[0]).verify_password('password'))
+        self.sharded.create_user(usernames[1])
+
+        self.assertCountEqual(usernames[:2], self.sharded.get_all_users(flat=True))
+        self.assertCountEqual(usernames[:2], [u.name for u in self.sharded.get_all_users()])
+
+    def test_groups(self):
+        self.sharded.create_group('group')
+        self.sharded.create_group('group')  # already exists
+        self.sharded.create_user(usernames[0])
+
+        group = self.sharded.get_group('group', usernames[0])
+        group.add_user(usernames[0])
+        self.assertEqual(['group'], list(self.sharded.get_all_groups(flat=True)))
+        self.assertEqual([usernames[0]], list(self.sharded.get_members('group', flat=True)))
+        self.assertEqual([], list(self.sharded.get_members('other')))
+
+    def test_rebalance(self):
+        self.sharded.create_user(usernames[0])
+        self.assertEqual([], list(self.sharded.misplaced()))
+        self.assertEqual([], list(self.sharded.rebalance(lambda name: 'password')))
+
+    def test_move(self):
+        # both shards are the same service, so a user of 'us' is listed as misplaced on 'eu'
+        target = RecordingConnection('http://[::1]:8000', 'example.com', 'nopass',
+                                     content_handler=mime_type)
+        sharded = ShardedRestAuthConnection({'eu': self.conn, 'us': target})
+        name = [n for n in usernames if sharded.get_shard(n) == 'us'][0]
+        user = RestAuthUser.create(self.conn, name, 'password')
+        self.assertEqual([(name, 'eu', 'us')], list(sharded.misplaced()))
+
+        # users without a known password are not moved
+        self.assertEqual([(name, None)], list(sharded.rebalance(lambda name: None)))
+        self.assertEqual([name], RestAuthUser.get_all(self.conn, flat=True))
+
+        meta = RestAuthGroup.create(self.conn, 'meta')
+        meta.add_group(RestAuthGroup.create(self.conn, 'sub'))
+        meta.add_user(user)
+        RestAuthGroup.create(self.conn, 'other').add_user(user)
+        self.assertCountEqual(['meta', 'sub', 'other'], user.get_groups(flat=True))
+
+        RecordingUser.added = []
+        self.assertEqual([(name, 'us')], list(sharded.rebalance({name: 'password'}.get)))
+        self.assertEqual(['meta', 'other'], RecordingUser.added)  # not the inherited 'sub'
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import time
+
+from RestAuthClient.group import RestAuthGroup
+from RestAuthClient.snapshot import Snapshot
+from RestAuthClient.user import RestAuthUser
+
+from .base import RestAuthClientTestCase
+
+username1 = "mati \u6109"
+username2 = "mati \u6110"
+username3 = "mati \u6111"
+groupname1 = "group \u6114"
+groupname2 = "group \u6115"
+propKey = "mati \u6112"
+propVal = "mati \u6113"
+
+
+class SnapshotTests(RestAuthClientTestCase):
+    def setUp(self):
+        super(SnapshotTests, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.snapshot = Snapshot(os.path.join(self.tmpdir, 'snapshot.sqlite3'))
+
+        self.user1 = RestAuthUser.create(self.conn, username1, 'foobar')
+        self.user2 = RestAuthUser.create(self.conn, username2, 'foobar')
+        self.user1.create_property(propKey, propVal)
+        self.group1 = RestAuthGroup.create(self.conn, groupname1)
+        self.group2 = RestAuthGroup.create(self.conn, groupname2)
+        self.group1.add_user(self.user1)
+        self.group1.add_group(self.group2)
+
+    def tearDown(self):
+        self.snapshot.close()
+        shutil.rmtree(self.tmpdir)
+        for user in RestAuthUser.get_all(self.conn):
+            user.remove()
+        for grp in RestAuthGroup.get_all(self.conn):
+            grp.remove()
+
+    def test_sync(self):
+        self.assertEqual(None, self.snapshot.synced)
+        stats = self.snapshot.sync(self.conn, batch_size=1)
+        self.assertEqual({'users': 2, 'groups': 2, 'removed_users': 0, 'removed_groups': 0},
+                         stats)
+        self.assertTrue(self.snapshot.synced is not None)
+
+        self.assertEqual([username1, username2], self.snapshot.get_users())
+        self.assertEqual(self.user1.get_properties(), self.snapshot.get_properties(username1))
+        self.assertEqual(self.user2.get_properties(), self.snapshot.get_properties(username2))
+        self.assertEqual([groupname1, groupname2], self.snapshot.get_groups())
+        self.assertEqual([username1], self.snapshot.get_members(groupname1))
+        self.assertEqual([username1], self.snapshot.get_members(groupname2))  # inherited
+        self.assertEqual([groupname2], self.snapshot.get_subgroups(groupname1))
+
+        # data survives closing the database:
+        self.snapshot.close()
+        self.snapshot = Snapshot(self.snapshot.path)
+        self.assertEqual([username1, username2], self.snapshot.get_users())
+
+    def test_resync(self):
+        self.snapshot.sync(self.conn)
+
+        RestAuthUser.create(self.conn, username3, 'foobar')
+        self.user1.set_property(propKey, 'foobar')
+        self.group2.remove()
+
+        stats = self.snapshot.sync(self.conn, max_age=None)
+        self.assertEqual({'users': 1, 'groups': 0, 'removed_users': 0, 'removed_groups': 1},
+                         stats)
+        self.assertEqual([username1, username2, username3], self.snapshot.get_users())
+        self.assertEqual([groupname1], self.snapshot.get_groups())
+        self.assertEqual([], self.snapshot.get_subgroups(groupname1))
+        self.assertEqual(propVal, self.snapshot.get_properties(username1)[propKey])
+
+        # fetch everything again:
+        self.user2.remove()
+        stats = self.snapshot.sync(self.conn)
+        self.assertEqual({'users': 2, 'groups': 1, 'removed_users': 1, 'removed_groups': 0},
+                         stats)
+        self.assertEqual('foobar', self.snapshot.get_properties(username1)[propKey])
+        self.assertEqual([username1, username3], self.snapshot.get_users())
+
+    def test_resume(self):
+        self.snapshot.sync(self.conn)
+
+        # simulate a sync that was interrupted after user1 was fetched:
+        started = time.time() - 10
+        with self.snapshot.db:
+            self.snapshot.db.execute('INSERT INTO runs (started) VALUES (?)', (started, ))
+            self.snapshot.db.execute('UPDATE users SET synced = ?', (started - 1, ))
+            self.snapshot.db.execute('UPDATE groups SET synced = ?', (started - 1, ))
+            self.snapshot.db.execute('UPDATE users SET synced = ? WHERE name = ?',
+                                     (started + 1, username1))
+
+        stats = self.snapshot.sync(self.conn, max_age=0)
+        self.assertEqual(1, stats['users'])
+        self.assertEqual(2, stats['groups'])
+
+        stats = self.snapshot.sync(self.conn, max_age=0)
+        self.assertEqual(2, stats['users'])
@@ -2,8 +2,12 @@
 
 from __future__ import unicode_literals
 
+import threading
+import time
+
 from RestAuthClient.error import UserExists
 from RestAuthClient.error import PropertyExists
+from RestAuthClient.user import PropertyWriter
 from RestAuthClient.user import RestAuthUser
 from RestAuthClient.group import RestAuthGroup
 from RestAuthCommon import error
@@ -484,6 +488,82 @@ class SetMultiplePropertyTests(PropertyBaseTests):
             pass
 
 
+class PropertyWriterTests(PropertyBaseTests):
+    def test_coalesce(self):
+        writer = PropertyWriter(self.conn)
+        writer.set_property(self.user, propKey1, propVal1)
+        writer.set_property(username, propKey1, propVal2)
+        writer.set_properties(username, {propKey2: propVal2})
+        self.assertProperties(**{})
+
+        self.assertEqual({}, writer.flush())
+        self.assertProperties(**{propKey1: propVal2, propKey2: propVal2})
+
+    def test_maxSize(self):
+        writer = PropertyWriter(self.conn, max_size=2)
+        writer.set_property(username, propKey1, propVal1)
+        writer.set_property(username, propKey1, propVal2)
+        self.assertProperties(**{})
+
+        writer.set_property(username, propKey2, propVal2)
+        self.assertProperties(**{propKey1: propVal2, propKey2: propVal2})
+
+    def test_errors(self):
+        errors = []
+        with PropertyWriter(self.conn, callback=lambda *args: errors.append(args)) as writer:
+            writer.set_properties(username, {propKey1: propVal1, 'foo:bar': propVal2})
+            writer.set_property('invalid', propKey1, propVal1)
+
+        self.assertProperties(**{propKey1: propVal1})
+        self.assertCountEqual([username, 'invalid'], [e[0] for e in errors])
+        self.assertCountEqual(['foo:bar', propKey1], [e[1] for e in errors])
+        self.assertTrue(isinstance(errors[0][2], (error.PreconditionFailed,
+                                                  error.ResourceNotFound)))
+
+    def test_concurrentFlush(self):
+        class SlowWriter(PropertyWriter):
+            def _write(self, user, props):
+                if props.get(propKey1) == propVal1:
+                    time.sleep(0.1)  # the older batch would land last without serialized flushes
+                return super(SlowWriter, self)._write(user, props)
+
+        writer = SlowWriter(self.conn)
+        writer.set_property(username, propKey1, propVal1)
+        thread = threading.Thread(target=writer.flush)
+        thread.start()
+        time.sleep(0.02)
+
+        writer.set_property(username, propKey1, propVal2)
+        writer.flush()
+        thread.join()
+        self.assertProperties(**{propKey1: propVal2})
+
+
+class BulkPropertyTests(PropertyBaseTests):
+    def test_getPropertiesMany(self):
+        user2 = RestAuthUser.create(self.conn, username2, password, {propKey1: propVal2})
+        self.user.set_properties({propKey1: propVal1, propKey2: propVal2})
+
+        results = list(self.conn.get_properties_many(
+            (u for u in [self.user, username2, 'invalid']), keys=[propKey1, propKey2]))
+        self.assertEqual([username, username2, 'invalid'], [r[0] for r in results])
+        self.assertEqual({propKey1: propVal1, propKey2: propVal2}, results[0][1])
+        self.assertEqual({propKey1: propVal2}, results[1][1])
+        self.assertTrue(isinstance(results[2][1], error.ResourceNotFound))
+
+        results = dict(self.conn.get_properties_many([user2], ordered=False))
+        self.assertEqual(user2.get_properties(), results[username2])
+
+    def test_setPropertyMany(self):
+        RestAuthUser.create(self.conn, username2, password, {propKey1: propVal2})
+        results = list(self.conn.set_property_many([username, username2, 'invalid'], propKey1,
+                                                   propVal1))
+        self.assertEqual([(username, None), (username2, propVal2)], results[:2])
+        self.assertTrue(isinstance(results[2][1], error.ResourceNotFound))
+        self.assertProperties(**{propKey1: propVal1})
+        self.assertEqual(propVal1, RestAuthUser(self.conn, username2).get_property(propKey1))
+
+
 class SimpleUserGroupTests(RestAuthClientTestCase):
     def setUp(self):
         super(SimpleUserGroupTests, self).setUp()
@@ -511,6 +591,28 @@ class SimpleUserGroupTests(RestAuthClientTestCase):
         self.assertEqual([self.group], self.user.get_groups())
         self.assertEqual([self.group], RestAuthGroup.get_all(self.conn, self.user))
 
+    def test_addGroups(self):
+        group2 = RestAuthGroup.create(self.conn, groupname + "2")
+        result = self.user.add_groups(g for g in [self.group, group2.name, groupname + "foo"])
+        self.assertTrue(result)
+        self.assertCountEqual([groupname, group2.name], result.added)
+        self.assertEqual([groupname + "foo"], result.not_found)
+        self.assertCountEqual([self.group, group2], self.user.get_groups())
+
+        self.group.remove_user(self.user)
+        result = self.user.remove_groups([groupname, group2])
+        self.assertEqual([group2.name], result.removed)
+        self.assertEqual([], result.not_found)
+        self.assertEqual("user", result.failed[groupname].get_type())  # not a member anymore
+        self.assertEqual([], self.user.get_groups())
+
+    def test_addGroupsInvalidUser(self):
+        user = RestAuthUser(self.conn, username2)
+        result = user.add_groups([groupname])
+        self.assertFalse(result)
+        self.assertEqual([], result.not_found)
+        self.assertEqual("user", result.failed[groupname].get_type())
+
     def test_inGroup(self):
         self.assertFalse(self.user.in_group(groupname))
         self.assertFalse(self.user.in_group(self.group))
@@ -550,6 +652,25 @@ class SimpleUserGroupTests(RestAuthClientTestCase):
         except error.ResourceNotFound as e:
             self.assertEqual("user", e.get_type())
 
+    def test_login(self):
+        self.user.add_group(self.group)
+        self.user.set_property(propKey, propVal)
+
+        login = self.user.login(password)
+        self.assertEqual(self.user, login.user)
+        self.assertEqual(self.user.get_properties(), login.properties)
+        self.assertEqual([self.group], login.groups)
+
+        login = self.user.login(password, properties=False, flat=True)
+        self.assertEqual(None, login.properties)
+        self.assertEqual([groupname], login.groups)
+
+    def test_loginWrongPassword(self):
+        self.assertEqual(None, self.user.login(password + "foo"))
+
+    def test_loginInvalidUser(self):
+        self.assertEqual(None, RestAuthUser(self.conn, "foobar").login(password))
+
 
 class CreatePropertyTest(PropertyBaseTests):
     def test_createProperty(self):